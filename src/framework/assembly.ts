@@ -11,8 +11,10 @@ export default class Assembly {
 
   constructor (worker: Worker, bridge: Bridge) {
     const sessionId = String(Date.now())
+    // ?profile=true in the url runs the extraction under cProfile, the profile is logged to the tracking donation
+    const profile = new URLSearchParams(window.location.search).get('profile') === 'true'
     this.visualisationEngine = new ReactEngine(new ReactFactory())
     this.router = new CommandRouter(bridge, this.visualisationEngine)
-    this.processingEngine = new WorkerProcessingEngine(sessionId, worker, this.router)
+    this.processingEngine = new WorkerProcessingEngine(sessionId, worker, this.router, profile)
   }
 }
@@ -1,5 +1,16 @@
-from port.main import start
+"""
+The port package
 
+Importing port does as little as possible: the script and the modules it needs
+are imported when start() is first used.
+"""
 __all__ = [
   "start"
 ]
+
+
+def __getattr__(name: str):
+    if name == "start":
+        from port.main import start
+        return start
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,147 @@
+"""
+Contains aggregations of extracted tables that are shown as charts in the consent form
+
+The consent form can chart a table by itself, but then every row of the table passes
+through a web worker whenever the form renders. An Aggregation is computed once, during
+extraction, and sent along as a handful of points. The chart specification is sent as
+well: once the participant deletes or searches rows, the UI charts the remaining rows.
+
+Timestamps are counted per date (their first 10 characters) first, the dates are then
+folded into weeks or months. Per row this is a slice and a dict update, date arithmetic
+is done once per distinct date.
+
+Tables that were sampled or cut short hold only part of the records. Their counts are
+scaled to the number of records the table was taken from, and their title says so.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from enum import Enum
+from typing import Any
+import logging
+
+import port.api.props as props
+from port.table import Table
+
+logger = logging.getLogger(__name__)
+
+COUNT_LABEL = {"en": "Number", "nl": "Aantal"}
+
+
+class Period(Enum):
+    """ Period Enum """
+    WEEK = 1
+    MONTH = 2
+
+
+@dataclass(frozen=True)
+class Aggregation:
+    """
+    A chart of the number of rows per group
+
+    Attributes:
+        title: title of the chart
+        column: column to group by
+        period: WEEK or MONTH groups the ISO timestamps in the column per period, None groups per value
+        top: only keep the n largest groups, None keeps all
+        chart: "bar", "line" or "area"
+    """
+    title: props.Translatable
+    column: str
+    period: Period | None = None
+    top: int | None = None
+    chart: str = "bar"
+
+
+def aggregate(
+    df: Table,
+    aggregation: Aggregation,
+    scale: float = 1.0,
+    note: dict[str, str] | None = None,
+) -> dict[str, Any] | None:
+    """
+    Returns the visualization of a table as expected by the consent form, None if there is nothing to show
+
+    The visualization holds the chart specification and, under "aggregated", the counts
+    and the number of rows they were computed from.
+    Counts are multiplied by scale and rounded, note is added to the title.
+    """
+    if aggregation.column not in df or df.empty:
+        return None
+
+    try:
+        if aggregation.period is None:
+            counts = count_values(df[aggregation.column], aggregation.top)
+        else:
+            counts = count_periods(df[aggregation.column], aggregation.period)
+    except Exception as e:
+        logger.error("Could not aggregate %s: %s", aggregation.column, e)
+        return None
+
+    if not counts:
+        return None
+
+    if scale != 1.0:
+        counts = [(key, round(n * scale)) for key, n in counts]
+
+    title = aggregation.title.translations
+    if note is not None:
+        title = {language: f"{text} {note[language]}" for language, text in title.items()}
+
+    group: dict[str, Any] = {"column": aggregation.column}
+    value: dict[str, Any] = {"label": COUNT_LABEL, "aggregate": "count"}
+    if aggregation.period is not None:
+        group["dateFormat"] = aggregation.period.name.lower()
+        value["addZeroes"] = True
+
+    return {
+        "type": aggregation.chart,
+        "title": title,
+        "group": group,
+        "values": [value],
+        "aggregated": {
+            "rows": len(df),
+            "head": [aggregation.column, "Count"],
+            "data": [[key, n] for key, n in counts],
+            "values": [{**value, "column": "Count", "aggregate": "sum"}],
+        },
+    }
+
+
+def count_values(values: Any, top: int | None = None) -> list[tuple[Any, int]]:
+    """
+    Number of rows per value, the largest first
+    """
+    return Counter(value for value in values if value not in (None, "")).most_common(top)
+
+
+def count_periods(timestamps: Any, period: Period) -> list[tuple[str, int]]:
+    """
+    Number of rows per period of ISO 8601 timestamps, in order of time
+
+    A period is represented by a timestamp in its middle (noon on the 15th of a month,
+    noon on the Thursday of a week) with the timezone of the data. The UI renders it in
+    the local time of the participant, which does not move it to another period.
+    Timestamps that are not ISO 8601 are left out.
+    """
+    per_date = Counter(timestamp[:10] for timestamp in timestamps if timestamp)
+    suffix = ""
+    for timestamp in timestamps:
+        if timestamp:
+            suffix = timestamp[19:]
+            break
+
+    per_period: Counter[str] = Counter()
+    for day, n in per_date.items():
+        try:
+            d = date.fromisoformat(day)
+        except ValueError:
+            continue
+
+        if period == Period.MONTH:
+            middle = d.replace(day=15)
+        else:
+            middle = d - timedelta(days=d.weekday()) + timedelta(days=3)
+        per_period[f"{middle.isoformat()}T12:00:00{suffix}"] += n
+
+    return sorted(per_period.items())
@@ -1,14 +1,20 @@
+from typing import Any, Iterator
+
+from port.api.props import fields_to_dict
+
+
 class CommandUIRender:
     __slots__ = "page"
 
     def __init__(self, page):
         self.page = page
 
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "CommandUIRender"
+        yield "page", self.page
+
     def toDict(self):
-        dict = {}
-        dict["__type__"] = "CommandUIRender"
-        dict["page"] = self.page.toDict()
-        return dict
+        return fields_to_dict(self)
 
 
 class CommandSystemDonate:
@@ -18,12 +24,13 @@ class CommandSystemDonate:
         self.key = key
         self.json_string = json_string
 
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "CommandSystemDonate"
+        yield "key", self.key
+        yield "json_string", self.json_string
+
     def toDict(self):
-        dict = {}
-        dict["__type__"] = "CommandSystemDonate"
-        dict["key"] = self.key
-        dict["json_string"] = self.json_string
-        return dict
+        return fields_to_dict(self)
 
 
 class CommandSystemExit:
@@ -33,9 +40,10 @@ class CommandSystemExit:
         self.code = code
         self.info = info
 
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "CommandSystemExit"
+        yield "code", self.code
+        yield "info", self.info
+
     def toDict(self):
-        dict = {}
-        dict["__type__"] = "CommandSystemExit"
-        dict["code"] = self.code
-        dict["info"] = self.info
-        return dict
+        return fields_to_dict(self)
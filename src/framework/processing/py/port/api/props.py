@@ -1,7 +1,81 @@
+from abc import abstractmethod
 from dataclasses import dataclass
-from typing import Optional, TypedDict
+from typing import TYPE_CHECKING, Any, ClassVar, Iterator, Optional, TypedDict
+import json
 
-import pandas as pd
+from port.table import Table
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def to_dict(value: Any) -> Any:
+    """Converts props, and lists and dicts containing them, to the dicts the UI expects"""
+    if hasattr(value, "toDict"):
+        return value.toDict()
+    if isinstance(value, list):
+        return [to_dict(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_dict(item) for key, item in value.items()}
+    if isinstance(value, DataFrameJSON):
+        return value.json()
+    return value
+
+
+def fields_to_dict(value: Any) -> dict[str, Any]:
+    """Converts the fields() of props or a command to a dict
+
+    Props and commands describe themselves with fields(), which yields (key, value) pairs.
+    The same pairs are written straight to JSON by port.api.transport.
+    """
+    return {key: to_dict(item) for key, item in value.fields()}
+
+
+class Props:
+    """Base class of the props
+
+    Props are immutable, so their dict and JSON are built once and reused by every later render.
+    Lists and dicts passed to props should not be changed afterwards.
+    Props that contain tables are serialized on every call instead: their JSON is large,
+    and would be kept for as long as the props are, while it is only sent once or a few times.
+    """
+
+    __slots__ = "_dict", "_json"
+
+    # Whether the dict and JSON are kept after they are built
+    cache_serialization: ClassVar[bool] = True
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        # Props are slotted dataclasses, ABCMeta would only complain once one is instantiated
+        super().__init_subclass__(**kwargs)
+        if cls.fields is Props.fields:
+            raise TypeError(f"Props subclass {cls.__name__} does not define fields()")
+
+    @abstractmethod
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        raise NotImplementedError
+
+    def toDict(self):
+        if not self.cache_serialization:
+            return fields_to_dict(self)
+        try:
+            return self._dict
+        except AttributeError:
+            object.__setattr__(self, "_dict", fields_to_dict(self))
+            return self._dict
+
+    def toJSON(self) -> str:
+        try:
+            return self._json
+        except AttributeError:
+            from port.api.transport import write_pairs
+
+            chunks: list[str] = []
+            write_pairs(self.fields(), chunks.append)
+            if not self.cache_serialization:
+                return "".join(chunks)
+            object.__setattr__(self, "_json", "".join(chunks))
+            return self._json
 
 
 class Translations(TypedDict):
@@ -16,18 +90,18 @@ class Translations(TypedDict):
     nl: str
 
 
-@dataclass
-class Translatable:
+@dataclass(frozen=True, slots=True)
+class Translatable(Props):
     """Wrapper class for Translations"""
 
     translations: Translations
 
-    def toDict(self):
-        return self.__dict__.copy()
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "translations", self.translations
 
 
-@dataclass
-class PropsUIHeader:
+@dataclass(frozen=True, slots=True)
+class PropsUIHeader(Props):
     """Page header
 
     Attributes:
@@ -36,29 +110,25 @@ class PropsUIHeader:
 
     title: Translatable
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIHeader"
-        dict["title"] = self.title.toDict()
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIHeader"
+        yield "title", self.title
 
 
-@dataclass
-class PropsUIFooter:
+@dataclass(frozen=True, slots=True)
+class PropsUIFooter(Props):
     """Page footer
 
     Attributes:
         progressPercentage: float indicating the progress in the flow
     """
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIFooter"
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIFooter"
 
 
-@dataclass
-class PropsUIPromptConfirm:
+@dataclass(frozen=True, slots=True)
+class PropsUIPromptConfirm(Props):
     """Retry submitting a file page
 
     Prompt the user if they want to submit a new file.
@@ -74,52 +144,98 @@ class PropsUIPromptConfirm:
     ok: Translatable
     cancel: Translatable
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIPromptConfirm"
-        dict["text"] = self.text.toDict()
-        dict["ok"] = self.ok.toDict()
-        dict["cancel"] = self.cancel.toDict()
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIPromptConfirm"
+        yield "text", self.text
+        yield "ok", self.ok
+        yield "cancel", self.cancel
+
+
+def data_frame_to_json(data_frame: "Table | pd.DataFrame") -> str:
+    """Serializes a Table or DataFrame for the consent form
+
+    The format is that of DataFrame.to_json() ({column: {row: value}}),
+    except for categorical columns, which are dictionary encoded:
+    {"__type__": "DictionaryColumn", "categories": [...], "codes": [...]}
+    A code of -1 stands for a missing value.
+    """
+    if isinstance(data_frame, Table):
+        return data_frame.to_json()
+
+    import pandas as pd
+
+    if not any(isinstance(dtype, pd.CategoricalDtype) for dtype in data_frame.dtypes):
+        return data_frame.to_json()
 
+    columns = []
+    for name, column in data_frame.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            categories = pd.Series(column.cat.categories).to_json(orient="values")
+            codes = column.cat.codes.to_json(orient="values")
+            encoded = f'{{"__type__":"DictionaryColumn","categories":{categories},"codes":{codes}}}'
+        else:
+            encoded = column.to_json()
+        columns.append(f"{json.dumps(str(name))}:{encoded}")
 
-@dataclass
-class PropsUIPromptConsentFormTable:
+    return "{" + ",".join(columns) + "}"
+
+
+class DataFrameJSON:
+    """A table in the props of a consent form, serialized only when the props are converted
+
+    to_dict() gives the JSON as a string, which the UI parses.
+    port.api.transport writes the JSON into the command as it is, so it is neither escaped nor parsed twice.
+    """
+
+    __slots__ = "data_frame"
+
+    def __init__(self, data_frame: "Table | pd.DataFrame"):
+        self.data_frame = data_frame
+
+    def json(self) -> str:
+        return data_frame_to_json(self.data_frame)
+
+
+@dataclass(frozen=True, slots=True)
+class PropsUIPromptConsentFormTable(Props):
     """Table to be shown to the participant prior to donation
 
     Attributes:
         id: a unique string to itentify the table after donation
         title: title of the table
         data_frame: table to be shown
-        visualizations: optional visualizations to be shown. (see TODO for input format)
+        visualizations: optional visualizations to be shown, see port.aggregate for the format
+        partial: whether records were left out of data_frame, not sent to the UI
     """
 
     id: str
     title: Translatable
-    data_frame: pd.DataFrame
+    data_frame: "Table | pd.DataFrame"
     description: Optional[Translatable] = None
     visualizations: Optional[list] = None
     folded: Optional[bool] = False
+    partial: bool = False
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIPromptConsentFormTable"
-        dict["id"] = self.id
-        dict["title"] = self.title.toDict()
-        dict["data_frame"] = self.data_frame.to_json()
-        dict["description"] = self.description.toDict() if self.description else None
-        dict["visualizations"] = self.visualizations if self.visualizations else None
-        dict["folded"] = self.folded
-        return dict
-
-
-@dataclass
-class PropsUIPromptConsentForm:
+    cache_serialization = False
+
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIPromptConsentFormTable"
+        yield "id", self.id
+        yield "title", self.title
+        yield "data_frame", DataFrameJSON(self.data_frame)
+        yield "description", self.description or None
+        yield "visualizations", self.visualizations or None
+        yield "folded", self.folded
+
+
+@dataclass(frozen=True, slots=True)
+class PropsUIPromptConsentForm(Props):
     """Tables to be shown to the participant prior to donation
 
     Attributes:
         tables: a list of tables
         meta_tables: a list of optional tables, for example for logging data
+        loading: more tables will follow in a next render, donating is not possible yet
     """
 
     tables: list[PropsUIPromptConsentFormTable]
@@ -127,6 +243,9 @@ class PropsUIPromptConsentForm:
     description: Optional[Translatable] = None
     donate_question: Optional[Translatable] = None
     donate_button: Optional[Translatable] = None
+    loading: Optional[bool] = False
+
+    cache_serialization = False
 
     def translate_tables(self):
         output = []
@@ -140,19 +259,18 @@ class PropsUIPromptConsentForm:
             output.append(table.toDict())
         return output
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIPromptConsentForm"
-        dict["tables"] = self.translate_tables()
-        dict["metaTables"] = self.translate_meta_tables()
-        dict["description"] = self.description and self.description.toDict()
-        dict["donateQuestion"] = self.donate_question and self.donate_question.toDict()
-        dict["donateButton"] = self.donate_button and self.donate_button.toDict()
-        return dict
-
-
-@dataclass
-class PropsUIPromptFileInput:
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIPromptConsentForm"
+        yield "tables", self.tables
+        yield "metaTables", self.meta_tables
+        yield "description", self.description
+        yield "donateQuestion", self.donate_question
+        yield "donateButton", self.donate_button
+        yield "loading", self.loading
+
+
+@dataclass(frozen=True, slots=True)
+class PropsUIPromptFileInput(Props):
     """Prompt the user to submit a file
 
     Attributes:
@@ -163,12 +281,10 @@ class PropsUIPromptFileInput:
     description: Translatable
     extensions: str
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIPromptFileInput"
-        dict["description"] = self.description.toDict()
-        dict["extensions"] = self.extensions
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIPromptFileInput"
+        yield "description", self.description
+        yield "extensions", self.extensions
 
 
 class RadioItem(TypedDict):
@@ -183,8 +299,8 @@ class RadioItem(TypedDict):
     value: str
 
 
-@dataclass
-class PropsUIPromptRadioInput:
+@dataclass(frozen=True, slots=True)
+class PropsUIPromptRadioInput(Props):
     """Radio group
 
     This radio group can be used get a mutiple choice answer from a user
@@ -199,33 +315,29 @@ class PropsUIPromptRadioInput:
     description: Translatable
     items: list[RadioItem]
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIPromptRadioInput"
-        dict["title"] = self.title.toDict()
-        dict["description"] = self.description.toDict()
-        dict["items"] = self.items
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIPromptRadioInput"
+        yield "title", self.title
+        yield "description", self.description
+        yield "items", self.items
 
 
-@dataclass
-class PropsUIQuestionOpen:
+@dataclass(frozen=True, slots=True)
+class PropsUIQuestionOpen(Props):
     """
     NO DOCS YET
     """
     id: int
     question: Translatable
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIQuestionOpen"
-        dict["id"] = self.id
-        dict["question"] = self.question.toDict()
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIQuestionOpen"
+        yield "id", self.id
+        yield "question", self.question
 
 
-@dataclass
-class PropsUIQuestionMultipleChoiceCheckbox:
+@dataclass(frozen=True, slots=True)
+class PropsUIQuestionMultipleChoiceCheckbox(Props):
     """
     NO DOCS YET
     """
@@ -233,17 +345,15 @@ class PropsUIQuestionMultipleChoiceCheckbox:
     question: Translatable
     choices: list[Translatable]
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIQuestionMultipleChoiceCheckbox"
-        dict["id"] = self.id
-        dict["question"] = self.question.toDict()
-        dict["choices"] = [c.toDict() for c in self.choices]
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIQuestionMultipleChoiceCheckbox"
+        yield "id", self.id
+        yield "question", self.question
+        yield "choices", self.choices
 
 
-@dataclass
-class PropsUIQuestionMultipleChoice:
+@dataclass(frozen=True, slots=True)
+class PropsUIQuestionMultipleChoice(Props):
     """
     NO DOCS YET
     """
@@ -251,33 +361,29 @@ class PropsUIQuestionMultipleChoice:
     question: Translatable
     choices: list[Translatable]
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIQuestionMultipleChoice"
-        dict["id"] = self.id
-        dict["question"] = self.question.toDict()
-        dict["choices"] = [c.toDict() for c in self.choices]
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIQuestionMultipleChoice"
+        yield "id", self.id
+        yield "question", self.question
+        yield "choices", self.choices
 
 
-@dataclass
-class PropsUIPromptQuestionnaire:
+@dataclass(frozen=True, slots=True)
+class PropsUIPromptQuestionnaire(Props):
     """
     NO DOCS YET
     """
     description: Translatable
     questions: list[PropsUIQuestionMultipleChoice | PropsUIQuestionMultipleChoiceCheckbox | PropsUIQuestionOpen]
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIPromptQuestionnaire"
-        dict["description"] = self.description.toDict()
-        dict["questions"] = [q.toDict() for q in self.questions]
-        return dict
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIPromptQuestionnaire"
+        yield "description", self.description
+        yield "questions", self.questions
 
 
-@dataclass
-class PropsUIPageDonation:
+@dataclass(frozen=True, slots=True)
+class PropsUIPageDonation(Props):
     """A multi-purpose page that gets shown to the user
 
     Attributes:
@@ -297,20 +403,20 @@ class PropsUIPageDonation:
     )
     footer: Optional[PropsUIFooter] = None
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIPageDonation"
-        dict["platform"] = self.platform
-        dict["header"] = self.header.toDict()
-        dict["body"] = self.body.toDict()
-        dict["footer"] = self.footer.toDict() if self.footer else None
-        return dict
+    cache_serialization = False
 
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIPageDonation"
+        yield "platform", self.platform
+        yield "header", self.header
+        yield "body", self.body
+        yield "footer", self.footer or None
 
-class PropsUIPageEnd:
+
+class PropsUIPageEnd(Props):
     """An ending page to show the user they are done"""
 
-    def toDict(self):
-        dict = {}
-        dict["__type__"] = "PropsUIPageEnd"
-        return dict
+    __slots__ = ()
+
+    def fields(self) -> Iterator[tuple[str, Any]]:
+        yield "__type__", "PropsUIPageEnd"
@@ -0,0 +1,68 @@
+"""
+Contains a JSON encoder for commands
+
+By default the worker receives command.toDict(), which pyodide converts to a JS object
+node by node, and every table in it is a JSON string that the UI parses again.
+With the JSON transport the worker receives a single JSON string per command instead.
+It is written straight from the fields() of the commands and props, without building
+intermediate dicts, and tables are written into it as they are.
+"""
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Iterable
+import json
+
+from port.api.props import DataFrameJSON, Props
+
+
+def encode(command: Any) -> str:
+    """
+    Encodes a command as JSON
+
+    The result equals json.dumps(command.toDict()), except that the data_frame of a
+    consent form table is a JSON object instead of a string containing one
+    """
+    chunks: list[str] = []
+    write(command, chunks.append)
+    return "".join(chunks)
+
+
+def write(value: Any, out: Callable[[str], Any]) -> None:
+    """
+    Writes value as JSON in chunks to out
+    """
+    if isinstance(value, str):
+        out(encode_basestring_ascii(value))
+    elif value is None:
+        out("null")
+    elif value is True:
+        out("true")
+    elif value is False:
+        out("false")
+    elif isinstance(value, DataFrameJSON):
+        out(value.json())
+    elif isinstance(value, Props):
+        out(value.toJSON())
+    elif hasattr(value, "fields"):
+        write_pairs(value.fields(), out)
+    elif isinstance(value, dict):
+        write_pairs(value.items(), out)
+    elif isinstance(value, (list, tuple)):
+        out("[")
+        for i, item in enumerate(value):
+            if i > 0:
+                out(",")
+            write(item, out)
+        out("]")
+    else:
+        out(json.dumps(value))
+
+
+def write_pairs(pairs: Iterable[tuple[Any, Any]], out: Callable[[str], Any]) -> None:
+    out("{")
+    for i, (key, value) in enumerate(pairs):
+        if i > 0:
+            out(",")
+        out(encode_basestring_ascii(str(key)))
+        out(":")
+        write(value, out)
+    out("}")
@@ -0,0 +1,167 @@
+"""
+Contains a file wrapper that reads a slow file in large blocks
+
+In the browser the zipfile of the participant is mounted on WORKERFS, where every read
+of the file is a synchronous slice of the File object. zipfile does many small reads
+(the central directory, a local header per member, compressed data in small pieces).
+BlockCachedFile turns them into reads of whole aligned blocks, keeps the most recently
+used blocks, and reads several blocks ahead when a file is read from front to back.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, BinaryIO
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Size of a block, a read of the underlying file is a multiple of it
+BLOCK_SIZE = 256 * 1024
+
+# Number of blocks kept, the memory used is at most BLOCK_SIZE * CACHE_BLOCKS
+CACHE_BLOCKS = 64
+
+# Number of blocks read at once when the block after the previous read is needed
+READ_AHEAD_BLOCKS = 8
+
+
+@dataclass
+class ReadCounts:
+    """
+    Attributes:
+        requests: reads asked of the wrapper, the reads that would reach the file without it
+        reads: reads of the underlying file
+        bytes_read: bytes read from the underlying file
+    """
+    requests: int = 0
+    reads: int = 0
+    bytes_read: int = 0
+
+    def add(self, other: "ReadCounts") -> None:
+        self.requests += other.requests
+        self.reads += other.reads
+        self.bytes_read += other.bytes_read
+
+
+class BlockCachedFile(io.RawIOBase):
+    """
+    Read-only, seekable file that reads the file raw in blocks of block_size
+
+    The max_blocks least recently used blocks are kept. A read that is larger than the
+    cache goes to the file directly. The counts are added to TOTALS when the file is closed.
+    """
+
+    def __init__(
+        self,
+        raw: BinaryIO,
+        block_size: int = BLOCK_SIZE,
+        max_blocks: int = CACHE_BLOCKS,
+        read_ahead: int = READ_AHEAD_BLOCKS,
+    ):
+        self.raw = raw
+        self.block_size = block_size
+        self.max_blocks = max(max_blocks, 1)
+        self.read_ahead = min(max(read_ahead, 1), self.max_blocks)
+        self.size = raw.seek(0, io.SEEK_END)
+        self.counts = ReadCounts()
+        self._blocks: OrderedDict[int, bytes | bytearray] = OrderedDict()
+        self._next_block = -1
+        self._pos = 0
+
+    @classmethod
+    def open(cls, path: str, **kwargs: Any) -> "BlockCachedFile":
+        return cls(open(path, "rb", buffering=0), **kwargs)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._pos = offset
+        return self._pos
+
+    def readinto(self, buffer: Any) -> int:
+        n = min(len(buffer), self.size - self._pos)
+        if n <= 0:
+            return 0
+
+        self.counts.requests += 1
+        with memoryview(buffer) as view:
+            view = view.cast("B")
+            if n >= self.block_size * self.max_blocks:
+                self._fetch_into(self._pos, view[:n])
+            else:
+                done = 0
+                while done < n:
+                    index, offset = divmod(self._pos + done, self.block_size)
+                    with memoryview(self._block(index)) as block:
+                        chunk = block[offset:offset + n - done]
+                        view[done:done + len(chunk)] = chunk
+                    done += len(chunk)
+
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            TOTALS.add(self.counts)
+            logger.debug("%s requests served with %s reads", self.counts.requests, self.counts.reads)
+            self._blocks.clear()
+            self.raw.close()
+        super().close()
+
+    def _block(self, index: int) -> bytes | bytearray:
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+
+        # Read ahead if the file is read from front to back, up to the next block that is kept
+        count = self.read_ahead if index == self._next_block else 1
+        end = index + 1
+        while end < index + count and end not in self._blocks and end * self.block_size < self.size:
+            end += 1
+
+        start = index * self.block_size
+        data = bytearray(min((end - index) * self.block_size, self.size - start))
+        self._fetch_into(start, memoryview(data))
+
+        # Blocks read ahead are copied out, a view would keep the whole read alive until its last block is evicted
+        if end - index == 1:
+            self._blocks[index] = data
+        else:
+            with memoryview(data) as view:
+                for i in range(index, end):
+                    offset = (i - index) * self.block_size
+                    self._blocks[i] = bytes(view[offset:offset + self.block_size])
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+        self._next_block = end
+        return self._blocks[index]
+
+    def _fetch_into(self, start: int, view: memoryview) -> None:
+        self.raw.seek(start)
+        done = 0
+        while done < len(view):
+            self.counts.reads += 1
+            n = self.raw.readinto(view[done:])
+            if not n:
+                raise EOFError(f"File ended at {start + done} instead of {start + len(view)}")
+            done += n
+        self.counts.bytes_read += done
+
+
+# Counts of the files closed in the current session, replaced by port.main.start
+TOTALS = ReadCounts()
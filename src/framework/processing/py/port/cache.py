@@ -0,0 +1,93 @@
+"""
+Contains a cache of results keyed by the content of a zipfile
+
+Participants often select the same zipfile again, after a retry or when the flow
+is started again in the same worker. The fingerprint of a zipfile is computed from
+its central directory only (the name, CRC and sizes of every member), which takes
+milliseconds, while validation reads the members.
+A zipfile with the same fingerprint gets the results of the earlier submission.
+
+Extracted tables are not kept: a submission that passes validation goes on to the
+consent form, the worker does not ask for a zipfile again after that.
+"""
+from collections import OrderedDict
+from typing import Any, Callable
+import hashlib
+import logging
+import zipfile
+
+import port.unzipddp as unzipddp
+
+logger = logging.getLogger(__name__)
+
+
+def zip_fingerprint(zfile: str) -> str | None:
+    """
+    Hash of the central directory of a zipfile, None if it is not a readable zipfile
+    """
+    try:
+        digest = hashlib.sha256()
+        with unzipddp.open_zipfile(zfile) as zf:
+            for info in zf.infolist():
+                entry = f"{info.filename}\0{info.CRC}\0{info.file_size}\0{info.compress_size}\n"
+                digest.update(entry.encode("utf8", "surrogateescape"))
+
+        return digest.hexdigest()
+
+    except (zipfile.BadZipFile, OSError) as e:
+        logger.info("Could not fingerprint %s: %s", zfile, e)
+        return None
+
+
+class ResultCache:
+    """
+    Results per zipfile fingerprint, the least recently used fingerprints are dropped first
+
+    Every fingerprint holds results by kind, for example "validation".
+    Results are shared between submissions, they should not be changed after they are stored.
+
+    Attributes:
+        max_entries: number of fingerprints to keep, 0 disables the cache
+        hits: number of results served from the cache
+        misses: number of results that had to be computed
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    def get(self, fingerprint: str | None, kind: str) -> Any | None:
+        if fingerprint is None or fingerprint not in self._entries:
+            return None
+
+        self._entries.move_to_end(fingerprint)
+        return self._entries[fingerprint].get(kind)
+
+    def put(self, fingerprint: str | None, kind: str, value: Any) -> None:
+        if fingerprint is None or self.max_entries <= 0:
+            return
+
+        self._entries.setdefault(fingerprint, {})[kind] = value
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def cached(self, fingerprint: str | None, kind: str, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the stored result, or computes and stores it
+        """
+        value = self.get(fingerprint, kind)
+        if value is not None:
+            self.hits += 1
+            logger.info("Reusing %s of an earlier submission of the same zipfile", kind)
+            return value
+
+        self.misses += 1
+        value = compute()
+        self.put(fingerprint, kind, value)
+        return value
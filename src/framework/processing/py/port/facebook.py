@@ -4,17 +4,21 @@ DDP facebook module
 
 This module contains functions to handle *.jons files contained within a facebook ddp
 """
+from collections import Counter
 from pathlib import Path
 from typing import Any, Tuple
+import functools
 import math
 import logging
+import sys
 import zipfile
 import re
 
-import pandas as pd
-
 import port.unzipddp as unzipddp
+import port.htmlddp as htmlddp
 import port.helpers as helpers
+from port.scheduler import TableBudget, UNLIMITED
+from port.table import Table
 from port.validate import (
     DDPCategory,
     StatusCode,
@@ -25,24 +29,37 @@ from port.validate import (
 
 logger = logging.getLogger(__name__)
 
-DDP_CATEGORIES = [
-    DDPCategory(
-        id="json_en",
-        ddp_filetype=DDPFiletype.JSON,
-        language=Language.EN,
-        known_files=[
+
+@functools.cache
+def ddp_categories() -> list[DDPCategory]:
+    """
+    The known files per DDP category, built the first time a zipfile is validated
+    """
+    return [
+        DDPCategory(
+            id="json_en",
+            ddp_filetype=DDPFiletype.JSON,
+            language=Language.EN,
+            known_files=[
 "subscription_for_no_ads.json", "other_categories_used_to_reach_you.json", "ads_feedback_activity.json", "ads_personalization_consent.json", "advertisers_you've_interacted_with.json", "advertisers_using_your_activity_or_information.json", "story_views_in_past_7_days.json", "ad_preferences.json", "groups_you've_searched_for.json", "your_search_history.json", "primary_public_location.json", "timezone.json", "primary_location.json", "your_privacy_jurisdiction.json", "people_and_friends.json", "ads_interests.json", "notifications.json", "notification_of_meta_privacy_policy_update.json", "recently_viewed.json", "recently_visited.json", "your_avatar.json", "meta_avatars_post_backgrounds.json", "contacts_sync_settings.json", "timezone.json", "autofill_information.json", "profile_information.json", "profile_update_history.json", "your_transaction_survey_information.json", "your_recently_followed_history.json", "your_recently_used_emojis.json", "no-data.txt", "navigation_bar_activity.json", "pages_and_profiles_you_follow.json", "pages_you've_liked.json", "your_saved_items.json", "fundraiser_posts_you_likely_viewed.json", "your_fundraiser_donations_information.json", "your_event_responses.json", "event_invitations.json", "your_event_invitation_links.json", "likes_and_reactions_1.json", "your_uncategorized_photos.json", "payment_history.json", "no-data.txt", "your_answers_to_membership_questions.json", "your_group_membership_activity.json", "your_contributions.json", "group_posts_and_comments.json", "your_comments_in_groups.json", "instant_games.json", "your_page_or_groups_badges.json", "instant_games_usage_data.json", "no-data.txt", "who_you've_followed.json", "people_you_may_know.json", "received_friend_requests.json", "your_friends.json",
-        ],
-    ),
-    DDPCategory(
-        id="html_en",
-        ddp_filetype=DDPFiletype.HTML,
-        language=Language.EN,
-        known_files=[
+            ],
+        ),
+        DDPCategory(
+            id="html_en",
+            ddp_filetype=DDPFiletype.HTML,
+            language=Language.EN,
+            known_files=[
 "subscription_for_no_ads.html", "other_categories_used_to_reach_you.html", "ads_feedback_activity.html", "ads_personalization_consent.html", "advertisers_you've_interacted_with.html", "advertisers_using_your_activity_or_information.html", "story_views_in_past_7_days.html", "ad_preferences.html", "groups_you've_searched_for.html", "your_search_history.html", "primary_public_location.html", "timezone.html", "primary_location.html", "your_privacy_jurisdiction.html", "people_and_friends.html", "ads_interests.html", "notifications.html", "notification_of_meta_privacy_policy_update.html", "recently_viewed.html", "recently_visited.html", "your_avatar.html", "meta_avatars_post_backgrounds.html", "contacts_sync_settings.html", "timezone.html", "autofill_information.html", "profile_information.html", "profile_update_history.html", "your_transaction_survey_information.html", "your_recently_followed_history.html", "your_recently_used_emojis.html", "no-data.txt", "navigation_bar_activity.html", "pages_and_profiles_you_follow.html", "pages_you've_liked.html", "your_saved_items.html", "fundraiser_posts_you_likely_viewed.html", "your_fundraiser_donations_information.html", "your_event_responses.html", "event_invitations.html", "your_event_invitation_links.html", "likes_and_reactions_1.html", "your_uncategorized_photos.html", "payment_history.html", "no-data.txt", "your_answers_to_membership_questions.html", "your_group_membership_activity.html", "your_contributions.html", "group_posts_and_comments.html", "your_comments_in_groups.html", "instant_games.html", "your_page_or_groups_badges.html", "instant_games_usage_data.html", "no-data.txt", "who_you've_followed.html", "people_you_may_know.html", "received_friend_requests.html", "your_friends.html",
-        ],
-    )
-]
+            ],
+        )
+    ]
+
+
+def __getattr__(name: str) -> Any:
+    # DDP_CATEGORIES is built on first access, see ddp_categories()
+    if name == "DDP_CATEGORIES":
+        return ddp_categories()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 STATUS_CODES = [
@@ -57,11 +74,11 @@ def validate(zfile: Path) -> ValidateInput:
     Validates the input of an Instagram zipfile
     """
 
-    validation = ValidateInput(STATUS_CODES, DDP_CATEGORIES)
+    validation = ValidateInput(STATUS_CODES, ddp_categories())
 
     try:
         paths = []
-        with zipfile.ZipFile(zfile, "r") as zf:
+        with unzipddp.open_zipfile(zfile) as zf:
             for f in zf.namelist():
                 p = Path(f)
                 if p.suffix in (".html", ".json"):
@@ -82,24 +99,22 @@ def validate(zfile: Path) -> ValidateInput:
 #################################################################################################
 # NEW CODE
 
-def who_youve_followed_to_df(facebook_zip: str) -> pd.DataFrame:
+def who_youve_followed_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
 
-    b = unzipddp.extract_file_from_zip(facebook_zip, "who_you've_followed.json")
-    d = unzipddp.read_json_from_bytes(b)
+    d = unzipddp.read_json_from_zip(facebook_zip, "who_you've_followed.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(1)
 
     try:
         items = d["following_v3"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
                 helpers.fix_latin1_string(item.get("name", "")),
                 helpers.epoch_to_iso(item.get("timestamp", {}))
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 1))
-        out = pd.DataFrame(datapoints_sorted, columns=["Name", "Timestamp"])
+        out = datapoints.to_table(["Name", "Timestamp"], sort_by=1)
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -107,19 +122,18 @@ def who_youve_followed_to_df(facebook_zip: str) -> pd.DataFrame:
     return out
 
 
-def your_friends_to_df(facebook_zip: str) -> pd.DataFrame:
+def your_friends_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
 
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_friends.json")
-    d = unzipddp.read_json_from_bytes(b)
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_friends.json")
 
-    out = pd.DataFrame()
+    out = Table()
     datapoints = []
 
     try:
         items = d["friends_v2"]  # pyright: ignore
         datapoints.append((len(items)))
 
-        out = pd.DataFrame(datapoints, columns=["Aantal vrienden op facebook"])
+        out = Table.from_rows(datapoints, ["Aantal vrienden op facebook"])
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -128,21 +142,20 @@ def your_friends_to_df(facebook_zip: str) -> pd.DataFrame:
 
 
 
-def ads_interests_to_df(facebook_zip: str) -> pd.DataFrame:
+def ads_interests_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
 
-    b = unzipddp.extract_file_from_zip(facebook_zip, "ads_interests.json")
-    d = unzipddp.read_json_from_bytes(b)
+    d = unzipddp.read_json_from_zip(facebook_zip, "ads_interests.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows()
 
     try:
         items = d["topics_v2"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items):
             datapoints.append((
                 helpers.fix_latin1_string(item),
             ))
-        out = pd.DataFrame(datapoints, columns=["Ad"])
+        out = datapoints.to_table(["Ad"])
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -151,21 +164,21 @@ def ads_interests_to_df(facebook_zip: str) -> pd.DataFrame:
 
 
 
-def recently_viewed_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "recently_viewed.json")
-    d = unzipddp.read_json_from_bytes(b)
+def recently_viewed_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "recently_viewed.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(3)
 
     try:
         items = d["recently_viewed"] # pyright: ignore
         for item in items:
 
             if "entries" in item:
-                for entry in item["entries"]:
+                watched = helpers.fix_latin1_string_interned(item.get("name", ""))
+                for entry in budget.records(item["entries"], "timestamp"):
                     datapoints.append((
-                        helpers.fix_latin1_string(item.get("name", "")),
+                        watched,
                         helpers.fix_latin1_string(entry.get("data", {}).get("name", "")),
                         entry.get("data", {}).get("uri", ""),
                         helpers.epoch_to_iso(entry.get("timestamp", ""))
@@ -174,16 +187,17 @@ def recently_viewed_to_df(facebook_zip: str) -> pd.DataFrame:
             # The nesting goes deeper
             if "children" in item:
                 for child in item["children"]:
-                    for entry in child["entries"]:
+                    watched = helpers.fix_latin1_string_interned(child.get("name", ""))
+                    for entry in budget.records(child["entries"], "timestamp"):
                         datapoints.append((
-                            helpers.fix_latin1_string(child.get("name", "")),
+                            watched,
                             helpers.fix_latin1_string(entry.get("data", {}).get("name", "")),
                             entry.get("data", {}).get("uri", ""),
                             helpers.epoch_to_iso(entry.get("timestamp", ""))
                         ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 3))
-        out = pd.DataFrame(datapoints_sorted, columns=["Watched", "Name", "Link", "Date"])
+        out = datapoints.to_table(["Watched", "Name", "Link", "Date"], sort_by=3)
+        out = helpers.categorize(out, ["Watched"])
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -192,18 +206,17 @@ def recently_viewed_to_df(facebook_zip: str) -> pd.DataFrame:
 
 
 
-def recently_visited_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "recently_visited.json")
-    d = unzipddp.read_json_from_bytes(b)
+def recently_visited_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "recently_visited.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(3)
 
     try:
         items = d["visited_things_v2"]  # pyright: ignore
         for item in items:
             if "entries" in item:
-                for entry in item["entries"]:
+                for entry in budget.records(item["entries"], "timestamp"):
                     datapoints.append((
                         item.get("name", ""),
                         helpers.fix_latin1_string(entry.get("data", {}).get("name", "")),
@@ -211,8 +224,8 @@ def recently_visited_to_df(facebook_zip: str) -> pd.DataFrame:
                         helpers.epoch_to_iso(entry.get("timestamp", ""))
                     ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 3))
-        out = pd.DataFrame(datapoints_sorted, columns=["Watched", "Name", "Link", "Date"])
+        out = datapoints.to_table(["Watched", "Name", "Link", "Date"], sort_by=3)
+        out = helpers.categorize(out, ["Watched"])
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -221,12 +234,11 @@ def recently_visited_to_df(facebook_zip: str) -> pd.DataFrame:
 
 
 
-def profile_information_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "profile_information.json")
-    d = unzipddp.read_json_from_bytes(b)
+def profile_information_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "profile_information.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows()
 
     try:
         items = d["profile_v2"]  # pyright: ignore
@@ -236,7 +248,7 @@ def profile_information_to_df(facebook_zip: str) -> pd.DataFrame:
             ", ".join(items.get("gender", {}).get("custom_genders", []))
         ))
 
-        out = pd.DataFrame(datapoints, columns=["Gender", "Pronoun", "Custom genders"])
+        out = datapoints.to_table(["Gender", "Pronoun", "Custom genders"])
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -245,47 +257,43 @@ def profile_information_to_df(facebook_zip: str) -> pd.DataFrame:
 
 
 
-def profile_update_history_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "profile_update_history.json")
-    d = unzipddp.read_json_from_bytes(b)
+def profile_update_history_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "profile_update_history.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(1)
 
     try:
         items = d["profile_updates_v2"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
                 helpers.fix_latin1_string(item.get("title", "")),
                 helpers.epoch_to_iso(item.get("timestamp", ""))
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 1))
-        out = pd.DataFrame(datapoints_sorted, columns=["Title", "Timestamp"])
+        out = datapoints.to_table(["Title", "Timestamp"], sort_by=1)
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
     return out
 
 
-def your_event_responses_to_df(facebook_zip: str) -> pd.DataFrame:
+def your_event_responses_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
 
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_event_responses.json")
-    d = unzipddp.read_json_from_bytes(b)
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_event_responses.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(1)
 
     try:
         items = d["event_responses_v2"]["events_joined"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items, "start_timestamp"):
             datapoints.append((
                 helpers.fix_latin1_string(item.get("name", "")),
                 helpers.epoch_to_iso(item.get("start_timestamp", ""))
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 1))
-        out = pd.DataFrame(datapoints_sorted, columns=["Name", "Timestamp"])
+        out = datapoints.to_table(["Name", "Timestamp"], sort_by=1)
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -293,34 +301,31 @@ def your_event_responses_to_df(facebook_zip: str) -> pd.DataFrame:
     return out
 
 
-def group_posts_and_comments_to_df(facebook_zip: str, redact) -> pd.DataFrame:
+def group_posts_and_comments_to_df(facebook_zip: str, redact, budget: TableBudget = UNLIMITED) -> Table:
 
-    b = unzipddp.extract_file_from_zip(facebook_zip, "group_posts_and_comments.json")
-    d = unzipddp.read_json_from_bytes(b)
+    d = unzipddp.read_json_from_zip(facebook_zip, "group_posts_and_comments.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(2)
 
     try:
         l = d["group_posts_v2"]  # pyright: ignore
-        for item in l:
-            denested_dict = helpers.dict_denester(item)
-
+        for item in budget.records(l, "timestamp"):
             datapoints.append((
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "title")),
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "post")),
-                helpers.epoch_to_iso(helpers.find_item(denested_dict, "timestamp")),
-                helpers.find_item(denested_dict, "url"),
+                helpers.fix_latin1_string(helpers.find_nested(item, "title")),
+                helpers.fix_latin1_string(helpers.find_nested(item, "post")),
+                helpers.epoch_to_iso(helpers.find_nested(item, "timestamp")),
+                helpers.find_nested(item, "url"),
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 2))
-        out = pd.DataFrame(datapoints_sorted, columns=["Title", "Post", "Date", "Url"])
+        out = datapoints.to_table(["Title", "Post", "Date", "Url"], sort_by=2)
 
         # Redact block
         recipients = get_recipient_name(out, "Title")
         remove = [*redact, *recipients]
         out["Title"] = replace_in_col(out, "Title", remove)
         out["Post"] = replace_in_col(out, "Post", remove)
+        out = helpers.categorize(out, ["Title"])
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -329,22 +334,21 @@ def group_posts_and_comments_to_df(facebook_zip: str, redact) -> pd.DataFrame:
 
 
 
-def your_answers_to_membership_questions_to_df(facebook_zip: str) -> pd.DataFrame:
+def your_answers_to_membership_questions_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
 
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_answers_to_membership_questions.json")
-    d = unzipddp.read_json_from_bytes(b)
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_answers_to_membership_questions.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows()
 
     try:
                   
         items = d["group_membership_questions_answers_v2"]["group_answers"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items):
             datapoints.append((
                 helpers.fix_latin1_string(item.get("group_name", "")),
             ))
-        out = pd.DataFrame(datapoints, columns=["Group name"])
+        out = datapoints.to_table(["Group name"])
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -353,34 +357,31 @@ def your_answers_to_membership_questions_to_df(facebook_zip: str) -> pd.DataFram
 
 
 
-def your_comments_in_groups_to_df(facebook_zip: str, redact: list[str]) -> pd.DataFrame:
+def your_comments_in_groups_to_df(facebook_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
 
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_comments_in_groups.json")
-    d = unzipddp.read_json_from_bytes(b)
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_comments_in_groups.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(3)
 
     try:
         l = d["group_comments_v2"]  # pyright: ignore
-        for item in l:
-            denested_dict = helpers.dict_denester(item)
-
+        for item in budget.records(l, "timestamp"):
             datapoints.append((
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "title")),
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "comment-comment")),
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "group")),
-                helpers.epoch_to_iso(helpers.find_item(denested_dict, "timestamp")),
+                helpers.fix_latin1_string(helpers.find_nested(item, "title")),
+                helpers.fix_latin1_string(helpers.find_nested(item, "comment-comment")),
+                helpers.fix_latin1_string_interned(helpers.find_nested(item, "group")),
+                helpers.epoch_to_iso(helpers.find_nested(item, "timestamp")),
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 3))
-        out = pd.DataFrame(datapoints_sorted, columns=["Title", "Comment", "Group", "Timestamp"])
+        out = datapoints.to_table(["Title", "Comment", "Group", "Timestamp"], sort_by=3)
 
         # Redact block
         recipients = get_recipient_name(out, "Title")
         remove = [*redact, *recipients]
         out["Title"] = replace_in_col(out, "Title", remove)
         out["Comment"] = replace_in_col(out, "Group", remove)
+        out = helpers.categorize(out, ["Title", "Group"])
 
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -389,29 +390,27 @@ def your_comments_in_groups_to_df(facebook_zip: str, redact: list[str]) -> pd.Da
 
 
 
-def your_group_membership_activity_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_group_membership_activity.json")
-    d = unzipddp.read_json_from_bytes(b)
+def your_group_membership_activity_to_df(facebook_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_group_membership_activity.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(2)
 
     try:
         items = d["groups_joined_v2"]  # pyright: ignore
-        for item in items:
-            denested_dict = helpers.dict_denester(item)
-
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "title")),
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "name")),
-                helpers.epoch_to_iso(helpers.find_item(denested_dict, "timestamp")),
+                helpers.fix_latin1_string(helpers.find_nested(item, "title")),
+                helpers.fix_latin1_string_interned(helpers.find_nested(item, "name")),
+                helpers.epoch_to_iso(helpers.find_nested(item, "timestamp")),
             ))
 
+        out = datapoints.to_table(["Title", "Group name", "Timestamp"], sort_by=2)
 
+        # Redact block
+        out["Title"] = replace_in_col(out, "Title", redact)
+        out = helpers.categorize(out, ["Group name"])
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 2))
-        out = pd.DataFrame(datapoints_sorted, columns=["Title", "Group name", "Timestamp"])
-        
     except Exception as e:
         logger.error("Exception caught: %s", e)
 
@@ -419,22 +418,21 @@ def your_group_membership_activity_to_df(facebook_zip: str) -> pd.DataFrame:
 
 
 
-def pages_and_profiles_you_follow_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "pages_and_profiles_you_follow.json")
-    d = unzipddp.read_json_from_bytes(b)
+def pages_and_profiles_you_follow_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "pages_and_profiles_you_follow.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(1)
 
     try:
         items = d["pages_followed_v2"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
                 helpers.fix_latin1_string(item.get("title", "")),
                 helpers.epoch_to_iso(item.get("timestamp", ""))
             ))
 
-        out = pd.DataFrame(datapoints, columns=["Title", "Timestamp"])
+        out = datapoints.to_table(["Title", "Timestamp"])
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -442,24 +440,22 @@ def pages_and_profiles_you_follow_to_df(facebook_zip: str) -> pd.DataFrame:
     return out
 
 
-def pages_youve_liked_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "pages_you've_liked.json")
-    d = unzipddp.read_json_from_bytes(b)
+def pages_youve_liked_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "pages_you've_liked.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(2)
 
     try:
         items = d["page_likes_v2"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
                 helpers.fix_latin1_string(item.get("name", "")),
                 item.get("url", ""),
                 helpers.epoch_to_iso(item.get("timestamp", ""))
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 2))
-        out = pd.DataFrame(datapoints_sorted, columns=["Name", "Url", "Timestamp"])
+        out = datapoints.to_table(["Name", "Url", "Timestamp"], sort_by=2)
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -467,23 +463,21 @@ def pages_youve_liked_to_df(facebook_zip: str) -> pd.DataFrame:
     return out
 
 
-def your_saved_items_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_saved_items.json")
-    d = unzipddp.read_json_from_bytes(b)
+def your_saved_items_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_saved_items.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(1)
 
     try:
         items = d["saves_v2"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
                 helpers.fix_latin1_string(item.get("title", "")),
                 helpers.epoch_to_iso(item.get("timestamp", ""))
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 1))
-        out = pd.DataFrame(datapoints_sorted, columns=["Title", "Timestamp"])
+        out = datapoints.to_table(["Title", "Timestamp"], sort_by=1)
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -491,26 +485,22 @@ def your_saved_items_to_df(facebook_zip: str) -> pd.DataFrame:
     return out
 
 
-def your_search_history_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_search_history.json")
-    d = unzipddp.read_json_from_bytes(b)
+def your_search_history_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_search_history.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(2)
 
     try:
         items = d["searches_v2"]  # pyright: ignore
-        for item in items:
-            denested_dict = helpers.dict_denester(item)
-
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "title")),
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "text")),
-                helpers.epoch_to_iso(helpers.find_item(denested_dict, "timestamp")),
+                helpers.fix_latin1_string(helpers.find_nested(item, "title")),
+                helpers.fix_latin1_string(helpers.find_nested(item, "text")),
+                helpers.epoch_to_iso(helpers.find_nested(item, "timestamp")),
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 2))
-        out = pd.DataFrame(datapoints_sorted, columns=["Title", "Text", "Timestamp"])
+        out = datapoints.to_table(["Title", "Text", "Timestamp"], sort_by=2)
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -518,26 +508,22 @@ def your_search_history_to_df(facebook_zip: str) -> pd.DataFrame:
     return out
 
 
-def comments_to_df(facebook_zip: str, redact: list[str]) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "comments.json")
-    d = unzipddp.read_json_from_bytes(b)
+def comments_to_df(facebook_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "comments.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(2)
 
     try:
         items = d["comments_v2"]  # pyright: ignore
-        for item in items:
-            denested_dict = helpers.dict_denester(item)
-
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "title")),
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "comment-comment")),
-                helpers.epoch_to_iso(helpers.find_item(denested_dict, "timestamp")),
+                helpers.fix_latin1_string(helpers.find_nested(item, "title")),
+                helpers.fix_latin1_string(helpers.find_nested(item, "comment-comment")),
+                helpers.epoch_to_iso(helpers.find_nested(item, "timestamp")),
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 2))
-        out = pd.DataFrame(datapoints_sorted, columns=["Title", "Comment", "Timestamp"])
+        out = datapoints.to_table(["Title", "Comment", "Timestamp"], sort_by=2)
         recipients = get_recipient_name(out, "Title")
 
         # Redact block
@@ -545,6 +531,7 @@ def comments_to_df(facebook_zip: str, redact: list[str]) -> pd.DataFrame:
         remove = [*redact, *recipients]
         out["Title"] = replace_in_col(out, "Title", remove)
         out["Comment"] = replace_in_col(out, "Comment", remove)
+        out = helpers.categorize(out, ["Title"])
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -553,40 +540,36 @@ def comments_to_df(facebook_zip: str, redact: list[str]) -> pd.DataFrame:
 
 
 
-def likes_and_reactions_to_df(instagram_zip: str, redact: list[str]) -> pd.DataFrame:
+def likes_and_reactions_to_df(instagram_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
     """
     likes_and_reactions_x
     """
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(2)
     i = 1
 
-    while True:
-        b = unzipddp.extract_file_from_zip(instagram_zip, f"likes_and_reactions_{i}.json")
-        d = unzipddp.read_json_from_bytes(b)
+    while not budget.expired():
+        d = unzipddp.read_json_from_zip(instagram_zip, f"likes_and_reactions_{i}.json")
 
         if not d:
             break
 
         try:
-            for item in d:
-                denested_dict = helpers.dict_denester(item)
-
+            for item in budget.records(d, "timestamp"):
                 datapoints.append((
-                    helpers.fix_latin1_string(helpers.find_item(denested_dict, "title")),
-                    helpers.fix_latin1_string(helpers.find_item(denested_dict, "reaction-reaction")),
-                    helpers.epoch_to_iso(helpers.find_item(denested_dict, "timestamp")),
+                    helpers.fix_latin1_string_interned(helpers.find_nested(item, "title")),
+                    helpers.fix_latin1_string_interned(helpers.find_nested(item, "reaction-reaction")),
+                    helpers.epoch_to_iso(helpers.find_nested(item, "timestamp")),
                 ))
 
             i += 1
 
         except Exception as e:
             logger.error("Exception caught: %s", e)
-            return pd.DataFrame()
+            return Table()
 
-    datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 2))
-    out = pd.DataFrame(datapoints_sorted, columns=["Title", "Reaction", "Timestamp"])
+    out = datapoints.to_table(["Title", "Reaction", "Timestamp"], sort_by=2)
 
     try:
         # Redact block
@@ -596,26 +579,27 @@ def likes_and_reactions_to_df(instagram_zip: str, redact: list[str]) -> pd.DataF
     except Exception as e:
         return out
 
+    out = helpers.categorize(out, ["Title", "Reaction"])
+
     return out
 
 
 
-def your_comment_active_days_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_comment_active_days.json")
-    d = unzipddp.read_json_from_bytes(b)
+def your_comment_active_days_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_comment_active_days.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows()
 
     try:
         items = d["label_values"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items):
             datapoints.append((
                 item.get("label", ""),
                 item.get("value", ""),
             ))
 
-        out = pd.DataFrame(datapoints, columns=["Label", "Value"])
+        out = datapoints.to_table(["Label", "Value"])
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -624,24 +608,22 @@ def your_comment_active_days_to_df(facebook_zip: str) -> pd.DataFrame:
 
 
 
-def your_pages_to_df(facebook_zip: str) -> pd.DataFrame:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_pages.json")
-    d = unzipddp.read_json_from_bytes(b)
+def your_pages_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    d = unzipddp.read_json_from_zip(facebook_zip, "your_pages.json")
 
-    out = pd.DataFrame()
-    datapoints = []
+    out = Table()
+    datapoints = budget.rows(2)
 
     try:
         items = d["pages_v2"]  # pyright: ignore
-        for item in items:
+        for item in budget.records(items, "timestamp"):
             datapoints.append((
                 helpers.fix_latin1_string(item.get("name", "")),
                 item.get("url", ""),
                 helpers.epoch_to_iso(item.get("timestamp", "")),
             ))
 
-        datapoints_sorted = sorted(datapoints, key= lambda x: helpers.generate_key_for_sorting_from_timestamp_in_tuple(x, 2))
-        out = pd.DataFrame(datapoints_sorted, columns=["Name", "Url", "Timestamp"])
+        out = datapoints.to_table(["Name", "Url", "Timestamp"], sort_by=2)
         
     except Exception as e:
         logger.error("Exception caught: %s", e)
@@ -649,29 +631,274 @@ def your_pages_to_df(facebook_zip: str) -> pd.DataFrame:
     return out
 
 
-# NOTE: WHICH FILE DO I NEED TO USE TO BASE THE GROUP EXTRACTION ON
-# ANSWER: your_group_membership_activity.json
-def groups_to_list(facebook_zip: str) -> list[str]:
-    b = unzipddp.extract_file_from_zip(facebook_zip, "your_group_membership_activity.json")
-    d = unzipddp.read_json_from_bytes(b)
+#################################################################################################
+# HTML exports
+# Same tables as the json extractors above, built from the records of port.htmlddp
+# Timestamps are in the local time of the participant, the export does not contain a timezone
 
-    out = []
+def _first(values: list[str]) -> str:
+    return values[0] if values else ""
+
+
+def _group_from_title(title: str) -> str:
+    """
+    The group in titles like "... commented on a post in <group>." or "... became a member of <group>."
+    """
+    match = re.search(r"(?: in | member of )(.+?)\.?$", title)
+    return match.group(1) if match else ""
+
+
+def who_youve_followed_html_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+    datapoints = budget.rows(1)
 
     try:
-        items = d["groups_joined_v2"]  # pyright: ignore
-        for item in items:
-            denested_dict = helpers.dict_denester(item)
+        for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "who_you've_followed.html"), "timestamp"):
+            datapoints.append((record["title"], record["time"]))
+
+        out = datapoints.to_table(["Name", "Timestamp"], sort_by=1)
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+def your_friends_html_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+
+    try:
+        n = sum(1 for _ in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "your_friends.html")))
+        if n > 0:
+            out = Table.from_rows([n], ["Aantal vrienden op facebook"])
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+def your_event_responses_html_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+    datapoints = budget.rows(1)
+
+    try:
+        for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "your_event_responses.html"), "timestamp"):
+            datapoints.append((record["title"], record["time"]))
+
+        out = datapoints.to_table(["Name", "Timestamp"], sort_by=1)
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+def group_posts_and_comments_html_to_df(facebook_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+    datapoints = budget.rows(2)
+
+    try:
+        for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "group_posts_and_comments.html"), "timestamp"):
+            datapoints.append((
+                record["title"],
+                " ".join(record["texts"]),
+                record["time"],
+                _first(record["links"]),
+            ))
+
+        out = datapoints.to_table(["Title", "Post", "Date", "Url"], sort_by=2)
+
+        # Redact block
+        recipients = get_recipient_name(out, "Title")
+        remove = [*redact, *get_actor_name(out, "Title"), *recipients]
+        out["Title"] = replace_in_col(out, "Title", remove)
+        out["Post"] = replace_in_col(out, "Post", remove)
+        out = helpers.categorize(out, ["Title"])
 
-            out.append(
-                helpers.fix_latin1_string(helpers.find_item(denested_dict, "name"))
-            )
-            out = list(set(out))
-        
     except Exception as e:
         logger.error("Exception caught: %s", e)
 
     return out
 
+
+def your_comments_in_groups_html_to_df(facebook_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+    datapoints = budget.rows(3)
+
+    try:
+        for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "your_comments_in_groups.html"), "timestamp"):
+            datapoints.append((
+                record["title"],
+                " ".join(record["texts"]),
+                sys.intern(_group_from_title(record["title"])),
+                record["time"],
+            ))
+
+        out = datapoints.to_table(["Title", "Comment", "Group", "Timestamp"], sort_by=3)
+
+        # Redact block
+        recipients = get_recipient_name(out, "Title")
+        remove = [*redact, *get_actor_name(out, "Title"), *recipients]
+        out["Title"] = replace_in_col(out, "Title", remove)
+        out["Comment"] = replace_in_col(out, "Comment", remove)
+        out = helpers.categorize(out, ["Title", "Group"])
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+def your_group_membership_activity_html_to_df(facebook_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+    datapoints = budget.rows(2)
+
+    try:
+        for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "your_group_membership_activity.html"), "timestamp"):
+            datapoints.append((
+                record["title"],
+                sys.intern(_group_from_title(record["title"])),
+                record["time"],
+            ))
+
+        out = datapoints.to_table(["Title", "Group name", "Timestamp"], sort_by=2)
+
+        # Redact block
+        out["Title"] = replace_in_col(out, "Title", [*redact, *get_actor_name(out, "Title")])
+        out = helpers.categorize(out, ["Group name"])
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+def pages_youve_liked_html_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+    datapoints = budget.rows(2)
+
+    try:
+        for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "pages_you've_liked.html"), "timestamp"):
+            datapoints.append((
+                _first(record["texts"]) or record["title"],
+                _first(record["links"]),
+                record["time"],
+            ))
+
+        out = datapoints.to_table(["Name", "Url", "Timestamp"], sort_by=2)
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+def comments_html_to_df(facebook_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+    datapoints = budget.rows(2)
+
+    try:
+        for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "comments.html"), "timestamp"):
+            datapoints.append((
+                record["title"],
+                " ".join(record["texts"]),
+                record["time"],
+            ))
+
+        out = datapoints.to_table(["Title", "Comment", "Timestamp"], sort_by=2)
+
+        # Redact block
+        recipients = get_recipient_name(out, "Title")
+        remove = [*redact, *get_actor_name(out, "Title"), *recipients]
+        out["Title"] = replace_in_col(out, "Title", remove)
+        out["Comment"] = replace_in_col(out, "Comment", remove)
+        out = helpers.categorize(out, ["Title"])
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+def likes_and_reactions_html_to_df(facebook_zip: str, redact: list[str], budget: TableBudget = UNLIMITED) -> Table:
+    """
+    likes_and_reactions_x, the reaction is the alt text of its icon
+    """
+    out = Table()
+    datapoints = budget.rows(2)
+    i = 1
+
+    try:
+        while not budget.expired():
+            n = 0
+            for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, f"likes_and_reactions_{i}.html"), "timestamp"):
+                datapoints.append((
+                    sys.intern(record["title"]),
+                    sys.intern(_first(record["texts"])),
+                    record["time"],
+                ))
+                n += 1
+
+            if n == 0:
+                break
+            i += 1
+
+        out = datapoints.to_table(["Title", "Reaction", "Timestamp"], sort_by=2)
+
+        # Redact block
+        recipients = get_recipient_name(out, "Title")
+        remove = [*redact, *get_actor_name(out, "Title"), *recipients]
+        out["Title"] = replace_in_col(out, "Title", remove)
+        out = helpers.categorize(out, ["Title", "Reaction"])
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+def your_pages_html_to_df(facebook_zip: str, budget: TableBudget = UNLIMITED) -> Table:
+    out = Table()
+    datapoints = budget.rows(2)
+
+    try:
+        for record in budget.records(htmlddp.read_html_records_from_zip(facebook_zip, "your_pages.html"), "timestamp"):
+            datapoints.append((
+                _first(record["texts"]) or record["title"],
+                _first(record["links"]),
+                record["time"],
+            ))
+
+        out = datapoints.to_table(["Name", "Url", "Timestamp"], sort_by=2)
+
+    except Exception as e:
+        logger.error("Exception caught: %s", e)
+
+    return out
+
+
+# NOTE: WHICH FILE DO I NEED TO USE TO BASE THE GROUP EXTRACTION ON
+# ANSWER: your_group_membership_activity.json
+def groups_to_list(facebook_zip: str, html: bool = False) -> list[str]:
+    """
+    Reads the names of all groups from the zipfile, without a budget or study period
+    Prefer group_names on the table that is already extracted, if it is complete
+    """
+    if html:
+        return group_names(your_group_membership_activity_html_to_df(facebook_zip, []))
+    return group_names(your_group_membership_activity_to_df(facebook_zip, []))
+
+
+def group_names(df: Table) -> list[str]:
+    """
+    The distinct group names in a your_group_membership_activity_to_df table, in order of appearance
+    """
+    if "Group name" not in df:
+        return []
+
+    return list(dict.fromkeys(name for name in df["Group name"] if name))
+
 #####################################################################
 # replace occurance in df
 
@@ -717,6 +944,14 @@ def get_phone_numbers(facebook_zip: str) ->  list[str]:
 
     return out 
 
+def get_profile_html(facebook_zip: str) -> list[str]:
+    """
+    The name, emails and phone numbers in the profile of an html export, to redact
+    """
+    profile = htmlddp.read_profile_from_zip(facebook_zip)
+    return [*profile["name"], *profile["emails"], *profile["phone_numbers"]]
+
+
 def regex_substitution(value, pattern, replacement):
     if isinstance(value, str):  # Only apply substitution to strings
         try:
@@ -726,16 +961,17 @@ def regex_substitution(value, pattern, replacement):
     return value
 
 
-def replace_in_df(df: pd.DataFrame, values:list[str], replacement: str) -> pd.DataFrame:
+def replace_in_df(df: Table, values:list[str], replacement: str) -> Table:
     if values != []:
         for value in values:
             pattern = rf"{value}"
-            df = df.applymap(lambda x: regex_substitution(x, pattern, replacement))
+            for column in df.columns:
+                df[column] = [regex_substitution(x, pattern, replacement) for x in df[column]]
 
     return df
 
 
-def get_recipient_name(df: pd.DataFrame, column: str) -> list[str]:
+def get_recipient_name(df: Table, column: str) -> list[str]:
     pattern_list = [
         re.compile(r'link van (.+?)\.'),
         re.compile(r'bericht van (.+?)\.'),
@@ -763,7 +999,42 @@ def get_recipient_name(df: pd.DataFrame, column: str) -> list[str]:
     return all_matches
 
 
-def replace_in_col(df: pd.DataFrame, colname: str, redact: list[str]) -> pd.Series:
-    escaped_redact = [re.escape(item) for item in redact]
+# The participant at the start of a title, in English and Dutch exports
+ACTOR_PATTERN = re.compile(
+    r"(.+?) (?:posted|commented|replied|shared|wrote|updated|likes|liked|reacted|became"
+    r"|heeft|plaatste|reageerde|deelde|vindt|vond|werd)\b"
+)
+
+
+def get_actor_name(df: Table, column: str) -> list[str]:
+    """
+    The participant in html titles like "<name> commented on ...", the most common name if there are several
+    Html exports have no profile_information.json, the name in the profile can be missing as well
+    """
+    names: Counter[str] = Counter()
+    for text in df[column]:
+        match = re.match(ACTOR_PATTERN, text)
+        if match:
+            names[match.group(1)] += 1
+
+    return [name for name, _ in names.most_common(1)]
+
+
+def replace_in_col(df: Table, colname: str, redact: list[str]) -> list[Any]:
+    escaped_redact = [re.escape(item) for item in redact if item]
+    if not escaped_redact:
+        # An empty pattern would match between every character
+        return list(df[colname])
     pattern = re.compile(r'|'.join(escaped_redact))
-    return df[colname].str.replace(pattern, '<Redacted>', regex=True)
+
+    # Titles repeat a lot, each distinct value is redacted once
+    redacted: dict[str, str] = {}
+    out = []
+    for value in df[colname]:
+        if isinstance(value, str):
+            if value not in redacted:
+                redacted[value] = pattern.sub('<Redacted>', value)
+            value = redacted[value]
+        out.append(value)
+
+    return out
@@ -0,0 +1,98 @@
+"""
+Contains a governor that degrades the extraction strategy when memory runs low
+
+The heap limit of the browser of a participant is unknown. Instead of running
+out of memory (which ends the session with an error page), the governor keeps
+track of the memory in use and switches to cheaper strategies when it grows:
+
+Level 0: normal extraction
+Level 1: row caps, tables are capped at a maximum number of records
+Level 2: skipping, low priority tables are not extracted at all
+"""
+import logging
+import tracemalloc
+
+from port.table import Table
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ["normal", "row caps", "skipping"]
+
+# Tables with a priority below this value are skipped at level 2
+SKIP_BELOW_PRIORITY = 1
+
+
+class MemoryGovernor:
+    """
+    Keeps track of memory during extraction and decides on the strategy
+
+    Attributes:
+        thresholds: bytes in use at which level 1 and 2 start
+        row_cap: maximum number of records per table from level 1 on
+        use_tracemalloc: measure memory with tracemalloc instead of summing the size of the extracted frames
+        level: current level, it only goes up
+        frames_bytes: size of the extracted frames so far
+    """
+
+    def __init__(self, thresholds: tuple[int, int], row_cap: int, use_tracemalloc: bool = False):
+        self.thresholds = thresholds
+        self.row_cap_at_level_1 = row_cap
+        self.use_tracemalloc = use_tracemalloc
+        self.level = 0
+        self.frames_bytes = 0
+
+        if self.use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def row_cap(self) -> int | None:
+        return self.row_cap_at_level_1 if self.level >= 1 else None
+
+    def skips(self, priority: int) -> bool:
+        """
+        Whether a table with this priority should be skipped
+        """
+        return self.level >= 2 and priority < SKIP_BELOW_PRIORITY
+
+    def memory_in_use(self) -> int:
+        """
+        Bytes in use according to the chosen measurement
+        """
+        if self.use_tracemalloc:
+            current, _ = tracemalloc.get_traced_memory()
+            return current
+        return self.frames_bytes
+
+    def observe(self, df: Table) -> None:
+        """
+        Registers an extracted table and raises the level if a threshold is crossed
+        """
+        try:
+            self.frames_bytes += df.memory_usage()
+        except Exception as e:
+            logger.error("Could not determine the size of a frame: %s", e)
+
+        in_use = self.memory_in_use()
+        level = sum(1 for threshold in self.thresholds if in_use >= threshold)
+        if level > self.level:
+            self.set_level(level, in_use)
+
+    def out_of_memory(self) -> None:
+        """
+        Goes straight to the last level after a MemoryError
+        """
+        self.set_level(len(LEVELS) - 1, self.memory_in_use())
+
+    def set_level(self, level: int, in_use: int) -> None:
+        logger.warning(
+            "Memory in use: %s bytes; switching from %s to %s",
+            in_use, LEVELS[self.level], LEVELS[level]
+        )
+        self.level = level
+
+    def stop(self) -> None:
+        """
+        Stops tracemalloc if this governor started it
+        """
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -1,15 +1,19 @@
-import pandas as pd
+from array import array
+from collections import deque
+import functools
 import math
 import re
+import sys
 import logging 
 from datetime import datetime, timezone
-from typing import Any
-import numpy as np
+from typing import Any, Iterator
+
+from port.table import Table
 
 logger = logging.getLogger(__name__)
 
 
-def split_dataframe(df: pd.DataFrame, row_count: int) -> list[pd.DataFrame]:
+def split_dataframe(df: Table, row_count: int) -> list[Table]:
     """
     Port has trouble putting large tables in memory. 
     Has to be expected. Solution split tables into smaller tables.
@@ -20,8 +24,12 @@ def split_dataframe(df: pd.DataFrame, row_count: int) -> list[pd.DataFrame]:
     # Calculate the number of splits needed.
     num_splits = int(len(df) / row_count) + (len(df) % row_count > 0)
 
-    # Split the DataFrame into chunks of size row_count.
-    df_splits = [df[i*row_count:(i+1)*row_count].reset_index(drop=True) for i in range(num_splits)]
+    # Split the Table into chunks of size row_count.
+    df_splits = []
+    for i in range(num_splits):
+        split = Table({name: df[name][i*row_count:(i+1)*row_count] for name in df.columns})
+        split.categorical = set(df.categorical)
+        df_splits.append(split)
 
     return df_splits
 
@@ -37,6 +45,32 @@ def convert_unix_timestamp(timestamp: str) -> str:
 
 
 
+def flatten(inp: Any) -> Iterator[tuple[tuple[Any, ...], Any]]:
+    """
+    Yields (path, value) for every leaf of a nested dict or list, depth first
+
+    Iterative and lazy: nothing is built up front, so callers can stop early.
+    The path is a tuple of keys and list indices, see join_path to get the key dict_denester uses
+    """
+    stack = [((), inp)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        path, value = pop()
+        if isinstance(value, dict):
+            for k in reversed(value):
+                push((path + (k,), value[k]))
+        elif isinstance(value, list):
+            for i in range(len(value) - 1, -1, -1):
+                push((path + (i,), value[i]))
+        else:
+            yield path, value
+
+
+def join_path(path: tuple[Any, ...]) -> str:
+    return "-".join(map(str, path))
+
+
 def dict_denester(
     inp: dict[Any, Any] | list[Any],
     new: dict[Any, Any] | None = None,
@@ -45,27 +79,28 @@ def dict_denester(
 ) -> dict[Any, Any]:
     """
     Denest a dict or list, returns a new denested dict
-    """
 
-    if run_first:
+    Same traversal as flatten, but the keys are built while descending.
+    new, name and run_first are kept from the recursive version: with run_first=False
+    the items are added to new, with keys prefixed by name.
+    """
+    if run_first or new is None:
         new = {}
+    stack = [(name, inp)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        name, value = pop()
+        if isinstance(value, dict):
+            for k in reversed(value):
+                push((f"{name}-{k}", value[k]))
+        elif isinstance(value, list):
+            for i in range(len(value) - 1, -1, -1):
+                push((f"{name}-{i}", value[i]))
+        else:
+            new[name[1:]] = value
 
-    if isinstance(inp, dict):
-        for k, v in inp.items():
-            if isinstance(v, (dict, list)):
-                dict_denester(v, new, f"{name}-{str(k)}", run_first=False)
-            else:
-                newname = f"{name}-{k}"
-                new.update({newname[1:]: v})  # type: ignore
-
-    elif isinstance(inp, list):
-        for i, item in enumerate(inp):
-            dict_denester(item, new, f"{name}-{i}", run_first=False)
-
-    else:
-        new.update({name[1:]: inp})  # type: ignore
-
-    return new  # type: ignore
+    return new
 
 
 
@@ -106,6 +141,60 @@ def find_item(d: dict[Any, Any],  key_to_match: str) -> str:
 
 
 
+def find_nested(inp: dict[Any, Any] | list[Any], key_to_match: str) -> str:
+    """
+    find_item(dict_denester(inp), key_to_match) without denesting inp
+
+    Nodes are visited level by level, so the search stops at the least nested match.
+    Nesting is the number of keys in the path, the same as in find_item for keys without a "-".
+    If key_to_match is a plain word, a node matches when its key or the key of a parent contains it
+    and no keys are joined; otherwise paths are joined for the visited leaves only.
+    """
+    try:
+        if _is_word(key_to_match):
+            return _find_word(inp, key_to_match)
+
+        pattern = re.compile(key_to_match)
+        queue = deque([((), inp)])
+        while queue:
+            path, value = queue.popleft()
+            if isinstance(value, dict):
+                queue.extend((path + (k,), v) for k, v in value.items())
+            elif isinstance(value, list):
+                queue.extend((path + (i,), v) for i, v in enumerate(value))
+            elif pattern.search(join_path(path)):
+                return str(value)
+    except Exception as e:
+        logger.error("bork bork: %s", e)
+
+    return ""
+
+
+def _find_word(inp: Any, word: str) -> str:
+    # Entries are (value, whether the key of the value or of one of its parents contains word)
+    queue = deque([(inp, False)])
+    popleft = queue.popleft
+    push = queue.append
+    while queue:
+        value, matched = popleft()
+        if isinstance(value, dict):
+            for k, v in value.items():
+                push((v, matched or word in str(k)))
+        elif isinstance(value, list):
+            for i, v in enumerate(value):
+                push((v, matched or word in str(i)))
+        elif matched:
+            return str(value)
+
+    return ""
+
+
+@functools.lru_cache(maxsize=256)
+def _is_word(pattern: str) -> bool:
+    return re.fullmatch(r"\w+", pattern) is not None
+
+
+
 def find_items(d: dict[Any, Any],  key_to_match: str) -> list:
     """
     d is a denested dict
@@ -146,9 +235,23 @@ def generate_key_for_sorting_from_timestamp_in_tuple(tup, index):
 
     empty timestamps last
     """
-    key = np.inf
+    key = math.inf
+    try:
+        key = generate_key_for_sorting_from_timestamp(tup[index])
+    except Exception as e:
+        logger.debug("Cannot convert timestamp: %s", e)
+
+    return key
+
+
+def generate_key_for_sorting_from_timestamp(timestamp) -> float:
+    """
+    creates a key from an ISO timestamp, most recent first
+
+    empty timestamps last
+    """
+    key = math.inf
     try:
-        timestamp = tup[index]
         if isinstance(timestamp, str) and len(timestamp) > 0:
             dt = datetime.fromisoformat(timestamp)
             key = -dt.timestamp()
@@ -158,6 +261,75 @@ def generate_key_for_sorting_from_timestamp_in_tuple(tup, index):
     return key
 
 
+class ColumnBuilder:
+    """
+    Collects the rows of a table column by column
+
+    Rows are appended as tuples, but stored in one buffer per column.
+    Columns with a typecode in typecodes are stored in an array.array of that type,
+    other columns in a list, as are typed columns after allow_none.
+    to_table builds a Table straight from the buffers,
+    sorting is done by computing a permutation once and applying it to every column.
+    """
+
+    def __init__(self, typecodes: dict[int, str] | None = None):
+        self.typecodes = typecodes or {}
+        self.columns: list[list[Any] | array] = []
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def append(self, row: tuple) -> None:
+        if not self.columns:
+            self.columns = [array(self.typecodes[i]) if i in self.typecodes else [] for i in range(len(row))]
+
+        for column, value in zip(self.columns, row):
+            column.append(value)
+
+    def allow_none(self, index: int) -> None:
+        """
+        Stores the column at index in a list from now on, so it can hold None
+        """
+        self.typecodes = {i: typecode for i, typecode in self.typecodes.items() if i != index}
+        if self.columns and isinstance(self.columns[index], array):
+            self.columns[index] = self.columns[index].tolist()
+
+    def set(self, index: int, row: tuple) -> None:
+        """
+        Replaces the row at index
+        """
+        for column, value in zip(self.columns, row):
+            column[index] = value
+
+    def rows(self) -> Iterator[tuple]:
+        return zip(*self.columns)
+
+    def to_table(self, names: list[str], sort_by: int | None = None) -> Table:
+        """
+        Builds a Table with column names names
+
+        If sort_by is the index of a column with ISO timestamps, rows are sorted most recent first,
+        empty timestamps last (see generate_key_for_sorting_from_timestamp)
+        """
+        if not self.columns:
+            return Table({name: [] for name in names})
+
+        permutation = None
+        if sort_by is not None:
+            keys = array("d", map(generate_key_for_sorting_from_timestamp, self.columns[sort_by]))
+            permutation = sorted(range(len(keys)), key=keys.__getitem__)
+
+        data = {}
+        for name, column in zip(names, self.columns):
+            if permutation is None:
+                data[name] = column
+            elif isinstance(column, array):
+                data[name] = array(column.typecode, map(column.__getitem__, permutation))
+            else:
+                data[name] = [column[i] for i in permutation]
+
+        return Table(data)
+
 
 def fix_latin1_string(input: str) -> str:
     """
@@ -176,3 +348,41 @@ def fix_latin1_string(input: str) -> str:
         return input
 
 
+
+
+@functools.lru_cache(maxsize=4096)
+def fix_latin1_string_interned(input: str) -> str:
+    """
+    fix_latin1_string for values that repeat across many records, such as group names and reaction types.
+
+    Repeated values are repaired once and share a single (interned) string object.
+
+    Args:
+        input (str): The input string that needs to be fixed.
+
+    Returns:
+        str: The fixed string, the same object for every occurrence of the same input.
+    """
+    out = fix_latin1_string(input)
+    if isinstance(out, str):
+        out = sys.intern(out)
+    return out
+
+
+def categorize(df: Table, columns: list[str], max_unique_fraction: float = 0.5) -> Table:
+    """
+    Marks columns that consist of a small set of repeated values as categorical.
+
+    Columns with more than max_unique_fraction unique values are left as they are.
+    Categorical columns are dictionary encoded when sent to the UI.
+    """
+    for column in columns:
+        if column not in df.columns or len(df) == 0:
+            continue
+        try:
+            if len(set(df[column])) <= len(df) * max_unique_fraction:
+                df.categorize(column)
+        except Exception as e:
+            logger.error("Could not categorize column %s: %s", column, e)
+
+    return df
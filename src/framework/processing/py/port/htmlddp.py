@@ -0,0 +1,283 @@
+"""
+Contains functions to read the records of an html DDP
+
+HTML exports are several times the size of json exports, so they are not parsed into a DOM.
+The file is decoded straight from the zipfile in chunks and fed to an incremental
+html.parser tokenizer, records are handed out as soon as their closing tag is seen.
+Memory is bounded by the chunk size and the size of a single record.
+
+Facebook renders every item (a post, a comment, a like) as a block with a title,
+content and a date. The blocks are recognized by their css classes, which differ
+between versions of the export, see RECORD_CLASSES and friends.
+"""
+from calendar import timegm
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Any, Iterator
+import io
+import logging
+import re
+import zipfile
+
+from port.my_exceptions import FileNotFoundInZipError
+import port.unzipddp as unzipddp
+
+logger = logging.getLogger(__name__)
+
+# Number of characters fed to the parser at a time
+CHUNK_SIZE = 64 * 1024
+
+# css classes of the block of a single item, and of its title, content and date
+# Current exports first, older exports second
+RECORD_CLASSES = {"_a6-g", "_2lej"}
+TITLE_CLASSES = {"_a6-h", "_2lek"}
+CONTENT_CLASSES = {"_a6-p", "_2let"}
+TIME_CLASSES = {"_a72d", "_2lem"}
+
+# Formats of the dates in an export, they are in the local time of the participant
+TIME_FORMATS = [
+    "%b %d, %Y %I:%M:%S %p",
+    "%b %d, %Y, %I:%M %p",
+    "%b %d, %Y %I:%M %p",
+    "%d %b %Y, %H:%M",
+]
+
+# Labels in profile_information.html that precede the name and the phone numbers of the participant
+NAME_LABELS = {"name", "full name", "naam", "volledige naam"}
+PHONE_LABELS = {"phone number", "phone numbers", "mobile phone", "telefoonnummer", "telefoonnummers", "mobiel nummer"}
+
+EMAIL_PATTERN = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+PHONE_PATTERN = re.compile(r"\+?[\d\s().-]+")
+
+
+def parse_time(text: str) -> datetime | None:
+    """
+    Parses a date as shown in an export, None if it is in none of the TIME_FORMATS
+    """
+    text = " ".join(text.split())
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, time_format)
+        except ValueError:
+            continue
+
+    return None
+
+
+class RecordParser(HTMLParser):
+    """
+    Collects the records of an html export while it is fed
+
+    A record is a dict with:
+        title: text of the title
+        texts: texts in the content, and alt texts of images in the content, in order
+        links: hrefs in the content, in order
+        time: ISO 8601 date without a timezone, "" if there was none
+        timestamp: the date in epoch seconds as if it were UTC, None if there was none
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.records: list[dict[str, Any]] = []
+        self._depth = 0
+        self._record: dict[str, Any] | None = None
+        self._record_depth = 0
+        self._field: str | None = None
+        self._field_depth = 0
+        self._time_parts: list[str] = []
+        # The parser hands out a text in pieces when it spans chunks, they are joined at the next tag
+        self._data: list[str] = []
+
+    def pop_records(self) -> list[dict[str, Any]]:
+        """
+        Returns the records completed so far and forgets them
+        """
+        records, self.records = self.records, []
+        return records
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._flush_data()
+        if self._field == "texts" and tag in ("a", "img"):
+            # Links, and the alt text of images such as the icon of a reaction
+            attributes = dict(attrs)
+            if tag == "a" and attributes.get("href"):
+                self._record["links"].append(attributes["href"])  # type: ignore
+            if tag == "img" and attributes.get("alt"):
+                self._record["texts"].append(attributes["alt"])  # type: ignore
+
+        if tag != "div":
+            return
+
+        self._depth += 1
+        classes = set((dict(attrs).get("class") or "").split())
+
+        if self._record is None:
+            if classes & RECORD_CLASSES:
+                self._record = {"title": "", "texts": [], "links": [], "time": "", "timestamp": None}
+                self._record_depth = self._depth
+                self._time_parts = []
+            return
+
+        if self._field is None:
+            if classes & TITLE_CLASSES:
+                self._field = "title"
+            elif classes & CONTENT_CLASSES:
+                self._field = "texts"
+            elif classes & TIME_CLASSES:
+                self._field = "time"
+            self._field_depth = self._depth
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush_data()
+        if tag != "div":
+            return
+
+        if self._field is not None and self._depth == self._field_depth:
+            self._field = None
+
+        if self._record is not None and self._depth == self._record_depth:
+            self._finish_record()
+
+        self._depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self._field is not None:
+            self._data.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._flush_data()
+
+    def _flush_data(self) -> None:
+        if not self._data:
+            return
+
+        text = "".join(self._data).strip()
+        self._data = []
+        if not text:
+            return
+
+        record = self._record
+        if self._field == "title":
+            record["title"] = f"{record['title']} {text}" if record["title"] else text  # type: ignore
+        elif self._field == "texts":
+            record["texts"].append(text)  # type: ignore
+        else:
+            self._time_parts.append(text)
+
+    def _finish_record(self) -> None:
+        record = self._record
+        dt = parse_time(" ".join(self._time_parts)) if self._time_parts else None
+        if dt is not None:
+            record["time"] = dt.isoformat()  # type: ignore
+            record["timestamp"] = timegm(dt.timetuple())  # type: ignore
+
+        self.records.append(record)  # type: ignore
+        self._record = None
+        self._field = None
+
+
+def read_html_records_from_zip(zfile: str, file_to_extract: str) -> Iterator[dict[str, Any]]:
+    """
+    Yields the records of an html file in a zipfile, see RecordParser
+
+    The file is read and parsed CHUNK_SIZE characters at a time
+    Yields nothing in case of failure
+    """
+    try:
+        with unzipddp.open_zip_member(zfile, file_to_extract) as f:
+            stream = io.TextIOWrapper(f, encoding="utf8", errors="replace")
+            parser = RecordParser()
+            while chunk := stream.read(CHUNK_SIZE):
+                parser.feed(chunk)
+                yield from parser.pop_records()
+
+            parser.close()
+            yield from parser.pop_records()
+
+    except zipfile.BadZipFile as e:
+        logger.error("BadZipFile:  %s", e)
+    except FileNotFoundInZipError as e:
+        logger.error("File not found:  %s: %s", file_to_extract, e)
+    except Exception as e:
+        logger.error("%s, could not read html %s", e, file_to_extract)
+
+
+class TextParser(HTMLParser):
+    """
+    Collects the texts of an html document in order, leaving out the head
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.texts: list[str] = []
+        self._head = False
+        self._data: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._flush_data()
+        if tag == "head":
+            self._head = True
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush_data()
+        if tag == "head":
+            self._head = False
+
+    def handle_data(self, data: str) -> None:
+        if not self._head:
+            self._data.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._flush_data()
+
+    def _flush_data(self) -> None:
+        text = " ".join("".join(self._data).split())
+        self._data = []
+        if text:
+            self.texts.append(text)
+
+
+def read_profile_from_zip(zfile: str, file_to_extract: str = "profile_information.html") -> dict[str, list[str]]:
+    """
+    Reads the name, emails and phone numbers of the participant from the profile of an html export
+
+    The profile is a list of labels each followed by their values:
+    the name is the text after one of the NAME_LABELS,
+    phone numbers are the texts that look like one after one of the PHONE_LABELS,
+    emails are the texts that look like one.
+
+    Returns a dict with the keys "name", "emails" and "phone_numbers", with empty lists in case of failure
+    """
+    out: dict[str, list[str]] = {"name": [], "emails": [], "phone_numbers": []}
+
+    try:
+        with unzipddp.open_zip_member(zfile, file_to_extract) as f:
+            stream = io.TextIOWrapper(f, encoding="utf8", errors="replace")
+            parser = TextParser()
+            while chunk := stream.read(CHUNK_SIZE):
+                parser.feed(chunk)
+            parser.close()
+
+        phones = False
+        texts = parser.texts
+        for i, text in enumerate(texts):
+            label = text.rstrip(":").lower()
+            if label in NAME_LABELS and i + 1 < len(texts) and not out["name"]:
+                out["name"].append(texts[i + 1])
+            elif label in PHONE_LABELS:
+                phones = True
+            elif EMAIL_PATTERN.fullmatch(text):
+                out["emails"].append(text)
+            elif phones and PHONE_PATTERN.fullmatch(text) and sum(c.isdigit() for c in text) >= 7:
+                out["phone_numbers"].append(text)
+
+    except zipfile.BadZipFile as e:
+        logger.error("BadZipFile:  %s", e)
+    except FileNotFoundInZipError as e:
+        logger.error("File not found:  %s: %s", file_to_extract, e)
+    except Exception as e:
+        logger.error("%s, could not read html %s", e, file_to_extract)
+
+    return out
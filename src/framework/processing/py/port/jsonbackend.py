@@ -0,0 +1,140 @@
+"""
+Contains the decoders that turn the bytes of a json file into Python objects
+
+Decoding the json files of a DDP is a large part of the extraction. A backend decodes
+utf-8 bytes directly, the first backend of PREFERRED_BACKENDS that can be imported is used.
+orjson is faster than the json module, but is not always available.
+Every backend returns the same objects as json.loads: documents that orjson does
+not accept (NaN, lone surrogates) or would decode differently (integers above 64 bits,
+which it turns into floats) are decoded with the json module.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable
+import codecs
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Backends in order of preference, see BACKENDS
+PREFERRED_BACKENDS = ("orjson", "json")
+
+
+@dataclass(frozen=True)
+class JsonBackend:
+    """
+    Attributes:
+        name: name of the backend
+        loads: decodes utf-8 bytes, raises json.JSONDecodeError if the bytes are not json
+    """
+    name: str
+    loads: Callable[[bytes | bytearray | memoryview], Any]
+
+
+@dataclass
+class DecodeStats:
+    """
+    Attributes:
+        backend: name of the backend used
+        calls: number of documents decoded
+        bytes: number of bytes decoded
+        seconds: time spent decoding
+        fallbacks: number of documents the backend did not accept, decoded with the json module
+    """
+    backend: str = ""
+    calls: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    fallbacks: int = 0
+
+
+# Functions that create a backend by name, they raise ImportError if it is not available
+BACKENDS: dict[str, Callable[[], JsonBackend]] = {}
+
+
+def register(name: str) -> Callable[[Callable[[], JsonBackend]], Callable[[], JsonBackend]]:
+    """
+    Adds a function that creates a backend to BACKENDS
+    """
+    def decorator(factory: Callable[[], JsonBackend]) -> Callable[[], JsonBackend]:
+        BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def _json_loads(data: bytes | bytearray | memoryview) -> Any:
+    # As json.loads does for utf-8 bytes: a BOM is skipped and encoded surrogates are accepted
+    encoding = "utf-8-sig" if data[:3] == codecs.BOM_UTF8 else "utf-8"
+    return json.loads(str(data, encoding, "surrogatepass"))
+
+
+@register("json")
+def _json_backend() -> JsonBackend:
+    return JsonBackend("json", _json_loads)
+
+
+# 19 digits in a row can be an integer that does not fit in 64 bits
+# Found by mapping digits to "0" and everything else to " ", which is much faster than a regex
+_DIGITS_TO_ZEROS = bytes(b"0"[0] if chr(i).isdigit() and i < 128 else b" "[0] for i in range(256))
+_LONG_DIGITS = b"0" * 19
+
+
+def _has_long_digits(data: bytes | bytearray | memoryview) -> bool:
+    return bytes(data).translate(_DIGITS_TO_ZEROS).find(_LONG_DIGITS) != -1
+
+
+@register("orjson")
+def _orjson_backend() -> JsonBackend:
+    import orjson
+
+    def loads(data: bytes | bytearray | memoryview) -> Any:
+        if not _has_long_digits(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        STATS.fallbacks += 1
+        return _json_loads(data)
+
+    return JsonBackend("orjson", loads)
+
+
+_backend: JsonBackend | None = None
+
+
+def backend() -> JsonBackend:
+    """
+    The first backend of PREFERRED_BACKENDS that is available, chosen on first use
+    """
+    global _backend
+    if _backend is None:
+        for name in PREFERRED_BACKENDS:
+            try:
+                _backend = BACKENDS[name]()
+                break
+            except ImportError as e:
+                logger.info("JSON backend %s is not available: %s", name, e)
+        else:
+            _backend = _json_backend()
+        logger.info("JSON backend: %s", _backend.name)
+    return _backend
+
+
+def loads(data: bytes | bytearray | memoryview) -> Any:
+    """
+    Decodes utf-8 bytes with the backend, the time it takes is added to STATS
+    """
+    decoder = backend()
+    start = time.perf_counter()
+    try:
+        return decoder.loads(data)
+    finally:
+        STATS.backend = decoder.name
+        STATS.calls += 1
+        STATS.bytes += len(data)
+        STATS.seconds += time.perf_counter() - start
+
+
+# Decoding of the current session, replaced by port.main.start
+STATS = DecodeStats()
@@ -0,0 +1,145 @@
+"""
+Contains latency histograms of the commands of a session
+
+port.main.ScriptWrapper records every command it hands to the worker:
+the time Python takes to compute and serialize it, its serialized size, and the time
+until the next send, which is the time spent in the UI (rendering and the participant).
+The script logs the summary before its last tracking donation.
+"""
+from typing import Any
+import math
+import time
+
+# Upper bounds of the buckets of the histograms, values above the last bound are counted in ">{last}"
+MILLISECOND_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10_000, 30_000, 60_000, 300_000)
+BYTE_BOUNDS = (1024, 10 * 1024, 100 * 1024, 1024**2, 10 * 1024**2, 100 * 1024**2)
+
+
+class Histogram:
+    """
+    Counts of values per bucket, and their number, sum and maximum
+    """
+
+    __slots__ = "bounds", "counts", "n", "total", "max"
+
+    def __init__(self, bounds: tuple[int, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.n += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """
+        Upper bound of the bucket that holds percentile q (0-100) of the values, at most the maximum, 0 without values
+        """
+        if self.n == 0:
+            return 0.0
+
+        rank = max(math.ceil(q / 100 * self.n), 1)
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        The histogram with only the buckets that have values, keyed by "<={bound}"
+        """
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "n": self.n,
+            "total": round(self.total, 1),
+            "max": round(self.max, 1),
+            "p50": round(self.percentile(50), 1),
+            "p95": round(self.percentile(95), 1),
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+class LatencyRecorder:
+    """
+    Histograms per kind of command, see command_key
+
+    Per command: "python_ms" the time to compute and serialize it, "bytes" its serialized size,
+    "ui_ms" the time until the next send
+    """
+
+    def __init__(self):
+        self.python_ms: dict[str, Histogram] = {}
+        self.ui_ms: dict[str, Histogram] = {}
+        self.bytes: dict[str, Histogram] = {}
+        self._handed_out: tuple[str, float] | None = None
+
+    def received(self) -> None:
+        """
+        Called when the worker sends a response, ends the UI time of the last command
+        """
+        if self._handed_out is not None:
+            key, since = self._handed_out
+            histogram(self.ui_ms, key, MILLISECOND_BOUNDS).add((time.perf_counter() - since) * 1000)
+            self._handed_out = None
+
+    def record(self, command: Any, seconds: float, size: int) -> None:
+        """
+        Called when a command is handed to the worker
+        """
+        key = command_key(command)
+        histogram(self.python_ms, key, MILLISECOND_BOUNDS).add(seconds * 1000)
+        histogram(self.bytes, key, BYTE_BOUNDS).add(size)
+        self._handed_out = (key, time.perf_counter())
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        out = {}
+        for key, python_ms in self.python_ms.items():
+            out[key] = {"python_ms": python_ms.to_dict(), "bytes": self.bytes[key].to_dict()}
+            if key in self.ui_ms:
+                out[key]["ui_ms"] = self.ui_ms[key].to_dict()
+        return out
+
+
+def histogram(histograms: dict[str, Histogram], key: str, bounds: tuple[int, ...]) -> Histogram:
+    if key not in histograms:
+        histograms[key] = Histogram(bounds)
+    return histograms[key]
+
+
+def command_key(command: Any) -> str:
+    """
+    The type of a command, with the type of the page body for renders: "CommandUIRender/PropsUIPromptConsentForm"
+    """
+    key = type(command).__name__
+    page = getattr(command, "page", None)
+    if page is not None:
+        body = getattr(page, "body", page)
+        key = f"{key}/{type(body).__name__}"
+    return key
+
+
+def serialized_size(value: Any) -> int:
+    """
+    Size of a serialized command: the length of a JSON string, or an estimate of the JSON of a dict
+    The estimate counts the characters of keys and strings, the dict is not encoded
+    """
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return 2 + sum(len(key) + 4 + serialized_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return 2 + sum(1 + serialized_size(item) for item in value)
+    return len(str(value))
+
+
+# The recorder of the current session, replaced by port.main.start
+RECORDER = LatencyRecorder()
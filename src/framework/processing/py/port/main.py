@@ -1,24 +1,60 @@
 from collections.abc import Generator
-from port.script import process
+import time
+
 from port.api.commands import CommandSystemExit
+import port.api.transport as transport
+import port.blockcache as blockcache
+import port.jsonbackend as jsonbackend
+import port.latency as latency
 
 
 class ScriptWrapper(Generator):
-    def __init__(self, script):
+    """
+    Hands the commands of the script to the worker
+
+    transport "dict" returns command.toDict(), "json" returns a single JSON string (see port.api.transport)
+    recorder, if given, records the latency and size of every command (see port.latency)
+    """
+
+    def __init__(self, script, transport="dict", recorder=None):
+        if transport not in ("dict", "json"):
+            raise ValueError(f"Unknown transport: {transport}")
         self.script = script
+        self.transport = transport
+        self.recorder = recorder
 
     def send(self, data):
+        if self.recorder is not None:
+            self.recorder.received()
+        start = time.perf_counter()
+
         try:
             command = self.script.send(data)
         except StopIteration:
-            return CommandSystemExit(0, "End of script").toDict()
-        else:
-            return command.toDict()
+            command = CommandSystemExit(0, "End of script")
+
+        serialized = self.serialize(command)
+        if self.recorder is not None:
+            self.recorder.record(command, time.perf_counter() - start, latency.serialized_size(serialized))
+        return serialized
+
+    def serialize(self, command):
+        if self.transport == "json":
+            return transport.encode(command)
+        return command.toDict()
 
     def throw(self, type=None, value=None, traceback=None):
         raise StopIteration
 
 
-def start(sessionId):
-    script = process(sessionId)
-    return ScriptWrapper(script)
+def start(sessionId, transport="dict", profile=False):
+    # The script imports the extraction modules, they are only needed once a session starts
+    # profile runs the extraction of this session under cProfile, see port.profiling
+    # It is only passed when set, so scripts without a profile parameter keep working
+    from port.script import process
+
+    latency.RECORDER = latency.LatencyRecorder()
+    blockcache.TOTALS = blockcache.ReadCounts()
+    jsonbackend.STATS = jsonbackend.DecodeStats()
+    script = process(sessionId, profile=profile) if profile else process(sessionId)
+    return ScriptWrapper(script, transport, latency.RECORDER)
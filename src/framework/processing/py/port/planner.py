@@ -0,0 +1,269 @@
+"""
+Contains a planner that picks an extraction strategy per table before anything is extracted
+
+The central directory of the zipfile tells the compressed and uncompressed size of every
+file, without reading the files. From the sizes of the files of a table the planner
+estimates the time extraction takes, the peak memory it needs and the size of the table.
+It then picks a strategy per table, in the order the tables are extracted:
+
+in-memory: the files are read as a whole, the default
+capped: the table is capped at a maximum number of records
+skipped: the table is not extracted, only low priority tables are skipped
+
+The strategies are the levels of port.governor, the plan starts each table at its level
+and the governor can still degrade further. After extraction the estimates are compared
+with the actual time and size, the log of that comparison is used to recalibrate COEFFICIENTS.
+"""
+from dataclasses import dataclass
+from enum import Enum
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Any, Iterable
+import logging
+import tracemalloc
+import zipfile
+
+from port.governor import SKIP_BELOW_PRIORITY
+from port.table import Table
+import port.unzipddp as unzipddp
+
+logger = logging.getLogger(__name__)
+
+
+class Strategy(Enum):
+    IN_MEMORY = "in-memory"
+    CAPPED = "capped"
+    SKIPPED = "skipped"
+
+
+@dataclass(frozen=True)
+class Coefficients:
+    """
+    Costs per uncompressed byte of the files of a table
+
+    Attributes:
+        seconds_per_mb: seconds of extraction per MB
+        peak: peak memory of the extraction
+        frame: size of the extracted table
+    """
+    seconds_per_mb: float
+    peak: float
+    frame: float
+
+
+# Measured with CPython on synthetic exports of 20k records per table, Pyodide is slower
+# Compare with the "Extraction plan accuracy" log to recalibrate
+COEFFICIENTS = {
+    ".json": Coefficients(seconds_per_mb=0.27, peak=9.6, frame=1.6),
+    ".html": Coefficients(seconds_per_mb=0.47, peak=2.3, frame=0.7),
+}
+
+# Costs of a table regardless of the size of its files
+FIXED_SECONDS = 0.001
+FIXED_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class PlannedTable:
+    """
+    A table to plan
+
+    Attributes:
+        id: id of the table
+        files: names of the files the table is extracted from, without suffix, patterns as in fnmatch
+        priority: tables with a priority below port.governor.SKIP_BELOW_PRIORITY can be skipped
+    """
+    id: str
+    files: tuple[str, ...]
+    priority: int = 1
+
+
+@dataclass
+class Estimate:
+    """
+    The plan of a single table, the actual values are filled in after extraction
+
+    Attributes:
+        table: id of the table
+        files: number of files of the table in the zipfile
+        compressed: compressed size of the files
+        uncompressed: uncompressed size of the files
+        seconds: estimated extraction time
+        peak: estimated peak memory with the chosen strategy
+        frame: estimated size of the table
+        strategy: chosen strategy
+        actual_seconds: extraction time, None if not extracted yet
+        actual_peak: peak memory, only measured if tracemalloc is tracing
+        actual_frame: size of the table
+    """
+    table: str
+    files: int
+    compressed: int
+    uncompressed: int
+    seconds: float
+    peak: int
+    frame: int
+    strategy: Strategy
+    actual_seconds: float | None = None
+    actual_peak: int | None = None
+    actual_frame: int | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "table": self.table,
+            "strategy": self.strategy.value,
+            "files": self.files,
+            "compressed": self.compressed,
+            "uncompressed": self.uncompressed,
+            "seconds": round(self.seconds, 3),
+            "peak": self.peak,
+            "frame": self.frame,
+        }
+
+
+class Plan:
+    """
+    Estimates and strategies per table
+
+    Attributes:
+        estimates: the plan per table id
+        row_cap: maximum number of records of capped tables
+    """
+
+    def __init__(self, row_cap: int | None = None):
+        self.estimates: dict[str, Estimate] = {}
+        self.row_cap = row_cap
+        self._peak_base = 0
+
+    def strategy(self, table_id: str) -> Strategy:
+        estimate = self.estimates.get(table_id)
+        return Strategy.IN_MEMORY if estimate is None else estimate.strategy
+
+    def started(self, table_id: str) -> None:
+        """
+        Called before a table is extracted
+        """
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._peak_base = tracemalloc.get_traced_memory()[0]
+
+    def observe(self, table_id: str, seconds: float, df: Table) -> None:
+        """
+        Called after a table is extracted, records the actual values
+        """
+        estimate = self.estimates.get(table_id)
+        if estimate is None:
+            return
+
+        estimate.actual_seconds = seconds
+        if tracemalloc.is_tracing():
+            estimate.actual_peak = tracemalloc.get_traced_memory()[1] - self._peak_base
+        try:
+            estimate.actual_frame = df.memory_usage()
+        except Exception as e:
+            logger.error("Could not determine the size of a frame: %s", e)
+
+    def to_list(self) -> list[dict[str, Any]]:
+        return [estimate.to_dict() for estimate in self.estimates.values()]
+
+    def accuracy(self) -> dict[str, Any]:
+        """
+        Actual divided by estimated values, per extracted table and over all extracted tables
+        """
+        tables = []
+        totals = {"seconds": [0.0, 0.0], "peak": [0.0, 0.0], "frame": [0.0, 0.0]}
+        for estimate in self.estimates.values():
+            if estimate.actual_seconds is None or estimate.uncompressed == 0:
+                continue
+
+            row: dict[str, Any] = {"table": estimate.table, "strategy": estimate.strategy.value}
+            for name, estimated, actual in (
+                ("seconds", estimate.seconds, estimate.actual_seconds),
+                ("peak", estimate.peak, estimate.actual_peak),
+                ("frame", estimate.frame, estimate.actual_frame),
+            ):
+                if actual is None:
+                    continue
+                row[name] = ratio(actual, estimated)
+                totals[name][0] += actual
+                totals[name][1] += estimated
+            tables.append(row)
+
+        overall = {name: ratio(actual, estimated) for name, (actual, estimated) in totals.items() if actual}
+        return {"overall": overall, "tables": tables}
+
+
+def ratio(actual: float, estimated: float) -> float | None:
+    return round(actual / estimated, 2) if estimated else None
+
+
+def member_sizes(zfile: str, suffix: str) -> list[tuple[str, int, int]]:
+    """
+    (stem, compressed size, uncompressed size) of the files with suffix in a zipfile
+    Only the central directory is read, returns [] if it cannot be read
+    """
+    try:
+        with unzipddp.open_zipfile(zfile) as zf:
+            return [
+                (Path(info.filename).stem, info.compress_size, info.file_size)
+                for info in zf.infolist()
+                if Path(info.filename).suffix == suffix
+            ]
+    except (zipfile.BadZipFile, OSError) as e:
+        logger.error("Cannot plan extraction: %s", e)
+        return []
+
+
+def plan(
+    zfile: str,
+    tables: Iterable[PlannedTable],
+    suffix: str,
+    thresholds: tuple[int, int],
+    row_cap: int,
+    session_budget: float,
+) -> Plan:
+    """
+    Plans the extraction of tables from the files with suffix in a zipfile
+
+    tables are planned in the order they are extracted, the tables planned before a table
+    are held in memory while it is extracted. thresholds are the MemoryGovernor thresholds.
+    Low priority tables are skipped when they would cross the last threshold, or would not
+    fit in the session_budget in seconds.
+    """
+    coefficients = COEFFICIENTS.get(suffix, COEFFICIENTS[".json"])
+    members = member_sizes(zfile, suffix)
+    capped_at, skipped_at = thresholds
+
+    out = Plan(row_cap=row_cap)
+    held = 0
+    elapsed = 0.0
+    for table in tables:
+        sizes = [(c, u) for stem, c, u in members if any(fnmatchcase(stem, pattern) for pattern in table.files)]
+        compressed = sum(c for c, _ in sizes)
+        uncompressed = sum(u for _, u in sizes)
+
+        seconds = FIXED_SECONDS + coefficients.seconds_per_mb * uncompressed / 1e6
+        peak = FIXED_BYTES + int(coefficients.peak * uncompressed)
+        frame = int(coefficients.frame * uncompressed)
+
+        low_priority = table.priority < SKIP_BELOW_PRIORITY
+        if held + peak < capped_at:
+            strategy = Strategy.IN_MEMORY
+        elif held + peak < skipped_at or not low_priority:
+            strategy = Strategy.CAPPED
+        else:
+            strategy, peak = Strategy.SKIPPED, 0
+
+        if low_priority and strategy is not Strategy.SKIPPED and elapsed + seconds > session_budget:
+            strategy, peak = Strategy.SKIPPED, 0
+
+        if strategy is not Strategy.SKIPPED:
+            held += frame
+            elapsed += seconds
+
+        out.estimates[table.id] = Estimate(
+            table.id, len(sizes), compressed, uncompressed, seconds, peak,
+            frame if strategy is not Strategy.SKIPPED else 0, strategy,
+        )
+
+    return out
@@ -0,0 +1,83 @@
+"""
+Contains an opt-in profile of the extraction of a session
+
+When the archive of a participant is slow to process, timings tell which table was slow
+but not why. With profiling on, the extraction runs under cProfile and the functions with
+the highest cumulative time are logged, so they end up in the tracking donation.
+Only function names, call counts and times are logged, no data of the participant.
+"""
+from typing import Any, Iterator, TypeVar
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def profiled(stream: Iterator[T], profiler: Any) -> Iterator[T]:
+    """
+    Runs a generator under a cProfile.Profile, the profiler is only enabled while the generator runs
+    and not while the consent form is shown in between
+    """
+    while True:
+        profiler.enable()
+        try:
+            item = next(stream)
+        except StopIteration:
+            return
+        finally:
+            profiler.disable()
+        yield item
+
+
+def new_profiler() -> Any | None:
+    """
+    A cProfile.Profile, None if cProfile is not available
+    """
+    try:
+        import cProfile
+        return cProfile.Profile()
+    except ImportError as e:
+        logger.error("Cannot profile: %s", e)
+        return None
+
+
+def summarize(profiler: Any, top: int = 25, max_bytes: int = 8 * 1024) -> str:
+    """
+    JSON list of the top functions by cumulative time, with calls, tottime and cumtime in ms
+
+    Functions are dropped from the end until the JSON fits in max_bytes
+    """
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+
+    rows = []
+    for function in stats.fcn_list[:top]:  # type: ignore
+        _, calls, tottime, cumtime, _ = stats.stats[function]  # type: ignore
+        rows.append({
+            "function": function_name(function),
+            "calls": calls,
+            "tottime": round(tottime * 1000, 1),
+            "cumtime": round(cumtime * 1000, 1),
+        })
+
+    out = json.dumps(rows)
+    while len(out) > max_bytes and rows:
+        rows.pop()
+        out = json.dumps(rows)
+
+    return out
+
+
+def function_name(function: tuple[str, int, str]) -> str:
+    """
+    "package/module.py:line(name)", the path is shortened to its last two parts
+    """
+    filename, line, name = function
+    if filename == "~":
+        return name
+    path = "/".join(filename.replace("\\", "/").split("/")[-2:])
+    return f"{path}:{line}({name})"
@@ -0,0 +1,129 @@
+"""
+Contains classes to keep a bounded number of rows of a table
+
+Rows are offered one by one while records are read, rows that are not kept
+are dropped right away. Memory scales with the number of rows kept,
+not with the number of records in a file.
+"""
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Iterator
+import heapq
+import logging
+import random
+
+from port.helpers import ColumnBuilder
+from port.table import Table
+
+logger = logging.getLogger(__name__)
+
+
+class Sampling(Enum):
+    """ Sampling Enum """
+    FULL = 1
+    HEAD = 2
+    RESERVOIR = 3
+
+
+@dataclass(frozen=True)
+class RowPolicy:
+    """
+    How many rows of a table to keep
+
+    Attributes:
+        sampling: FULL keeps all rows, HEAD keeps the n most recent rows, RESERVOIR keeps a uniform sample of n rows
+        n: number of rows to keep, ignored for FULL
+    """
+    sampling: Sampling = Sampling.FULL
+    n: int = 0
+
+
+FULL = RowPolicy()
+
+
+class RowSample:
+    """
+    Collects the rows of a table according to a RowPolicy
+
+    Extractors append their rows as tuples and build the Table with to_table.
+    Rows are stored column by column in a helpers.ColumnBuilder.
+
+    Attributes:
+        policy: the RowPolicy to apply
+        timestamp_index: index of the ISO timestamp in a row, used by HEAD to determine recency.
+            Without it HEAD keeps the first n rows
+        total: number of rows offered
+        kept: number of rows kept
+    """
+
+    def __init__(self, policy: RowPolicy, timestamp_index: int | None = None, seed: Any = None):
+        self.policy = policy
+        self.timestamp_index = timestamp_index
+        self.total = 0
+        self._builder = ColumnBuilder()
+        self._heap: list[tuple[str, int, int]] = []
+        self._random = random.Random(seed)
+        self._kept: int | None = None
+
+    @property
+    def kept(self) -> int:
+        return len(self._builder) if self._kept is None else self._kept
+
+    @property
+    def sampled(self) -> bool:
+        """
+        True when rows were dropped
+        """
+        return self.total > self.kept
+
+    def release(self) -> None:
+        """
+        Drops the kept rows once they are in a Table, the counts remain available
+        """
+        self._kept = self.kept
+        self._builder = ColumnBuilder()
+        self._heap = []
+
+    def append(self, row: tuple) -> None:
+        n = self.policy.n
+        sampling = self.policy.sampling
+        self.total += 1
+
+        if sampling == Sampling.FULL:
+            self._builder.append(row)
+
+        elif sampling == Sampling.RESERVOIR:
+            # Algorithm R
+            if len(self._builder) < n:
+                self._builder.append(row)
+            else:
+                j = self._random.randrange(self.total)
+                if j < n:
+                    self._builder.set(j, row)
+
+        elif self.timestamp_index is None:
+            if len(self._builder) < n:
+                self._builder.append(row)
+
+        else:
+            # Min heap on timestamp pointing to the slot of the row: the least recent row kept is replaced first
+            # ISO 8601 timestamps in UTC sort the same as the time they represent
+            timestamp = str(row[self.timestamp_index])
+            if len(self._builder) < n:
+                heapq.heappush(self._heap, (timestamp, self.total, len(self._builder)))
+                self._builder.append(row)
+            elif n > 0 and timestamp > self._heap[0][0]:
+                _, _, slot = heapq.heapreplace(self._heap, (timestamp, self.total, self._heap[0][2]))
+                self._builder.set(slot, row)
+
+    def to_table(self, columns: list[str], sort_by: int | None = None) -> Table:
+        """
+        Builds a Table of the kept rows, see helpers.ColumnBuilder.to_table
+        """
+        return self._builder.to_table(columns, sort_by)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return self._builder.rows()
+
+    def __len__(self) -> int:
+        return len(self._builder)
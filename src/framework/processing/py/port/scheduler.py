@@ -0,0 +1,269 @@
+"""
+Contains classes to keep the extraction of tables within a time and memory budget
+
+Extraction runs in a single thread (in the browser there is nothing else),
+so budgets cannot interrupt an extractor. Extractors check their budget
+cooperatively in their record loops by iterating over TableBudget.records.
+"""
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+import logging
+import math
+import time
+
+from port.planner import Strategy
+from port.sampling import FULL, RowPolicy, RowSample
+from port.table import Table
+
+if TYPE_CHECKING:
+    from port.governor import MemoryGovernor
+    from port.planner import Plan
+
+logger = logging.getLogger(__name__)
+
+# Number of records between two checks of the clock
+CHECK_INTERVAL = 256
+
+
+class TableBudget:
+    """
+    Time and memory budget for the extraction of a single table
+
+    Attributes:
+        table_id: table the budget belongs to
+        deadline: time.monotonic() value after which the budget is exhausted
+        row_cap: maximum number of records to extract, None for no maximum
+        n_records: number of records handed out by records()
+        reason: why the extractor stopped early ("time", "rows", "memory" or "plan"), None if it did not
+        row_policy: how many of the extracted rows to keep
+        sample: the RowSample created by rows(), None if the extractor did not ask for one
+        window: [start, end) in epoch seconds, records outside it are skipped. None for no window, either bound can be None
+        n_outside_window: number of records skipped by the window
+    """
+
+    __slots__ = (
+        "table_id", "deadline", "row_cap", "n_records", "reason",
+        "row_policy", "sample", "window", "n_outside_window",
+    )
+
+    def __init__(
+        self,
+        table_id: str,
+        deadline: float,
+        row_cap: int | None = None,
+        row_policy: RowPolicy = FULL,
+        window: tuple[float | None, float | None] | None = None,
+    ):
+        self.table_id = table_id
+        self.deadline = deadline
+        self.row_cap = row_cap
+        self.n_records = 0
+        self.reason: str | None = None
+        self.row_policy = row_policy
+        self.sample: RowSample | None = None
+        self.window = window
+        self.n_outside_window = 0
+
+    def rows(self, timestamp_index: int | None = None) -> RowSample:
+        """
+        Returns the container extractors append their rows to, it applies the row policy
+        """
+        self.sample = RowSample(self.row_policy, timestamp_index, seed=self.table_id)
+        return self.sample
+
+    @property
+    def truncated(self) -> bool:
+        """
+        True when the extractor stopped before all records were extracted
+        """
+        return self.reason is not None
+
+    def truncate(self, reason: str) -> None:
+        """
+        Marks the table as truncated
+        """
+        if self.reason is None:
+            logger.warning("Budget exhausted for table: %s; reason: %s", self.table_id, reason)
+            self.reason = reason
+
+    def expired(self) -> bool:
+        """
+        Checks the clock, marks the table as truncated once the deadline has passed
+        """
+        if not self.truncated and time.monotonic() >= self.deadline:
+            self.truncate("time")
+        return self.truncated
+
+    def in_window(self, timestamp: Any) -> bool:
+        """
+        Whether a raw epoch timestamp lies within the window
+
+        Timestamps that are not a number cannot be placed and are considered within the window
+        """
+        if self.window is None:
+            return True
+
+        try:
+            t = int(timestamp)
+        except (ValueError, TypeError):
+            return True
+
+        start, end = self.window
+        return (start is None or t >= start) and (end is None or t < end)
+
+    def records(self, items: Iterable[Any], timestamp_key: str | None = None) -> Iterator[Any]:
+        """
+        Iterates over items, stops when the budget runs out
+
+        If timestamp_key is given, items are dicts with a raw epoch timestamp under that key,
+        items outside the window are skipped before the extractor sees them.
+        Nested record loops share the same count
+        """
+        for i, item in enumerate(items):
+            if self.truncated:
+                return
+            if i % CHECK_INTERVAL == 0 and self.expired():
+                return
+            if timestamp_key is not None and not self.in_window(item.get(timestamp_key)):
+                self.n_outside_window += 1
+                continue
+            if self.row_cap is not None and self.n_records >= self.row_cap:
+                self.truncate("rows")
+                return
+
+            self.n_records += 1
+            yield item
+
+
+class _UnlimitedBudget(TableBudget):
+    """
+    Budget that never runs out and keeps no state, it is shared by all extractors called outside a Scheduler
+    """
+
+    __slots__ = ()
+
+    def rows(self, timestamp_index: int | None = None) -> RowSample:
+        return RowSample(self.row_policy, timestamp_index)
+
+    def records(self, items: Iterable[Any], timestamp_key: str | None = None) -> Iterator[Any]:
+        return iter(items)
+
+
+UNLIMITED = _UnlimitedBudget("unlimited", math.inf)
+
+
+class Scheduler:
+    """
+    Runs extractors within a time budget per table and for the whole session
+
+    Attributes:
+        table_budget: default number of seconds a single table may take
+        session_budget: number of seconds all tables together may take
+        governor: optional MemoryGovernor that decides how tables are read given the memory in use
+        window: optional [start, end) in epoch seconds, only records within it are extracted
+        plan: optional Plan with the strategy per table, the governor can only degrade it further
+        timeouts: tables that were truncated or skipped
+    """
+
+    def __init__(
+        self,
+        table_budget: float,
+        session_budget: float,
+        governor: "MemoryGovernor | None" = None,
+        window: tuple[float | None, float | None] | None = None,
+        plan: "Plan | None" = None,
+    ):
+        self.table_budget = table_budget
+        self.session_budget = session_budget
+        self.session_deadline = time.monotonic() + session_budget
+        self.governor = governor
+        self.window = window
+        self.plan = plan
+        self.timeouts: list[dict[str, Any]] = []
+
+    def budget(self, table_id: str, table_budget: float | None = None) -> TableBudget:
+        """
+        Creates the budget for a table, it never exceeds the session deadline
+        """
+        seconds = self.table_budget if table_budget is None else table_budget
+        deadline = min(time.monotonic() + seconds, self.session_deadline)
+        budget = TableBudget(table_id, deadline, window=self.window)
+
+        if self.governor is not None:
+            budget.row_cap = self.governor.row_cap
+
+        if self.plan is not None:
+            strategy = self.plan.strategy(table_id)
+            if strategy is Strategy.CAPPED and self.plan.row_cap is not None:
+                budget.row_cap = min(self.plan.row_cap, budget.row_cap or self.plan.row_cap)
+
+        return budget
+
+    def run(
+        self,
+        table_id: str,
+        extractor: Callable[..., Table],
+        *args: Any,
+        table_budget: float | None = None,
+        priority: int = 1,
+        row_policy: RowPolicy = FULL,
+    ) -> tuple[Table, TableBudget]:
+        """
+        Runs extractor(*args, budget=...) and records it when the budget ran out
+
+        The table is skipped and an empty Table is returned if the session budget
+        is already exhausted, or if the governor skips tables of this priority
+        """
+        budget = self.budget(table_id, table_budget)
+        budget.row_policy = row_policy
+
+        if time.monotonic() >= self.session_deadline:
+            return self.skip(table_id, budget, "time")
+
+        if self.governor is not None and self.governor.skips(priority):
+            return self.skip(table_id, budget, "memory")
+
+        if self.plan is not None and self.plan.strategy(table_id) is Strategy.SKIPPED:
+            return self.skip(table_id, budget, "plan")
+
+        if self.plan is not None:
+            self.plan.started(table_id)
+
+        start = time.perf_counter()
+        try:
+            df = extractor(*args, budget=budget)
+        except MemoryError:
+            logger.error("Ran out of memory while extracting table: %s", table_id)
+            df = Table()
+            budget.truncate("memory")
+            if self.governor is not None:
+                self.governor.out_of_memory()
+
+        seconds = round(time.perf_counter() - start, 3)
+        if self.plan is not None:
+            self.plan.observe(table_id, seconds, df)
+        logger.info("Extracted table: %s; rows: %s; seconds: %s", table_id, len(df), seconds)
+
+        if budget.n_outside_window > 0:
+            logger.info("Filtered table: %s; %s records outside the study period", table_id, budget.n_outside_window)
+
+        if budget.sample is not None:
+            budget.sample.release()
+            if budget.sample.sampled:
+                logger.info("Sampled table: %s; kept %s of %s rows", table_id, budget.sample.kept, budget.sample.total)
+
+        if budget.truncated:
+            self.timeouts.append({"table": table_id, "status": "truncated", "reason": budget.reason, "rows": len(df), "seconds": seconds})
+
+        if self.governor is not None:
+            self.governor.observe(df)
+
+        return df, budget
+
+    def skip(self, table_id: str, budget: TableBudget, reason: str) -> tuple[Table, TableBudget]:
+        """
+        Records a table that is not extracted at all
+        """
+        logger.warning("Skipped table: %s; reason: %s", table_id, reason)
+        budget.reason = reason
+        self.timeouts.append({"table": table_id, "status": "skipped", "reason": reason, "rows": 0, "seconds": 0.0})
+        return Table(), budget
@@ -1,26 +1,65 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Iterator
+import functools
+import gc
 import logging
 import json
 import io
 
-import pandas as pd
-
 from port.api.commands import (CommandSystemDonate, CommandSystemExit, CommandUIRender)
 import port.api.props as props
+from port.aggregate import Aggregation, Period, aggregate
+import port.blockcache as blockcache
+from port.cache import ResultCache, zip_fingerprint
 import port.facebook as facebook
+import port.jsonbackend as jsonbackend
+import port.latency as latency
+import port.planner as planner
+import port.profiling as profiling
+import port.unzipddp as unzipddp
+from port.governor import MemoryGovernor
+from port.sampling import FULL, RowPolicy, Sampling
+from port.scheduler import Scheduler, TableBudget
+from port.table import Table
 from port.validate import DDPFiletype
 
 
 LOG_STREAM = io.StringIO()
 
-logging.basicConfig(
-    stream=LOG_STREAM,
-    level=logging.INFO,
-    format="%(asctime)s --- %(name)s --- %(levelname)s --- %(message)s",
-    datefmt="%Y-%m-%dT%H:%M:%S%z",
-)
-
 LOGGER = logging.getLogger("script")
 
+# Time budgets in seconds for the extraction of a single table and of all tables together
+# A table can override TABLE_TIME_BUDGET with FacebookTable.time_budget
+TABLE_TIME_BUDGET = 30
+SESSION_TIME_BUDGET = 180
+
+# Memory in bytes at which extraction switches to row caps and to skipping low priority tables
+# Memory is measured as the size of the extracted frames, or with tracemalloc if MEMORY_USE_TRACEMALLOC
+MEMORY_THRESHOLDS = (512 * 1024**2, 768 * 1024**2)
+MEMORY_ROW_CAP = 50_000
+MEMORY_USE_TRACEMALLOC = False
+
+# Pick the strategy of every table (in-memory, capped or skipped) before extraction,
+# from the sizes of its files in the zipfile and the MEMORY_THRESHOLDS, see port.planner
+PLAN_EXTRACTION = True
+
+# Only activity within [start, end) is extracted, None extracts everything
+# Use timezone aware datetimes, either bound can be None, for example:
+# STUDY_PERIOD = (datetime(2023, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 1, tzinfo=timezone.utc))
+STUDY_PERIOD: tuple[datetime | None, datetime | None] | None = None
+
+# Number of zipfiles of which the validation is kept
+# A participant that submits the same zipfile again after a retry is not validated again, 0 disables reuse
+RESULT_CACHE_SIZE = 2
+RESULT_CACHE = ResultCache(RESULT_CACHE_SIZE)
+
+# Run the extraction of every session under cProfile, the PROFILE_TOP functions by cumulative time
+# are logged in at most PROFILE_MAX_BYTES. A single session is profiled with port.start(session_id, profile=True)
+PROFILE_EXTRACTION = False
+PROFILE_TOP = 25
+PROFILE_MAX_BYTES = 8 * 1024
+
 # Headers
 SUBMIT_FILE_HEADER = props.Translatable({
     "en": "Select your Facebook file", 
@@ -37,15 +76,34 @@ RETRY_HEADER = props.Translatable({
     "nl": "Probeer opnieuw"
 })
 
+# Buttons of the retry pages
+RETRY_OK = props.Translatable({"en": "Try again", "nl": "Probeer opnieuw"})
+RETRY_CANCEL = props.Translatable({"en": "Continue", "nl": "Verder"})
+
+
+def configure_logging() -> None:
+    """
+    Sends the logs to LOG_STREAM, they are donated during the flow
+    Done when the flow starts instead of on import
+    """
+    logging.basicConfig(
+        stream=LOG_STREAM,
+        level=logging.INFO,
+        format="%(asctime)s --- %(name)s --- %(levelname)s --- %(message)s",
+        datefmt="%Y-%m-%dT%H:%M:%S%z",
+    )
+
 
-def process(session_id):
+def process(session_id, profile=False):
+    configure_logging()
     LOGGER.info("Starting the donation flow")
     yield donate_logs(f"{session_id}-tracking")
 
-    platform = ("Facebook", extract_facebook, facebook.validate)
+    platform = ("Facebook", extract_facebook_progressively, facebook.validate)
     platform_name, extraction_fun, validation_fun = platform
 
-    table_list = None
+    table_stream = None
+    profiler = None
     group_list = []
     selected_groups = []
 
@@ -59,26 +117,19 @@ def process(session_id):
         file_result = yield render_page(platform_name, file_prompt)
 
         if file_result.__type__ == "PayloadString":
-            validation = validation_fun(file_result.value)
+            fingerprint = zip_fingerprint(file_result.value)
+            validation = RESULT_CACHE.cached(fingerprint, "validation", lambda: validation_fun(file_result.value))
 
             # DDP is recognized: Status code zero
             if validation.status_code.id == 0: 
-                if validation.ddp_category.ddp_filetype == DDPFiletype.HTML:
-                    # participant downloaded wrong format
-                    retry_result = yield render_page(platform_name, retry_confirmation_wrong_format(platform_name))
-
-                    if retry_result.__type__ == "PayloadTrue":
-                        continue
-                    else:
-                        LOGGER.info("Skipped during retry %s", platform_name)
-                        yield donate_logs(f"{session_id}-tracking")
-                        break
-
-                LOGGER.info("Payload for %s", platform_name)
+                LOGGER.info("Payload for %s; %s", platform_name, validation.ddp_category.ddp_filetype.name)
                 yield donate_logs(f"{session_id}-tracking")
 
-                table_list = extraction_fun(file_result.value, validation)
-                group_list = facebook.groups_to_list(file_result.value)
+                table_stream = extraction_fun(file_result.value, validation)
+                if profile or PROFILE_EXTRACTION:
+                    profiler = profiling.new_profiler()
+                    if profiler is not None:
+                        table_stream = profiling.profiled(table_stream, profiler)
                 break
 
             # DDP is not recognized: Different status code
@@ -111,21 +162,40 @@ def process(session_id):
             break
 
     # Render data on screen
-    if table_list is not None:
+    if table_stream is not None:
         LOGGER.info("Prompt consent; %s", platform_name)
         yield donate_logs(f"{session_id}-tracking")
 
+        # Render the tables that are ready while the rest is being extracted
+        table_list = []
+        for table_list, pending in table_stream:
+            if pending > 0:
+                LOGGER.info("Render consent form with %s tables; %s pending", len(table_list), pending)
+                yield render_page(platform_name, create_consent_form(table_list, loading=True))
+
+        if profiler is not None:
+            LOGGER.info("Extraction profile: %s", profiling.summarize(profiler, PROFILE_TOP, PROFILE_MAX_BYTES))
+            profiler = None
+
+        views = derive_views(table_list, file_result.value, validation.ddp_category.ddp_filetype == DDPFiletype.HTML)
+        group_list = views["group_list"]
+
         # Check if extract something got extracted
         if len(table_list) == 0:
-            table_list.append(create_empty_table(platform_name))
+            table_list = [create_empty_table(platform_name)]
 
         consent_form_prompt = create_consent_form(table_list)
         consent_result = yield render_page(platform_name, consent_form_prompt)
 
+        # The questionnaires only need the group list
+        del table_list, table_stream, consent_form_prompt, views
+        release_tables()
+
         if consent_result.__type__ == "PayloadJSON":
             LOGGER.info("Data donated; %s", platform_name)
             yield donate_logs(f"{session_id}-tracking")
             yield donate(platform_name, consent_result.value)
+            consent_result = None
 
             # If donation render checkbox list
             if len(group_list) > 0:
@@ -150,6 +220,15 @@ def process(session_id):
             LOGGER.info("Skipped ater reviewing consent: %s", platform_name)
             yield donate_logs(f"{session_id}-tracking")
 
+    # Still open if the flow ended before the consent form
+    unzipddp.close_cached_file()
+    LOGGER.info("Latency per command: %s", json.dumps(latency.RECORDER.summary()))
+    if blockcache.TOTALS.requests:
+        LOGGER.info("Reads of the zipfile: %s", blockcache.TOTALS)
+    if jsonbackend.STATS.calls:
+        LOGGER.info("JSON decoding: %s", jsonbackend.STATS)
+    yield donate_logs(f"{session_id}-tracking")
+
     yield exit(0, "Success")
     yield render_end_page()
 
@@ -167,11 +246,24 @@ def parse_questionnaire_json(json_str: str) -> list["str"]:
 
 
 
-def create_consent_form(table_list: list[props.PropsUIPromptConsentFormTable]) -> props.PropsUIPromptConsentForm:
+def create_consent_form(table_list: list[props.PropsUIPromptConsentFormTable], loading: bool = False) -> props.PropsUIPromptConsentForm:
     """
     Assembles all donated data in consent form to be displayed
+    While loading the form is shown, but donation is held until the form is rendered again
     """
-    return props.PropsUIPromptConsentForm(table_list, meta_tables=[])
+    return props.PropsUIPromptConsentForm(table_list, meta_tables=[], loading=loading)
+
+
+def release_tables() -> None:
+    """
+    Frees the memory of the tables once the consent form is done
+
+    The process generator drops its references first, nothing else holds on to the tables.
+    The blocks of the zipfile that were kept for the extraction are released.
+    """
+    unzipddp.close_cached_file()
+
+    LOGGER.info("Released tables; %s objects collected", gc.collect())
 
 
 def donate_logs(key):
@@ -192,223 +284,522 @@ def donate_status(filename: str, message: str):
 ##################################################################
 # Extraction function
 
-def extract_facebook(facebook_zip: str, _) -> list[props.PropsUIPromptConsentFormTable]:
+def extract_facebook(facebook_zip: str, validation) -> list[props.PropsUIPromptConsentFormTable]:
+    """
+    Extracts all tables at once, see extract_facebook_progressively
+    """
     tables_to_render = []
+    for tables_to_render, _ in extract_facebook_progressively(facebook_zip, validation):
+        pass
 
-    username = facebook.get_username(facebook_zip)
-    emails = facebook.get_emails(facebook_zip)
-    numbers = facebook.get_phone_numbers(facebook_zip)
-    redact = [*username, *emails, *numbers]
+    return tables_to_render
 
-    df = facebook.who_youve_followed_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "who_youve_followed"
-        table_title = props.Translatable({
-            "en": "Who you've followed", 
-            "nl": "Wie je volgt", 
-        })
-        description = props.Translatable({
-            "nl": "Hier is een lijst van de mensen en pagina's die je hebt gekozen om te volgen op Facebook.", 
-            "en": "Here is a list of the people and pages you have chosen to follow on Facebook.",
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
 
-    df = facebook.your_friends_to_df(facebook_zip)
+def extract_facebook_progressively(facebook_zip: str, validation) -> Iterator[tuple[list[props.PropsUIPromptConsentFormTable], int]]:
+    """
+    Extracts the tables in FACEBOOK_TABLES, cheap tables first
+
+    Yields the tables extracted so far (in display order) together with
+    the number of tables that still have to be extracted:
+    once after all light tables, and after every heavy table.
+    Tables that turn out to be empty count as done.
+
+    Extraction is kept within TABLE_TIME_BUDGET and SESSION_TIME_BUDGET,
+    tables that ran out of time are shown partially.
+    When memory grows beyond MEMORY_THRESHOLDS extraction degrades gracefully,
+    with PLAN_EXTRACTION tables that are expected to be large start at a cheaper strategy.
+    Only records within the STUDY_PERIOD are extracted.
+    For html exports the html_extractor of a table is used, tables without one are left out.
+    """
+    html = validation is not None and validation.ddp_category.ddp_filetype == DDPFiletype.HTML
+    specs = [spec for spec in FACEBOOK_TABLES if not html or spec.html_extractor is not None]
+    light_tables = [spec for spec in specs if not spec.heavy]
+    heavy_tables = [spec for spec in specs if spec.heavy]
 
-    if not df.empty:
-        table_id = "your_friends"
-        table_title = props.Translatable(
-            {
-                "en": "Your friends", 
-                "nl": "Jouw vrienden", 
-             })
-        description = props.Translatable({
-            "nl": "De mensen die je hebt toegevoegd als vrienden op Facebook.", 
-            "en": "The people you have added as friends on Facebook.",
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
+    plan = plan_extraction(facebook_zip, light_tables + heavy_tables, html) if PLAN_EXTRACTION else None
+    governor = MemoryGovernor(MEMORY_THRESHOLDS, MEMORY_ROW_CAP, MEMORY_USE_TRACEMALLOC)
+    scheduler = Scheduler(TABLE_TIME_BUDGET, SESSION_TIME_BUDGET, governor, study_period_to_epoch(STUDY_PERIOD), plan)
 
+    if html:
+        redact = facebook.get_profile_html(facebook_zip)
+    else:
+        username = facebook.get_username(facebook_zip)
+        emails = facebook.get_emails(facebook_zip)
+        numbers = facebook.get_phone_numbers(facebook_zip)
+        redact = [*username, *emails, *numbers]
 
-    df = facebook.ads_interests_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "ads_interests"
-        table_title = props.Translatable(
-            {
-                "en": "Ads interests", 
-                "nl": "Interesse in advertenties", 
-             })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df)
-        tables_to_render.append(table)
+    extracted = {}
 
+    for spec in light_tables:
+        extracted[spec.id] = extract_table(spec, facebook_zip, redact, scheduler, html)
 
-    df = facebook.recently_visited_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "recently_visited"
-        table_title = props.Translatable(
-            {
-                "en": "Recently visited", 
-                "nl": "Onlangs bezocht", 
-             })
-        description = props.Translatable({
-            "nl": "Items, pagina's of inhoud die je onlangs hebt bekeken op Facebook.", 
-            "en": "Items, pages, or content you have recently viewed on Facebook.",
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
+    pending = len(heavy_tables)
+    for spec in heavy_tables:
+        yield collect_tables(extracted), pending
+        extracted[spec.id] = extract_table(spec, facebook_zip, redact, scheduler, html)
+        pending -= 1
 
+    LOGGER.info("Extraction timeouts: %s", json.dumps(scheduler.timeouts))
+    LOGGER.info("Memory governor level: %s; frames: %s bytes", governor.level, governor.frames_bytes)
+    if plan is not None:
+        LOGGER.info("Extraction plan accuracy: %s", json.dumps(plan.accuracy()))
+    governor.stop()
+    yield collect_tables(extracted), 0
 
-    df = facebook.profile_information_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "profile_information"
-        table_title = props.Translatable(
-            {
-                "en": "Profile information", 
-                "nl": "Profielinformatie", 
-             }
-        )
-        description = props.Translatable({
-            "nl": "Hierin zit informatie over je gender en voornaamwoorden (pronouns)", 
-            "en": "This contains information about your gender and pronouns.",
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
 
+def plan_extraction(facebook_zip: str, specs: list["FacebookTable"], html: bool) -> planner.Plan:
+    """
+    Plans the strategy of the tables in the order they are extracted, see port.planner
+    """
+    plan = planner.plan(
+        facebook_zip,
+        [planner.PlannedTable(spec.id, spec.files, spec.priority) for spec in specs],
+        ".html" if html else ".json",
+        MEMORY_THRESHOLDS,
+        MEMORY_ROW_CAP,
+        SESSION_TIME_BUDGET,
+    )
+    LOGGER.info("Extraction plan: %s", json.dumps(plan.to_list()))
+    return plan
 
-    df = facebook.your_event_responses_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "your_event_responses"
-        table_title = props.Translatable(
-            {
-                "en": "Your event responses", 
-                "nl": "Je reacties op evenementen", 
-             }
-        )
-        description = props.Translatable({
-            "nl": "Jouw reacties op evenementenuitnodigingen op Facebook.", 
-            "en": "Your responses to event invitations on Facebook.",
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
 
+def study_period_to_epoch(period: tuple[datetime | None, datetime | None] | None) -> tuple[float | None, float | None] | None:
+    """
+    Converts the study period to epoch seconds, the unit of the timestamps in a DDP
+    """
+    if period is None:
+        return None
 
-    df = facebook.group_posts_and_comments_to_df(facebook_zip, redact)
-    if not df.empty:
-        table_id = "group_posts_and_comments"
-        table_title = props.Translatable(
-            {
-                "en": "Group posts and comments", 
-                "nl": "Groepsberichten en reacties", 
-             })
-        description = props.Translatable({
-            "nl": "Berichten en reacties die je hebt geplaatst in Facebook-groepen", 
-            "en": "Posts and comments you have made in Facebook groups."
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
+    start, end = period
+    return (
+        start.timestamp() if start is not None else None,
+        end.timestamp() if end is not None else None,
+    )
 
 
-    df = facebook.your_comments_in_groups_to_df(facebook_zip, redact)
-    if not df.empty:
-        table_id = "your_comments_in_groups"
-        table_title = props.Translatable(
-            {
-                "en": "Your comments in groups",
-                "nl": "Jouw reacties in groepen",
-             })
-        description = props.Translatable({
-            "nl": "Reacties die je hebt geplaatst op Facebook-berichten, pagina's en groepen.", 
-            "en": "Comments you have posted on Facebook posts, pages, and groups.",
+def extract_table(
+    spec: "FacebookTable",
+    facebook_zip: str,
+    redact: list[str],
+    scheduler: Scheduler,
+    html: bool = False,
+) -> props.PropsUIPromptConsentFormTable | None:
+    """
+    Runs the extractor of a single table, returns None if nothing was extracted
+    """
+    args = (facebook_zip, redact) if spec.redact else (facebook_zip,)
+    df, budget = scheduler.run(
+        spec.id,
+        spec.html_extractor if html else spec.extractor,
+        *args,
+        table_budget=spec.time_budget,
+        priority=spec.priority,
+        row_policy=spec.row_policy,
+    )
+
+    sampled = budget.sample is not None and budget.sample.sampled
+    if df.empty:
+        return None
+
+    description = spec.description
+    if budget.truncated:
+        description = add_note(description, TRUNCATED_NOTE)
+    if sampled:
+        description = add_note(description, {
+            "en": SAMPLED_NOTE["en"].format(kept=budget.sample.kept, total=budget.sample.total),
+            "nl": SAMPLED_NOTE["nl"].format(kept=budget.sample.kept, total=budget.sample.total),
         })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
 
+    scale, note = chart_scale(budget)
+    visualizations = [aggregate(df, aggregation, scale, note) for aggregation in spec.visualizations]
+    visualizations = [visualization for visualization in visualizations if visualization is not None]
 
-    df = facebook.your_group_membership_activity_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "your_group_membership_activity_to_df"
-        table_title = props.Translatable(
-            {
-                "en": "Your group membership activity",
-                "nl": "Je activiteit in groepen",
-             })
-        description = props.Translatable({
-            "nl": "Jouw activiteit binnen Facebook-groepen, zoals berichten en interacties.", 
-            "en": "Your activity within Facebook groups, such as posts and interactions.",
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
+    partial = budget.truncated or sampled or budget.n_outside_window > 0
+    return props.PropsUIPromptConsentFormTable(spec.id, spec.title, df, description, visualizations or None, partial=partial)
 
 
-    df = facebook.pages_youve_liked_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "pages_youve_liked"
-        table_title = props.Translatable(
-            {
-                "en": "Pages you've liked",
-                "nl": "Pagina's die jij leuk vind",
-             })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df)
-        tables_to_render.append(table)
-
-    df = facebook.comments_to_df(facebook_zip, redact)
-    if not df.empty:
-        table_id = "comments"
-        table_title = props.Translatable(
-            {
-                "en": "Your comments",
-                "nl": "Jouw reacties",
-             })
-        description = props.Translatable({
+TRUNCATED_NOTE = {
+    "en": "Not all of this data could be loaded, only part of it is shown.",
+    "nl": "Niet al deze gegevens konden worden geladen, alleen een deel wordt getoond.",
+}
+
+SAMPLED_NOTE = {
+    "en": "Shown are {kept} of your {total} items.",
+    "nl": "Getoond worden {kept} van uw {total} items.",
+}
+
+
+# Added to the titles of charts of tables that are not complete
+SAMPLED_CHART_NOTE = {
+    "en": "(estimated from a sample)",
+    "nl": "(geschat op basis van een steekproef)",
+}
+
+RECENT_CHART_NOTE = {
+    "en": "(most recent {kept} items)",
+    "nl": "(meest recente {kept} items)",
+}
+
+TRUNCATED_CHART_NOTE = {
+    "en": "(based on part of your data)",
+    "nl": "(op basis van een deel van uw gegevens)",
+}
+
+
+def chart_scale(budget: TableBudget) -> tuple[float, dict[str, str] | None]:
+    """
+    The scale of the counts in the charts of a table and the note for their titles
+
+    A uniform sample is scaled to the number of records it was taken from.
+    The most recent records are not scaled, they do not represent older periods.
+    Records that were never read cannot be estimated, the chart then says it is partial.
+    """
+    scale, note = 1.0, None
+    sample = budget.sample
+    if sample is not None and sample.sampled and sample.kept > 0:
+        if sample.policy.sampling == Sampling.RESERVOIR:
+            scale, note = sample.total / sample.kept, SAMPLED_CHART_NOTE
+        else:
+            note = {language: text.format(kept=sample.kept) for language, text in RECENT_CHART_NOTE.items()}
+
+    if budget.truncated:
+        note = TRUNCATED_CHART_NOTE
+
+    return scale, note
+
+
+def add_note(description: props.Translatable | None, note: dict[str, str]) -> props.Translatable:
+    """
+    Appends a note to the description of a table
+    """
+    if description is None:
+        return props.Translatable({"en": note["en"], "nl": note["nl"]})
+
+    return props.Translatable({
+        "en": f"{description.translations['en']} {note['en']}",
+        "nl": f"{description.translations['nl']} {note['nl']}",
+    })
+
+
+def collect_tables(extracted: dict[str, props.PropsUIPromptConsentFormTable | None]) -> list[props.PropsUIPromptConsentFormTable]:
+    """
+    Returns the extracted tables in the order of FACEBOOK_TABLES
+    """
+    return [extracted[spec.id] for spec in FACEBOOK_TABLES if extracted.get(spec.id) is not None]  # pyright: ignore
+
+
+@dataclass
+class FacebookTable:
+    """
+    A table shown in the consent form
+
+    Attributes:
+        id: id of the consent form table
+        title: title of the table
+        extractor: function in port.facebook that creates the table
+        description: optional description of the table
+        redact: whether the extractor takes the list of strings to redact
+        heavy: heavy tables are extracted after the consent form is first rendered
+        time_budget: seconds the extraction may take, defaults to TABLE_TIME_BUDGET
+        priority: tables with priority 0 are the first to be skipped when memory runs low
+        row_policy: how many rows to keep, see port.sampling
+        html_extractor: function in port.facebook that creates the table from an html export,
+            None if the table is not available in html exports
+        visualizations: charts of the table, computed after extraction, see port.aggregate
+        files: names of the files the table is extracted from, without suffix, used by port.planner
+    """
+    id: str
+    title: props.Translatable
+    extractor: Callable[..., Table]
+    description: props.Translatable | None = None
+    redact: bool = False
+    heavy: bool = False
+    time_budget: float | None = None
+    priority: int = 1
+    row_policy: RowPolicy = FULL
+    html_extractor: Callable[..., Table] | None = None
+    visualizations: tuple[Aggregation, ...] = ()
+    files: tuple[str, ...] = ()
+
+
+FACEBOOK_TABLES = [
+    FacebookTable(
+        id="who_youve_followed",
+        title=props.Translatable({
+            "en": "Who you've followed", 
+            "nl": "Wie je volgt", 
+        }),
+        extractor=facebook.who_youve_followed_to_df,
+        files=("who_you've_followed",),
+        html_extractor=facebook.who_youve_followed_html_to_df,
+        description=props.Translatable({
+            "nl": "Hier is een lijst van de mensen en pagina's die je hebt gekozen om te volgen op Facebook.", 
+            "en": "Here is a list of the people and pages you have chosen to follow on Facebook.",
+        }),
+        priority=0,
+    ),
+    FacebookTable(
+        id="your_friends",
+        title=props.Translatable({
+            "en": "Your friends", 
+            "nl": "Jouw vrienden", 
+        }),
+        extractor=facebook.your_friends_to_df,
+        files=("your_friends",),
+        html_extractor=facebook.your_friends_html_to_df,
+        description=props.Translatable({
+            "nl": "De mensen die je hebt toegevoegd als vrienden op Facebook.", 
+            "en": "The people you have added as friends on Facebook.",
+        }),
+    ),
+    FacebookTable(
+        id="ads_interests",
+        title=props.Translatable({
+            "en": "Ads interests", 
+            "nl": "Interesse in advertenties", 
+        }),
+        extractor=facebook.ads_interests_to_df,
+        files=("ads_interests",),
+    ),
+    FacebookTable(
+        id="recently_visited",
+        title=props.Translatable({
+            "en": "Recently visited", 
+            "nl": "Onlangs bezocht", 
+        }),
+        extractor=facebook.recently_visited_to_df,
+        files=("recently_visited",),
+        description=props.Translatable({
+            "nl": "Items, pagina's of inhoud die je onlangs hebt bekeken op Facebook.", 
+            "en": "Items, pages, or content you have recently viewed on Facebook.",
+        }),
+        heavy=True,
+        priority=0,
+        row_policy=RowPolicy(Sampling.HEAD, 5_000),
+    ),
+    FacebookTable(
+        id="profile_information",
+        title=props.Translatable({
+            "en": "Profile information", 
+            "nl": "Profielinformatie", 
+        }),
+        extractor=facebook.profile_information_to_df,
+        files=("profile_information",),
+        description=props.Translatable({
+            "nl": "Hierin zit informatie over je gender en voornaamwoorden (pronouns)", 
+            "en": "This contains information about your gender and pronouns.",
+        }),
+    ),
+    FacebookTable(
+        id="your_event_responses",
+        title=props.Translatable({
+            "en": "Your event responses", 
+            "nl": "Je reacties op evenementen", 
+        }),
+        extractor=facebook.your_event_responses_to_df,
+        files=("your_event_responses",),
+        html_extractor=facebook.your_event_responses_html_to_df,
+        description=props.Translatable({
+            "nl": "Jouw reacties op evenementenuitnodigingen op Facebook.", 
+            "en": "Your responses to event invitations on Facebook.",
+        }),
+    ),
+    FacebookTable(
+        id="group_posts_and_comments",
+        title=props.Translatable({
+            "en": "Group posts and comments", 
+            "nl": "Groepsberichten en reacties", 
+        }),
+        extractor=facebook.group_posts_and_comments_to_df,
+        files=("group_posts_and_comments",),
+        html_extractor=facebook.group_posts_and_comments_html_to_df,
+        description=props.Translatable({
+            "nl": "Berichten en reacties die je hebt geplaatst in Facebook-groepen", 
+            "en": "Posts and comments you have made in Facebook groups."
+        }),
+        redact=True,
+        heavy=True,
+        visualizations=(
+            Aggregation(
+                title=props.Translatable({"en": "Posts and comments per month", "nl": "Berichten en reacties per maand"}),
+                column="Date",
+                period=Period.MONTH,
+            ),
+        ),
+    ),
+    FacebookTable(
+        id="your_comments_in_groups",
+        title=props.Translatable({
+            "en": "Your comments in groups",
+            "nl": "Jouw reacties in groepen",
+        }),
+        extractor=facebook.your_comments_in_groups_to_df,
+        files=("your_comments_in_groups",),
+        html_extractor=facebook.your_comments_in_groups_html_to_df,
+        description=props.Translatable({
             "nl": "Reacties die je hebt geplaatst op Facebook-berichten, pagina's en groepen.", 
             "en": "Comments you have posted on Facebook posts, pages, and groups.",
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
-
-    df = facebook.likes_and_reactions_to_df(facebook_zip, redact)
-    if not df.empty:
-        table_id = "likes_and_reactions"
-        table_title = props.Translatable(
-            {
-                "en": "Your likes and reactions",
-                "nl": "Je likes en reacties",
-             })
-        description = props.Translatable({
+        }),
+        redact=True,
+        heavy=True,
+        visualizations=(
+            Aggregation(
+                title=props.Translatable({"en": "Comments per month", "nl": "Reacties per maand"}),
+                column="Timestamp",
+                period=Period.MONTH,
+            ),
+            Aggregation(
+                title=props.Translatable({"en": "Groups you comment in most", "nl": "Groepen waarin je het meest reageert"}),
+                column="Group",
+                top=10,
+            ),
+        ),
+    ),
+    FacebookTable(
+        id="your_group_membership_activity_to_df",
+        title=props.Translatable({
+            "en": "Your group membership activity",
+            "nl": "Je activiteit in groepen",
+        }),
+        extractor=facebook.your_group_membership_activity_to_df,
+        files=("your_group_membership_activity",),
+        html_extractor=facebook.your_group_membership_activity_html_to_df,
+        description=props.Translatable({
+            "nl": "Jouw activiteit binnen Facebook-groepen, zoals berichten en interacties.", 
+            "en": "Your activity within Facebook groups, such as posts and interactions.",
+        }),
+        redact=True,
+        heavy=True,
+    ),
+    FacebookTable(
+        id="pages_youve_liked",
+        title=props.Translatable({
+            "en": "Pages you've liked",
+            "nl": "Pagina's die jij leuk vind",
+        }),
+        extractor=facebook.pages_youve_liked_to_df,
+        files=("pages_you've_liked",),
+        html_extractor=facebook.pages_youve_liked_html_to_df,
+        priority=0,
+    ),
+    FacebookTable(
+        id="comments",
+        title=props.Translatable({
+            "en": "Your comments",
+            "nl": "Jouw reacties",
+        }),
+        extractor=facebook.comments_to_df,
+        files=("comments",),
+        html_extractor=facebook.comments_html_to_df,
+        description=props.Translatable({
+            "nl": "Reacties die je hebt geplaatst op Facebook-berichten, pagina's en groepen.", 
+            "en": "Comments you have posted on Facebook posts, pages, and groups.",
+        }),
+        redact=True,
+        heavy=True,
+        visualizations=(
+            Aggregation(
+                title=props.Translatable({"en": "Comments per month", "nl": "Reacties per maand"}),
+                column="Timestamp",
+                period=Period.MONTH,
+            ),
+        ),
+    ),
+    FacebookTable(
+        id="likes_and_reactions",
+        title=props.Translatable({
+            "en": "Your likes and reactions",
+            "nl": "Je likes en reacties",
+        }),
+        extractor=facebook.likes_and_reactions_to_df,
+        files=("likes_and_reactions_*",),
+        html_extractor=facebook.likes_and_reactions_html_to_df,
+        description=props.Translatable({
             "nl": "Een overzicht van likes en reacties die je hebt geplaatst op Facebook", 
             "en": "An overview of likes and comments you have made on Facebook.",
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
-
-    df = facebook.your_comment_active_days_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "your_comment_active_days"
-        table_title = props.Translatable(
-            {
-                "en": "Your comment active days",
-                "nl": "Hoe actief je bent op Facebook",
-             })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df)
-        tables_to_render.append(table)
-
-    df = facebook.your_pages_to_df(facebook_zip)
-    if not df.empty:
-        table_id = "your_pages"
-        table_title = props.Translatable(
-            {
-                "en": "Your pages",
-                "nl": "Jouw pagina's",
-             })
-        description = props.Translatable({
+        }),
+        redact=True,
+        heavy=True,
+        priority=0,
+        row_policy=RowPolicy(Sampling.RESERVOIR, 10_000),
+        visualizations=(
+            Aggregation(
+                title=props.Translatable({"en": "Likes and reactions per week", "nl": "Likes en reacties per week"}),
+                column="Timestamp",
+                period=Period.WEEK,
+                chart="line",
+            ),
+            Aggregation(
+                title=props.Translatable({"en": "Your reactions", "nl": "Jouw reacties"}),
+                column="Reaction",
+            ),
+        ),
+    ),
+    FacebookTable(
+        id="your_comment_active_days",
+        title=props.Translatable({
+            "en": "Your comment active days",
+            "nl": "Hoe actief je bent op Facebook",
+        }),
+        extractor=facebook.your_comment_active_days_to_df,
+        files=("your_comment_active_days",),
+    ),
+    FacebookTable(
+        id="your_pages",
+        title=props.Translatable({
+            "en": "Your pages",
+            "nl": "Jouw pagina's",
+        }),
+        extractor=facebook.your_pages_to_df,
+        files=("your_pages",),
+        html_extractor=facebook.your_pages_html_to_df,
+        description=props.Translatable({
             "nl": "Pagina's die je hebt gemaakt of beheert op Facebook.", 
             "en": "Pages you have created or manage on Facebook."
-        })
-        table =  props.PropsUIPromptConsentFormTable(table_id, table_title, df, description)
-        tables_to_render.append(table)
+        }),
+    ),
+]
 
-    return tables_to_render
+
+@dataclass
+class DerivedView:
+    """
+    A secondary output computed from an extracted table, instead of from the zipfile
+
+    Attributes:
+        id: key of the output in the dict returned by derive_views
+        table_id: id of the FacebookTable it is computed from
+        derive: function that computes the output from the Table
+        from_zip: function that computes the output from all records in the zipfile, given whether it is an html export,
+            used when the table is missing or partial: truncated, sampled or limited to the STUDY_PERIOD
+    """
+    id: str
+    table_id: str
+    derive: Callable[[Table], Any]
+    from_zip: Callable[[str, bool], Any]
+
+
+DERIVED_VIEWS = [
+    DerivedView("group_list", "your_group_membership_activity_to_df", facebook.group_names, facebook.groups_to_list),
+]
+
+
+def derive_views(table_list: list[props.PropsUIPromptConsentFormTable], facebook_zip: str, html: bool = False) -> dict[str, Any]:
+    """
+    Computes the DERIVED_VIEWS from the tables in the consent form
+
+    The zipfile is only read again for views of which the table is missing or partial
+    """
+    tables = {table.id: table for table in table_list}
+    views = {}
+    for view in DERIVED_VIEWS:
+        table = tables.get(view.table_id)
+        if table is not None and not table.partial:
+            views[view.id] = view.derive(table.data_frame)
+        else:
+            views[view.id] = view.from_zip(facebook_zip, html)
+
+    return views
 
 
 
@@ -426,6 +817,7 @@ def render_page(header_text, body):
 
 
 
+@functools.cache
 def retry_confirmation(platform):
     text = props.Translatable(
         {
@@ -433,11 +825,10 @@ def retry_confirmation(platform):
             "nl": f"Helaas, kunnen we uw {platform} bestand niet verwerken. Weet u zeker dat u het juiste bestand heeft gekozen? Ga dan verder. Probeer opnieuw als u een ander bestand wilt kiezen."
         }
     )
-    ok = props.Translatable({"en": "Try again", "nl": "Probeer opnieuw"})
-    cancel = props.Translatable({"en": "Continue", "nl": "Verder"})
-    return props.PropsUIPromptConfirm(text, ok, cancel)
+    return props.PropsUIPromptConfirm(text, RETRY_OK, RETRY_CANCEL)
 
 
+@functools.cache
 def retry_confirmation_bad_zip(platform):
     text = props.Translatable(
         {
@@ -445,23 +836,10 @@ def retry_confirmation_bad_zip(platform):
             "en": f"Helaas, kunnen we uw {platform} bestand niet verwerken. Het kan zijn dat u het verkeerde bestand heeft geselecteerd, of uw {platform} zip bestand is zo groot dat het bestand niet ingelezen kan worden. Als u denkt dat het bestand heel erg groot is neem dan contact op met de onderzoeker.",
         }
     )
-    ok = props.Translatable({"en": "Try again", "nl": "Probeer opnieuw"})
-    cancel = props.Translatable({"en": "Continue", "nl": "Verder"})
-    return props.PropsUIPromptConfirm(text, ok, cancel)
-
-
-def retry_confirmation_wrong_format(platform):
-    text = props.Translatable(
-        {
-            "nl": f"Helaas, kunnen we uw {platform} bestand niet verwerken. We denken dat u de Facebook bestanden in html formaat heeft opgevraagd. Bekijk de instructies nog een keer en vraag de Facebook bestanden aan in json formaat. Mocht het niet lukken neem dan contact op met de onderzoeker.",
-            "en": f"Helaas, kunnen we uw {platform} bestand niet verwerken. We denken dat u de Facebook bestanden in html formaat heeft opgevraagd. Bekijk de instructies nog een keer en vraag de Facebook bestanden aan in json formaat. Mocht het niet lukken neem dan contact op met de onderzoeker.",
-        }
-    )
-    ok = props.Translatable({"en": "Try again", "nl": "Probeer opnieuw"})
-    cancel = props.Translatable({"en": "Continue", "nl": "Verder"})
-    return props.PropsUIPromptConfirm(text, ok, cancel)
+    return props.PropsUIPromptConfirm(text, RETRY_OK, RETRY_CANCEL)
 
 
+@functools.cache
 def generate_file_prompt(extensions):
     description = props.Translatable(
         {
@@ -488,7 +866,7 @@ def create_empty_table(platform_name: str) -> props.PropsUIPromptConsentFormTabl
        "en": "Er ging niks mis, maar we konden niks vinden",
        "nl": "Er ging niks mis, maar we konden niks vinden"
     })
-    df = pd.DataFrame(["No data found"], columns=["No data found"])
+    df = Table.from_rows(["No data found"], ["No data found"])
     table = props.PropsUIPromptConsentFormTable(f"{platform_name}_no_data_found", title, df)
     return table
  
@@ -501,6 +879,40 @@ GROUP_QUESTION = props.Translatable(
         "en": "Welke Facebook-groepen vind je het belangrijkst? Selecteer maximaal drie:", 
      })
 
+# Answers to the questions of render_multiple_choice_questions
+AGREEMENT_CHOICES = [
+    props.Translatable(
+        {
+            "en": "1. Helemaal mee oneens", 
+            "nl": "1. Helemaal mee oneens", 
+        }
+    ),
+    props.Translatable(
+        {
+            "en": "2. Mee oneens", 
+            "nl": "2. Mee oneens", 
+        }
+    ),
+    props.Translatable(
+        {
+            "en": "3. Neutraal", 
+            "nl": "3. Neutraal", 
+        }
+    ),
+    props.Translatable(
+        {
+            "en": "4. Mee eens", 
+            "nl": "4. Mee eens", 
+        }
+    ),
+    props.Translatable(
+        {
+            "en": "5. Helemaal mee eens", 
+            "nl": "5. Helemaal mee eens", 
+        }
+    ),
+]
+
 
 def render_checkbox_question(group_list: list):
 
@@ -530,38 +942,7 @@ def render_checkbox_question(group_list: list):
 
 def render_multiple_choice_questions(group_names: list[str]):
 
-    choices = [
-        props.Translatable(
-            {
-                "en": "1. Helemaal mee oneens", 
-                "nl": "1. Helemaal mee oneens", 
-            }
-        ),
-        props.Translatable(
-            {
-                "en": "2. Mee oneens", 
-                "nl": "2. Mee oneens", 
-            }
-        ),
-        props.Translatable(
-            {
-                "en": "3. Neutraal", 
-                "nl": "3. Neutraal", 
-            }
-        ),
-        props.Translatable(
-            {
-                "en": "4. Mee eens", 
-                "nl": "4. Mee eens", 
-            }
-        ),
-        props.Translatable(
-            {
-                "en": "5. Helemaal mee eens", 
-                "nl": "5. Helemaal mee eens", 
-            }
-        ),
-    ] 
+    choices = AGREEMENT_CHOICES
 
     questions = []
     for i, group_name in enumerate(group_names):
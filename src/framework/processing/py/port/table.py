@@ -0,0 +1,147 @@
+"""
+Contains a minimal column table
+
+Loading numpy and pandas in the browser takes several seconds and tens of MB,
+while the extractors only need to hold columns of strings and serialize them.
+Table does just that. pandas is imported only when a caller asks for a DataFrame.
+"""
+from array import array
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Sequence
+import json
+import sys
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class Table:
+    """
+    Named columns of equal length
+
+    Attributes:
+        categorical: names of columns that consist of a small set of repeated values,
+            these are dictionary encoded when serialized and become categoricals in pandas
+    """
+
+    # __weakref__ lets tests check that tables are freed
+    __slots__ = "_columns", "categorical", "__weakref__"
+
+    def __init__(self, columns: dict[str, Sequence[Any]] | None = None):
+        self._columns: dict[str, Sequence[Any]] = dict(columns or {})
+        self.categorical: set[str] = set()
+
+        lengths = {len(values) for values in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns of a Table should have the same length")
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any], columns: list[str]) -> "Table":
+        """
+        Creates a Table from tuples, values that are not a tuple or list form a row by themselves
+        """
+        rows = [row if isinstance(row, (tuple, list)) else (row,) for row in rows]
+        return cls({name: [row[i] for row in rows] for i, name in enumerate(columns)})
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._columns)
+
+    @property
+    def empty(self) -> bool:
+        """
+        True if the table has no columns or no rows, same as DataFrame.empty
+        """
+        return len(self._columns) == 0 or len(self) == 0
+
+    def __len__(self) -> int:
+        for values in self._columns.values():
+            return len(values)
+        return 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __getitem__(self, name: str) -> Sequence[Any]:
+        return self._columns[name]
+
+    def __setitem__(self, name: str, values: Sequence[Any]) -> None:
+        if self._columns and len(values) != len(self):
+            raise ValueError(f"Column {name} has {len(values)} values, the table has {len(self)} rows")
+        self._columns[name] = values
+
+    def rows(self) -> Iterator[tuple]:
+        return zip(*self._columns.values())
+
+    def categorize(self, name: str) -> None:
+        """
+        Marks a column as categorical
+        """
+        if name not in self._columns:
+            raise KeyError(name)
+        self.categorical.add(name)
+
+    def to_json(self) -> str:
+        """
+        Serializes the table in the format of DataFrame.to_json(): {column: {row: value}}
+
+        Categorical columns are dictionary encoded instead:
+        {"__type__": "DictionaryColumn", "categories": [...], "codes": [...]}
+        A code of -1 stands for a missing value.
+        """
+        out = {}
+        for name, values in self._columns.items():
+            if name in self.categorical:
+                out[str(name)] = dictionary_encode(values)
+            else:
+                out[str(name)] = {str(i): value for i, value in enumerate(values)}
+
+        return json.dumps(out)
+
+    def to_pandas(self) -> "pd.DataFrame":
+        """
+        Returns the table as a pandas DataFrame
+
+        pandas is imported here, in the browser it has to be loaded by the worker first
+        """
+        import pandas as pd
+
+        df = pd.DataFrame({name: list(values) for name, values in self._columns.items()}, columns=self.columns)
+        for name in self.categorical:
+            df[name] = df[name].astype("category")
+
+        return df
+
+    def memory_usage(self) -> int:
+        """
+        Estimate of the number of bytes held by the table, values shared by several rows are counted once
+        """
+        total = 0
+        seen: set[int] = set()
+        for values in self._columns.values():
+            total += sys.getsizeof(values)
+            if isinstance(values, array):
+                continue
+            for value in values:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+
+        return total
+
+
+def dictionary_encode(values: Iterable[Any]) -> dict[str, Any]:
+    """
+    Encodes values as a list of unique values (categories) and, per value, its index in that list (codes)
+    """
+    lookup: dict[Any, int] = {}
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(lookup)
+        codes.append(code)
+
+    return {"__type__": "DictionaryColumn", "categories": list(lookup), "codes": codes}
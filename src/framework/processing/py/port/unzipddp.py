@@ -2,20 +2,244 @@
 Contains functions to deal with zipfiles
 """
 
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Callable
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterator
+import codecs
 import logging
+import mmap
+import os
+import struct
+import sys
 import zipfile
+import zlib
 import json
 import csv
 import io
 
-import pandas as pd
-
+from port.blockcache import BlockCachedFile
+from port.helpers import ColumnBuilder
+import port.jsonbackend as jsonbackend
 from port.my_exceptions import FileNotFoundInZipError
+from port.table import Table
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Read zipfiles through mmap, see MappedZip
+# Off in the browser: the files are not on disk there and mapping one copies it into memory
+USE_MMAP = sys.platform != "emscripten"
+
+# Read zipfiles through a BlockCachedFile if they are not mapped
+# On in the browser: there every read of the file mounted on WORKERFS is a slice of a File object
+USE_BLOCK_CACHE = sys.platform == "emscripten"
+
+# Number of compressed bytes inflated at a time when a member is streamed from a MappedZip
+INFLATE_CHUNK_SIZE = 64 * 1024
+
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+
+class MappedZip:
+    """
+    A zipfile on disk, mapped into memory with mmap
+
+    Members stored without compression are handed out as memoryview slices of the mapping,
+    without a copy. Deflated members are inflated straight from the mapping.
+    Encrypted members and other compression methods are read by zipfile.
+    Views that are handed out should be released before the MappedZip is closed.
+    """
+
+    def __init__(self, zfile: str):
+        self._file = open(zfile, "rb")
+        try:
+            self.zf = zipfile.ZipFile(self._file, "r")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self) -> "MappedZip":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.zf.close()
+        try:
+            self._map.close()
+        except BufferError as e:
+            logger.warning("Mapping of zipfile stays open until views are released: %s", e)
+        self._file.close()
+
+    def find(self, file_to_extract: str) -> zipfile.ZipInfo | None:
+        """
+        The member with the file name file_to_extract, in any directory
+        """
+        return next((info for info in self.zf.infolist() if Path(info.filename).name == file_to_extract), None)
+
+    def read(self, info: zipfile.ZipInfo) -> memoryview:
+        """
+        The content of a member, a slice of the mapping if it is stored without compression
+        """
+        if not self._mapped(info):
+            return memoryview(self.zf.read(info))
+
+        data = self._data(info)
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            data = memoryview(zlib.decompress(data, -15))
+        if zlib.crc32(data) != info.CRC:
+            data.release()
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename}")
+        return data
+
+    def open(self, info: zipfile.ZipInfo) -> IO[bytes]:
+        """
+        A file object that reads a member from the mapping
+        """
+        if not self._mapped(info):
+            return self.zf.open(info, "r")
+        return io.BufferedReader(_MappedMember(self._data(info), info))
+
+    @staticmethod
+    def _mapped(info: zipfile.ZipInfo) -> bool:
+        encrypted = info.flag_bits & 0x1
+        return not encrypted and info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+    def _data(self, info: zipfile.ZipInfo) -> memoryview:
+        # The local header can have another extra field than the central directory
+        offset = info.header_offset
+        magic, name_length, extra_length = _LOCAL_HEADER.unpack_from(self._map, offset)
+        if magic != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"Bad magic number for file header of {info.filename}")
+
+        start = offset + _LOCAL_HEADER.size + name_length + extra_length
+        return memoryview(self._map)[start:start + info.compress_size]
+
+
+class _MappedMember(io.RawIOBase):
+    """
+    Reads a stored or deflated member from its compressed bytes, checks the CRC at the end
+    """
+
+    def __init__(self, data: memoryview, info: zipfile.ZipInfo):
+        self._data = data
+        self._name = info.filename
+        self._expected_crc = info.CRC
+        self._crc = 0
+        self._pos = 0
+        self._inflater = zlib.decompressobj(-15) if info.compress_type == zipfile.ZIP_DEFLATED else None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        n = len(buffer)
+        if self._inflater is None:
+            chunk = self._data[self._pos:self._pos + n]
+            self._pos += len(chunk)
+        else:
+            chunk = b""
+            while not chunk and not self._inflater.eof:
+                compressed = self._inflater.unconsumed_tail
+                if not compressed:
+                    compressed = self._data[self._pos:self._pos + INFLATE_CHUNK_SIZE]
+                    self._pos += len(compressed)
+                    if not compressed:
+                        break
+                chunk = self._inflater.decompress(compressed, n)
+
+        if not chunk:
+            if self._crc != self._expected_crc:
+                raise zipfile.BadZipFile(f"Bad CRC-32 for file {self._name}")
+            return 0
+
+        buffer[:len(chunk)] = chunk
+        self._crc = zlib.crc32(chunk, self._crc)
+        return len(chunk)
+
+    def close(self) -> None:
+        self._data.release()
+        super().close()
+
+
+@contextmanager
+def open_zipfile(zfile: str) -> Iterator[zipfile.ZipFile]:
+    """
+    Opens a zipfile for reading, through the shared BlockCachedFile of the zipfile if USE_BLOCK_CACHE
+    """
+    if not USE_BLOCK_CACHE:
+        with zipfile.ZipFile(zfile, "r") as zf:
+            yield zf
+        return
+
+    with zipfile.ZipFile(cached_file(zfile), "r") as zf:
+        yield zf
+
+
+# The BlockCachedFile of the zipfile that is being read: (path, size and mtime, file)
+# Validation, planning and the extraction of every table share its blocks, see close_cached_file
+_cached: tuple[str, tuple[int, int], BlockCachedFile] | None = None
+
+
+def cached_file(zfile: str) -> BlockCachedFile:
+    """
+    The BlockCachedFile of a zipfile, opened on first use and kept open until close_cached_file
+    Only one zipfile is kept open, a zipfile that changed since it was opened is opened again
+    """
+    global _cached
+    path = os.fspath(zfile)
+    stat = os.stat(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    if _cached is not None:
+        cached_path, cached_version, f = _cached
+        if cached_path == path and cached_version == version and not f.closed:
+            return f
+        close_cached_file()
+
+    f = BlockCachedFile.open(path)
+    _cached = (path, version, f)
+    return f
+
+
+def close_cached_file() -> None:
+    """
+    Closes the BlockCachedFile of cached_file, if there is one
+    """
+    global _cached
+    if _cached is not None:
+        _cached[2].close()
+        _cached = None
+
+
+@contextmanager
+def open_zip_member(zfile: str, file_to_extract: str) -> Iterator[IO[bytes]]:
+    """
+    Opens the file with the name file_to_extract, in any directory of a zipfile, for reading
+    The zipfile is read through a MappedZip if USE_MMAP
+
+    Raises FileNotFoundInZipError if there is no such file
+    """
+    if USE_MMAP:
+        with MappedZip(zfile) as mz:
+            info = mz.find(file_to_extract)
+            if info is None:
+                raise FileNotFoundInZipError("File not found in zip")
+            with mz.open(info) as f:
+                yield f
+        return
+
+    with open_zipfile(zfile) as zf:
+        name = next((f for f in zf.namelist() if Path(f).name == file_to_extract), None)
+        if name is None:
+            raise FileNotFoundInZipError("File not found in zip")
+        with zf.open(name, "r") as f:
+            yield f
+
+
 def extract_file_from_zip(zfile: str, file_to_extract: str) -> io.BytesIO:
     """
     Extracts a specific file from a zipfile buffer
@@ -24,7 +248,7 @@ def extract_file_from_zip(zfile: str, file_to_extract: str) -> io.BytesIO:
     file_to_extract_bytes = io.BytesIO()
 
     try:
-        with zipfile.ZipFile(zfile, "r") as zf:
+        with open_zipfile(zfile) as zf:
             file_found = False
 
             for f in zf.namelist():
@@ -51,12 +275,22 @@ def extract_file_from_zip(zfile: str, file_to_extract: str) -> io.BytesIO:
 
 
 def _json_reader_bytes(json_bytes: bytes, encoding: str) -> Any:
+    if encoding == "utf8":
+        return jsonbackend.loads(json_bytes)
+
     json_bytes_stream = io.BytesIO(json_bytes)
     stream = io.TextIOWrapper(json_bytes_stream, encoding=encoding)
     result = json.load(stream)
     return result
 
 
+def _json_reader_buffer(json_buffer: memoryview, encoding: str) -> Any:
+    if encoding == "utf8":
+        return jsonbackend.loads(json_buffer)
+
+    return json.loads(str(json_buffer, encoding))
+
+
 def _json_reader_file(json_file: str, encoding: str) -> Any:
     with open(json_file, 'r', encoding=encoding) as f:
         result = json.load(f)
@@ -113,6 +347,38 @@ def read_json_from_bytes(json_bytes: io.BytesIO) -> dict[Any, Any] | list[Any]:
     return out
 
 
+def read_json_from_zip(zfile: str, file_to_extract: str) -> dict[Any, Any] | list[Any]:
+    """
+    Reads json from a specific file in a zipfile
+
+    This is the same as read_json_from_bytes(extract_file_from_zip(...)),
+    or with USE_MMAP, the file is decoded from the memory map of the zipfile
+
+    Function returns {} in case of failure
+    """
+    if not USE_MMAP:
+        b = extract_file_from_zip(zfile, file_to_extract)
+        return read_json_from_bytes(b)
+
+    out: dict[Any, Any] | list[Any] = {}
+    try:
+        with MappedZip(zfile) as mz:
+            info = mz.find(file_to_extract)
+            if info is None:
+                raise FileNotFoundInZipError("File not found in zip")
+            with mz.read(info) as data:
+                out = _read_json(data, _json_reader_buffer)
+
+    except zipfile.BadZipFile as e:
+        logger.error("BadZipFile:  %s", e)
+    except FileNotFoundInZipError as e:
+        logger.error("File not found:  %s: %s", file_to_extract, e)
+    except Exception as e:
+        logger.error("Exception was caught:  %s", e)
+
+    return out
+
+
 def read_json_from_file(json_file: str) -> dict[Any, Any] | list[Any]:
     """
     Reads json from file
@@ -128,17 +394,20 @@ def read_csv_from_bytes(json_bytes: io.BytesIO) -> list[dict[Any, Any]]:
     """
     Reads csv from io.Bytes()
     Expects input from extract_file_from_zip
+
+    The encoding is detected as in read_csv_from_zip, cells missing from short rows are None
     """
     out: list[dict[Any, Any]] = []
 
     b = json_bytes.read()
 
     try:
-        stream = io.TextIOWrapper(io.BytesIO(b), encoding="utf8")
-        reader = csv.DictReader(stream)
-        for row in reader:
-            out.append(row)
-        logger.debug("succesfully converted csv bytes with encoding utf8")
+        encoding = _detect_encoding(b[:CSV_SNIFF_BYTES], CSV_ENCODINGS)
+        stream = io.TextIOWrapper(io.BytesIO(b), encoding=encoding, errors="replace", newline="")
+        for table in _read_csv_chunks(stream, None, {}, 10_000):
+            names = table.columns
+            out.extend(dict(zip(names, row)) for row in table.rows())
+        logger.debug("succesfully converted csv bytes with encoding %s", encoding)
 
     except Exception as e:
         logger.error("%s, could not convert csv bytes", e)
@@ -147,11 +416,399 @@ def read_csv_from_bytes(json_bytes: io.BytesIO) -> list[dict[Any, Any]]:
         return out
 
 
-def read_csv_from_bytes_to_df(json_bytes: io.BytesIO) -> pd.DataFrame:
+def read_csv_from_bytes_to_df(json_bytes: io.BytesIO) -> "pd.DataFrame":
     """
     csv to pd.DataFrame
     expects io.BytesIO as input (from extract_file_from_zip)
+    pandas is imported here, in the browser it has to be loaded by the worker first
     """
+    import pandas as pd
+
     return pd.DataFrame(read_csv_from_bytes(json_bytes))
 
 
+# Encodings tried, in order, on the start of a csv file, latin1 accepts any bytes
+CSV_ENCODINGS = ["utf-8-sig", "latin1"]
+
+# Number of bytes used to determine the encoding of a csv file
+CSV_SNIFF_BYTES = 64 * 1024
+
+_INT_TYPECODES = set("bBhHiIlLqQ")
+
+
+def _detect_encoding(sample: bytes, encodings: list[str]) -> str:
+    for encoding in encodings:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            logger.debug("Cannot decode csv with encoding: %s", encoding)
+
+    return encodings[-1]
+
+
+def read_csv_from_zip(
+    zfile: str,
+    file_to_extract: str,
+    columns: list[str] | None = None,
+    typecodes: dict[str, str] | None = None,
+    chunk_size: int = 10_000,
+    encodings: list[str] = CSV_ENCODINGS,
+) -> Iterator[Table]:
+    """
+    Reads csv straight from a file in a zipfile, yields a Table per chunk_size rows
+
+    Only one chunk is in memory at a time, so files larger than memory can be processed.
+
+    Args:
+        columns: names of the columns to keep, all columns if None
+        typecodes: array.array typecode per column name, for example {"count": "q", "duration": "d"},
+            values of these columns are converted and stored in an array. Values that cannot be
+            converted, and cells missing from short rows, are None; a chunk with a None in a typed
+            column stores that column in a list. Other columns hold strings
+        chunk_size: number of rows per Table
+        encodings: tried in order on the start of the file, the first that decodes it is used,
+            bytes after that which do not decode are replaced
+
+    Yields nothing in case of failure
+    """
+    typecodes = typecodes or {}
+
+    try:
+        with open_zip_member(zfile, file_to_extract) as f:
+            encoding = _detect_encoding(f.read(CSV_SNIFF_BYTES), encodings)
+
+        with open_zip_member(zfile, file_to_extract) as f:
+            stream = io.TextIOWrapper(f, encoding=encoding, errors="replace", newline="")
+            yield from _read_csv_chunks(stream, columns, typecodes, chunk_size)
+
+    except zipfile.BadZipFile as e:
+        logger.error("BadZipFile:  %s", e)
+    except FileNotFoundInZipError as e:
+        logger.error("File not found:  %s: %s", file_to_extract, e)
+    except Exception as e:
+        logger.error("%s, could not convert csv %s", e, file_to_extract)
+
+
+def _read_csv_chunks(
+    stream: io.TextIOBase,
+    columns: list[str] | None,
+    typecodes: dict[str, str],
+    chunk_size: int,
+) -> Iterator[Table]:
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    names = header if columns is None else columns
+    missing = [column for column in names if column not in header]
+    if missing:
+        raise KeyError(f"Columns not in csv: {missing}")
+
+    indices = [header.index(column) for column in names]
+    width = max(indices, default=-1) + 1
+    converters = [
+        (i, int if typecodes[column] in _INT_TYPECODES else float)
+        for i, column in enumerate(names) if column in typecodes
+    ]
+    builder_typecodes = {i: typecodes[column] for i, column in enumerate(names) if column in typecodes}
+
+    builder = ColumnBuilder(builder_typecodes)
+    n_none = 0
+    for record in reader:
+        if len(record) < width:
+            record += [None] * (width - len(record))
+        row = [record[i] for i in indices]
+        for i, convert in converters:
+            try:
+                row[i] = convert(row[i])
+            except (TypeError, ValueError):
+                row[i] = None
+                builder.allow_none(i)
+                n_none += 1
+
+        builder.append(tuple(row))
+        if len(builder) >= chunk_size:
+            yield builder.to_table(names)
+            builder = ColumnBuilder(builder_typecodes)
+
+    if len(builder) > 0:
+        yield builder.to_table(names)
+
+    if n_none > 0:
+        logger.warning("Stored %s csv values that are missing or do not match the column type as None", n_none)
+
+
+# Members yielded by iter_zip_stream by default, the files the extractors read
+STREAM_SUFFIXES = (".json", ".html", ".csv")
+
+# Number of bytes read from the stream at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_LOCAL_FILE_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_LOCAL_FILE_SIGNATURE = b"PK\x03\x04"
+_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+_END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06")
+_ZIP64_EXTRA = 0x0001
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+def iter_zip_stream(
+    stream: IO[bytes],
+    wanted: Callable[[str], bool] | None = None,
+) -> Iterator[tuple[zipfile.ZipInfo, IO[bytes]]]:
+    """
+    Reads a zipfile from a stream that cannot seek, such as an upload that is still arriving
+
+    The local file headers are read front to back, the central directory is not needed.
+    Yields (info, file) for every member for which wanted(info.filename) is true, by default
+    the members with one of STREAM_SUFFIXES. The file reads the member from the stream and
+    is only valid until the next member is asked for. Other members (media) are skipped
+    without inflating them where their size is known.
+
+    Members with a data descriptor (the sizes and CRC after the data) and zip64 members are
+    supported. The CRC of every member that is read is checked, BadZipFile is raised otherwise.
+    BadZipFile is also raised if the stream ends before the central directory.
+    """
+    if wanted is None:
+        wanted = _has_stream_suffix
+
+    source = _StreamSource(stream)
+    while True:
+        signature = source.peek(4)
+        if signature in _END_SIGNATURES:
+            return
+        if not signature:
+            raise zipfile.BadZipFile("Unexpected end of zip stream, the central directory is missing")
+        if signature != _LOCAL_FILE_SIGNATURE:
+            raise zipfile.BadZipFile(f"Bad magic number for file header: {signature!r}")
+
+        info, zip64 = _read_local_file_header(source)
+        member = _StreamedMember(source, info, zip64)
+
+        encrypted = info.flag_bits & 0x1
+        supported = not encrypted and info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+        if info.is_dir() or not supported or not wanted(info.filename):
+            logger.debug("Skipping %s in zip stream", info.filename)
+            member.skip()
+            continue
+
+        yield info, io.BufferedReader(member)
+        member.skip()
+
+
+def _has_stream_suffix(name: str) -> bool:
+    return Path(name).suffix in STREAM_SUFFIXES
+
+
+def _read_local_file_header(source: "_StreamSource") -> tuple[zipfile.ZipInfo, bool]:
+    header = source.read_exactly(_LOCAL_FILE_HEADER.size)
+    (_, _, flags, method, time, date, crc, compress_size, file_size,
+     name_length, extra_length) = _LOCAL_FILE_HEADER.unpack(header)
+    name = source.read_exactly(name_length).decode("utf-8" if flags & 0x800 else "cp437")
+    extra = source.read_exactly(extra_length)
+
+    info = zipfile.ZipInfo(name, (
+        (date >> 9) + 1980, (date >> 5) & 0xF, date & 0x1F,
+        time >> 11, (time >> 5) & 0x3F, (time & 0x1F) * 2,
+    ))
+    info.flag_bits = flags
+    info.compress_type = method
+    info.CRC = crc
+    info.compress_size = compress_size
+    info.file_size = file_size
+    info.extra = extra
+
+    # The zip64 extra field holds the sizes that do not fit, in this order
+    zip64 = False
+    offset = 0
+    while offset + 4 <= len(extra):
+        field_id, field_length = struct.unpack_from("<HH", extra, offset)
+        if field_id == _ZIP64_EXTRA:
+            zip64 = True
+            values = extra[offset + 4:offset + 4 + field_length]
+            if info.file_size == _ZIP64_LIMIT and len(values) >= 8:
+                info.file_size, = struct.unpack_from("<Q", values)
+                values = values[8:]
+            if info.compress_size == _ZIP64_LIMIT and len(values) >= 8:
+                info.compress_size, = struct.unpack_from("<Q", values)
+        offset += 4 + field_length
+
+    return info, zip64
+
+
+class _StreamSource:
+    """
+    Reads a stream in chunks, bytes read too far can be handed back with unread
+    """
+
+    def __init__(self, stream: IO[bytes]):
+        self._stream = stream
+        self._buffer = bytearray()
+
+    def _fill(self, n: int) -> None:
+        while len(self._buffer) < n:
+            chunk = self._stream.read(max(n - len(self._buffer), STREAM_CHUNK_SIZE))
+            if not chunk:
+                return
+            self._buffer += chunk
+
+    def peek(self, n: int) -> bytes:
+        """
+        The next n bytes without consuming them, fewer at the end of the stream
+        """
+        self._fill(n)
+        return bytes(self._buffer[:n])
+
+    def read(self, n: int) -> bytes:
+        """
+        At most n bytes, at least one unless the stream has ended
+        """
+        if not self._buffer:
+            self._fill(1)
+        out = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return out
+
+    def read_exactly(self, n: int) -> bytes:
+        self._fill(n)
+        if len(self._buffer) < n:
+            raise zipfile.BadZipFile("Unexpected end of zip stream")
+        return self.read(n)
+
+    def skip(self, n: int) -> None:
+        while n > 0:
+            chunk = self.read(min(n, STREAM_CHUNK_SIZE))
+            if not chunk:
+                raise zipfile.BadZipFile("Unexpected end of zip stream")
+            n -= len(chunk)
+
+    def unread(self, data: bytes) -> None:
+        self._buffer[:0] = data
+
+
+class _StreamedMember(io.RawIOBase):
+    """
+    Reads the data of a single member from a _StreamSource, up to and including its data descriptor
+
+    Without a data descriptor the compressed size is known from the local header. With one,
+    deflated data ends where the deflate stream ends, and stored data ends at the descriptor
+    signature that is followed by the CRC and size of the data before it.
+    """
+
+    def __init__(self, source: _StreamSource, info: zipfile.ZipInfo, zip64: bool):
+        self._source = source
+        self._info = info
+        self._descriptor = bool(info.flag_bits & 0x8)
+        self._descriptor_size = 20 if zip64 else 12
+        self._remaining: int | None = None if self._descriptor else info.compress_size
+        self._inflater = zlib.decompressobj(-15) if info.compress_type == zipfile.ZIP_DEFLATED else None
+        self._crc = 0
+        self._size = 0
+        self._ended = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self._ended:
+            return 0
+
+        chunk = self._next(len(buffer))
+        if not chunk:
+            self._end()
+            return 0
+
+        buffer[:len(chunk)] = chunk
+        self._crc = zlib.crc32(chunk, self._crc)
+        self._size += len(chunk)
+        return len(chunk)
+
+    def skip(self) -> None:
+        """
+        Moves the source past the member, the data is only read if its size is unknown
+        """
+        if not self._ended and self._size == 0 and self._remaining is not None:
+            self._source.skip(self._remaining)
+            self._ended = True
+            return
+        # The file can be closed by the reader, readinto does not mind
+        buffer = bytearray(STREAM_CHUNK_SIZE)
+        while self.readinto(buffer):
+            pass
+
+    def _compressed(self, n: int) -> bytes:
+        if self._remaining is not None:
+            n = min(n, self._remaining)
+            if n == 0:
+                return b""
+        chunk = self._source.read(n)
+        if not chunk:
+            raise zipfile.BadZipFile(f"Unexpected end of zip stream in {self._info.filename}")
+        if self._remaining is not None:
+            self._remaining -= len(chunk)
+        return chunk
+
+    def _next(self, n: int) -> bytes:
+        if self._inflater is not None:
+            return self._inflate(n)
+        if self._descriptor:
+            return self._stored_until_descriptor(n)
+        return self._compressed(n)
+
+    def _inflate(self, n: int) -> bytes:
+        assert self._inflater is not None
+        out = b""
+        while not out and not self._inflater.eof:
+            compressed = self._inflater.unconsumed_tail or self._compressed(STREAM_CHUNK_SIZE)
+            if not compressed:
+                break
+            out = self._inflater.decompress(compressed, n)
+
+            # Bytes after the end of the deflate stream belong to the descriptor or the next member
+            if self._inflater.eof and self._inflater.unused_data:
+                self._source.unread(self._inflater.unused_data)
+                if self._remaining is not None:
+                    self._remaining += len(self._inflater.unused_data)
+        return out
+
+    def _stored_until_descriptor(self, n: int) -> bytes:
+        size = 4 + self._descriptor_size
+        data = self._source.peek(n + size)
+
+        start = 0
+        while (i := data.find(_DESCRIPTOR_SIGNATURE, start)) != -1 and i + size <= len(data):
+            crc, compress_size = struct.unpack_from("<IQ" if self._descriptor_size == 20 else "<II", data, i + 4)
+            if compress_size == self._size + i and crc == zlib.crc32(data[:i], self._crc):
+                self._descriptor = False
+                self._remaining = 0
+                self._read_descriptor_fields(data[i + 4:i + size])
+                out = self._source.read(i) if i else b""
+                self._source.skip(size)
+                return out
+            start = i + 1
+
+        if len(data) < size:
+            raise zipfile.BadZipFile(f"Unexpected end of zip stream in {self._info.filename}, no data descriptor matches its data")
+        # A signature that is cut off at the end of data can still be the descriptor
+        keep = i if i != -1 else len(data) - size + 1
+        return self._source.read(min(max(keep, 1), n))
+
+    def _read_descriptor_fields(self, fields: bytes) -> None:
+        if self._descriptor_size == 20:
+            self._info.CRC, self._info.compress_size, self._info.file_size = struct.unpack("<IQQ", fields)
+        else:
+            self._info.CRC, self._info.compress_size, self._info.file_size = struct.unpack("<III", fields)
+
+    def _end(self) -> None:
+        self._ended = True
+        if self._descriptor:
+            fields = self._source.read_exactly(4)
+            if fields == _DESCRIPTOR_SIGNATURE:
+                fields = b""
+            fields += self._source.read_exactly(self._descriptor_size - len(fields))
+            self._read_descriptor_fields(fields)
+
+        if self._crc != self._info.CRC or self._size != self._info.file_size:
+            raise zipfile.BadZipFile(f"Bad CRC-32 or size for file {self._info.filename}")
@@ -0,0 +1,96 @@
+"""
+Compares the lookups in nested records of port.helpers with the recursive versions they replaced
+
+Run from the directory of pyproject.toml: python tests/benchmark_helpers.py
+The results are checked to be equal before they are timed.
+"""
+from pathlib import Path
+import sys
+import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import port.helpers as helpers  # noqa: E402
+
+# Keys looked up per record of group_posts_v2 in port.facebook
+KEYS = ["title", "post", "timestamp", "url"]
+
+
+def recursive_dict_denester(inp, new=None, name="", run_first=True):
+    """
+    dict_denester as it was before it was made iterative
+    """
+    if run_first:
+        new = {}
+
+    if isinstance(inp, dict):
+        for k, v in inp.items():
+            if isinstance(v, (dict, list)):
+                recursive_dict_denester(v, new, f"{name}-{str(k)}", run_first=False)
+            else:
+                newname = f"{name}-{k}"
+                new.update({newname[1:]: v})
+
+    elif isinstance(inp, list):
+        for i, item in enumerate(inp):
+            recursive_dict_denester(item, new, f"{name}-{i}", run_first=False)
+
+    else:
+        new.update({name[1:]: inp})
+
+    return new
+
+
+def group_post(i: int) -> dict:
+    """
+    A record of group_posts_v2 with attachments, the title and timestamp come first as in a DDP
+    """
+    return {
+        "timestamp": 1690000000 + i,
+        "title": f"Jan Jansen posted in Group {i % 7}.",
+        "data": [{"post": "hello " * 20}, {"update_timestamp": 1690000001 + i}],
+        "attachments": [
+            {"data": [
+                {"external_context": {"url": f"https://example.org/{i}", "name": "n", "source": "s"}},
+                {"media": {
+                    "uri": f"photos/{i}.jpg",
+                    "creation_timestamp": 1,
+                    "media_metadata": {"photo_metadata": {"exif_data": [{"iso": 1, "focal_length": 2, "taken_timestamp": 3}]}},
+                    "title": "t",
+                    "description": "d",
+                }},
+            ]}
+            for _ in range(4)
+        ],
+        "tags": [{"name": f"p{j}"} for j in range(10)],
+    }
+
+
+def microseconds(fn, records: list, number: int) -> float:
+    seconds = min(timeit.repeat(lambda: [fn(record) for record in records], number=number, repeat=5))
+    return seconds / number / len(records) * 1e6
+
+
+def main() -> None:
+    records = [group_post(i) for i in range(100)]
+
+    for record in records:
+        denested = recursive_dict_denester(record)
+        assert [(helpers.join_path(p), v) for p, v in helpers.flatten(record)] == list(denested.items())
+        assert helpers.dict_denester(record) == denested
+        for key in KEYS:
+            assert helpers.find_nested(record, key) == helpers.find_item(denested, key)
+
+    timings = {
+        "recursive dict_denester": lambda r: recursive_dict_denester(r),
+        "dict_denester": lambda r: helpers.dict_denester(r),
+        "flatten (all leaves)": lambda r: list(helpers.flatten(r)),
+        f"recursive dict_denester + find_item x{len(KEYS)}": lambda r: [helpers.find_item(recursive_dict_denester(r), k) for k in KEYS],
+        f"find_nested x{len(KEYS)}": lambda r: [helpers.find_nested(r, k) for k in KEYS],
+    }
+    for name, fn in timings.items():
+        print(f"{name:<40} {microseconds(fn, records, 20):8.1f} us/record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Fixtures shared by the tests
+
+The tests run on small synthetic exports that are written to a temporary directory,
+shaped like the files of a Facebook DDP.
+"""
+import json
+import random
+import zipfile
+
+import pytest
+
+import port.script as script
+
+# Number of records of the larger files of the synthetic export
+RECORDS = 40
+
+
+def facebook_files(records: int = RECORDS) -> dict[str, object]:
+    """
+    Contents of the json files of a synthetic Facebook export, by file name
+    """
+    rng = random.Random(1)
+
+    def ts() -> int:
+        return 1600000000 + rng.randint(0, 10**8)
+
+    return {
+        "who_you've_followed.json": {"following_v3": [{"name": f"PersÃ© {i}", "timestamp": ts()} for i in range(records)]},
+        "your_friends.json": {"friends_v2": [{"name": f"Friend {i}"} for i in range(10)]},
+        "ads_interests.json": {"topics_v2": ["Cars", "CafÃ©"]},
+        "recently_visited.json": {"visited_things_v2": [
+            {"name": "Profile visits", "entries": [{"timestamp": ts(), "data": {"name": f"x{i}", "uri": "http://x"}} for i in range(records)]},
+            {"name": "Videos watched", "entries": [{"timestamp": ts(), "data": {"name": f"v{i}", "uri": "http://v"}} for i in range(records)]},
+        ]},
+        "profile_information.json": {"profile_v2": {
+            "name": {"full_name": "Jan Jansen"},
+            "emails": {"emails": ["jan@example.org"]},
+            "phone_numbers": [{"phone_number": "0612345678"}],
+            "gender": {"gender_option": "MALE", "pronoun": "HE", "custom_genders": []},
+        }},
+        "your_event_responses.json": {"event_responses_v2": {"events_joined": [{"name": "Event", "start_timestamp": ts()} for _ in range(5)]}},
+        "group_posts_and_comments.json": {"group_posts_v2": [
+            {
+                "timestamp": ts(),
+                "title": f"Jan Jansen posted in Group {i % 7}.",
+                "data": [{"post": f"hello Jan Jansen {i}"}],
+                "attachments": [{"data": [{"external_context": {"url": "http://u"}}]}],
+            }
+            for i in range(records)
+        ]},
+        "your_comments_in_groups.json": {"group_comments_v2": [
+            {
+                "timestamp": ts(),
+                "title": "Jan Jansen commented on Piet's post.",
+                "data": [{"comment": {"timestamp": ts(), "comment": f"c{i}", "author": "Jan Jansen", "group": f"Group {i % 7}"}}],
+            }
+            for i in range(records)
+        ]},
+        "your_group_membership_activity.json": {"groups_joined_v2": [
+            {"timestamp": ts(), "title": f"Jan Jansen became a member of Group {i % 7}.", "data": [{"name": f"Group {i % 7}"}]}
+            for i in range(20)
+        ]},
+        "pages_you've_liked.json": {"page_likes_v2": [{"name": f"Page {i}", "url": "http://p", "timestamp": ts()} for i in range(records)]},
+        "comments.json": {"comments_v2": [
+            {
+                "timestamp": ts(),
+                "title": "Jan Jansen commented on Klaas's post.",
+                "data": [{"comment": {"timestamp": ts(), "comment": f"nice {i}", "author": "Jan Jansen"}}],
+            }
+            for i in range(records)
+        ]},
+        "likes_and_reactions_1.json": [
+            {
+                "timestamp": ts(),
+                "title": "Jan Jansen likes Klaas's post.",
+                "data": [{"reaction": {"reaction": rng.choice(["LIKE", "LOVE", "HAHA"]), "actor": "Jan Jansen"}}],
+            }
+            for _ in range(records)
+        ],
+        "your_comment_active_days.json": {"label_values": [{"label": "Days", "value": "12"}]},
+        "your_pages.json": {"pages_v2": [{"name": "My page", "url": "http://m", "timestamp": ts()}]},
+    }
+
+
+def write_facebook_zip(path, records: int = RECORDS) -> str:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in facebook_files(records).items():
+            zf.writestr(f"your_facebook_activity/activity/{name}", json.dumps(content))
+        zf.writestr("media/photo.jpg", b"\xff" * 5000)
+    return str(path)
+
+
+@pytest.fixture
+def facebook_zip(tmp_path) -> str:
+    """
+    Path of a synthetic Facebook export
+    """
+    return write_facebook_zip(tmp_path / "facebook.zip")
+
+
+@pytest.fixture
+def fresh_script(monkeypatch):
+    """
+    port.script with an empty RESULT_CACHE, restored after the test
+    """
+    monkeypatch.setattr(script, "RESULT_CACHE", script.ResultCache(script.RESULT_CACHE_SIZE))
+    return script
+
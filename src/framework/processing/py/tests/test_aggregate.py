@@ -0,0 +1,102 @@
+from dataclasses import replace
+
+import pytest
+
+import port.api.props as props
+from port.aggregate import Aggregation, Period, aggregate, count_periods, count_values
+from port.sampling import RowPolicy, Sampling
+import port.script as script
+from port.scheduler import TableBudget
+from port.table import Table
+
+TITLE = props.Translatable({"en": "Per month", "nl": "Per maand"})
+
+
+def test_count_values():
+    values = ["a", "b", "a", None, "", "c", "a", "b"]
+    assert count_values(values) == [("a", 3), ("b", 2), ("c", 1)]
+    assert count_values(values, top=2) == [("a", 3), ("b", 2)]
+    assert count_values([]) == []
+
+
+def test_count_months():
+    timestamps = ["2024-01-31T23:59:59+00:00", "2024-01-01T00:00:00+00:00", "2024-03-15T10:00:00+00:00", "", None, "not a date"]
+    assert count_periods(timestamps, Period.MONTH) == [
+        ("2024-01-15T12:00:00+00:00", 2),
+        ("2024-03-15T12:00:00+00:00", 1),
+    ]
+
+
+def test_count_weeks():
+    # Monday to Sunday, the middle of a week is its Thursday
+    timestamps = ["2024-01-01T08:00:00", "2024-01-07T22:00:00", "2024-01-08T00:00:00"]
+    assert count_periods(timestamps, Period.WEEK) == [
+        ("2024-01-04T12:00:00", 2),
+        ("2024-01-11T12:00:00", 1),
+    ]
+
+
+def test_aggregate():
+    df = Table({"Timestamp": ["2024-01-02T00:00:00", "2024-01-20T00:00:00", "2024-02-01T00:00:00"]})
+    visualization = aggregate(df, Aggregation(TITLE, "Timestamp", Period.MONTH, chart="line"))
+
+    assert visualization == {
+        "type": "line",
+        "title": {"en": "Per month", "nl": "Per maand"},
+        "group": {"column": "Timestamp", "dateFormat": "month"},
+        "values": [{"label": {"en": "Number", "nl": "Aantal"}, "aggregate": "count", "addZeroes": True}],
+        "aggregated": {
+            "rows": 3,
+            "head": ["Timestamp", "Count"],
+            "data": [["2024-01-15T12:00:00", 2], ["2024-02-15T12:00:00", 1]],
+            "values": [{"label": {"en": "Number", "nl": "Aantal"}, "aggregate": "sum", "addZeroes": True, "column": "Count"}],
+        },
+    }
+
+
+@pytest.mark.parametrize("df", [Table(), Table({"Other": [1]}), Table({"Group": [None, ""]})])
+def test_nothing_to_show(df):
+    assert aggregate(df, Aggregation(TITLE, "Group")) is None
+
+
+def test_scaled_and_noted():
+    df = Table({"Reaction": ["Like", "Like", "Love"]})
+    visualization = aggregate(df, Aggregation(TITLE, "Reaction"), scale=2.5, note={"en": "(estimate)", "nl": "(schatting)"})
+
+    assert visualization["aggregated"]["data"] == [["Like", 5], ["Love", 2]]
+    assert visualization["aggregated"]["rows"] == 3
+    assert visualization["title"] == {"en": "Per month (estimate)", "nl": "Per maand (schatting)"}
+    assert TITLE.translations == {"en": "Per month", "nl": "Per maand"}
+
+
+def sampled_budget(policy: RowPolicy, n: int) -> TableBudget:
+    budget = TableBudget("table", float("inf"), row_policy=policy)
+    sample = budget.rows(0)
+    for i in range(n):
+        sample.append((f"2024-01-{1 + i % 28:02d}T00:00:00",))
+    return budget
+
+
+def test_chart_scale():
+    assert script.chart_scale(sampled_budget(RowPolicy(Sampling.RESERVOIR, 100), 50)) == (1.0, None)
+    assert script.chart_scale(sampled_budget(RowPolicy(Sampling.RESERVOIR, 100), 400)) == (4.0, script.SAMPLED_CHART_NOTE)
+
+    scale, note = script.chart_scale(sampled_budget(RowPolicy(Sampling.HEAD, 100), 400))
+    assert scale == 1.0
+    assert note == {"en": "(most recent 100 items)", "nl": "(meest recente 100 items)"}
+
+    budget = sampled_budget(RowPolicy(Sampling.RESERVOIR, 100), 400)
+    budget.truncate("time")
+    assert script.chart_scale(budget) == (4.0, script.TRUNCATED_CHART_NOTE)
+
+
+def test_sampled_table_charts_all_records(facebook_zip):
+    spec = next(spec for spec in script.FACEBOOK_TABLES if spec.id == "likes_and_reactions")
+    full = script.extract_table(spec, facebook_zip, [], script.Scheduler(60, 60))
+    sampled = script.extract_table(replace(spec, row_policy=RowPolicy(Sampling.RESERVOIR, 10)), facebook_zip, [], script.Scheduler(60, 60))
+
+    total = sum(n for _, n in full.visualizations[1]["aggregated"]["data"])
+    assert len(sampled.data_frame) == 10 < total
+    assert sum(n for _, n in sampled.visualizations[1]["aggregated"]["data"]) == pytest.approx(total, abs=2)
+    assert sampled.visualizations[1]["title"]["en"].endswith(script.SAMPLED_CHART_NOTE["en"])
+    assert full.visualizations[1]["title"] == spec.visualizations[1].title.translations
@@ -0,0 +1,159 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import port.blockcache as blockcache
+from port.blockcache import BlockCachedFile
+import port.script as script
+import port.unzipddp as unzipddp
+
+
+class CountingFile(io.RawIOBase):
+    """
+    A file that counts its reads, every read of a file on WORKERFS is a slice of a File object
+    """
+
+    def __init__(self, path: str):
+        self.raw = open(path, "rb", buffering=0)
+        self.reads = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.raw.tell()
+
+    def readinto(self, buffer) -> int:
+        self.reads += 1
+        return self.raw.readinto(buffer)
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
+
+
+def read_members(f) -> dict[str, bytes]:
+    with zipfile.ZipFile(f, "r") as zf:
+        return {info.filename: zf.read(info) for info in zf.infolist()}
+
+
+@pytest.fixture
+def block_cache(monkeypatch):
+    """
+    Reads zipfiles as in the browser, counts the BlockCachedFiles that are opened
+    """
+    monkeypatch.setattr(unzipddp, "USE_MMAP", False)
+    monkeypatch.setattr(unzipddp, "USE_BLOCK_CACHE", True)
+    monkeypatch.setattr(blockcache, "TOTALS", blockcache.ReadCounts())
+
+    opened = []
+    open_file = BlockCachedFile.open.__func__
+
+    def counting_open(cls, path, **kwargs):
+        opened.append(path)
+        return open_file(cls, path, **kwargs)
+
+    monkeypatch.setattr(BlockCachedFile, "open", classmethod(counting_open))
+    yield opened
+    unzipddp.close_cached_file()
+
+
+def test_block_cache_reduces_reads(tmp_path):
+    # Larger than the cache, with many members
+    path = str(tmp_path / "large.zip")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(300):
+            zf.writestr(f"activity/file_{i}.json", json.dumps([f"record {i} {j}" for j in range(2000)]))
+            zf.writestr(f"media/{i}.bin", bytes(range(256)) * 200, compress_type=zipfile.ZIP_STORED)
+
+    with CountingFile(path) as direct:
+        expected = read_members(direct)
+
+    with BlockCachedFile(CountingFile(path)) as cached:
+        assert read_members(cached) == expected
+        assert cached.counts.reads == cached.raw.reads
+
+    assert direct.reads > 20 * cached.raw.reads
+
+
+def test_random_reads(tmp_path):
+    data = bytes(range(256)) * 4096
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    with BlockCachedFile(CountingFile(str(path)), block_size=4096, max_blocks=8, read_ahead=3) as f:
+        for offset, n in [(0, 10), (4090, 20), (100_000, 70_000), (5, 1), (len(data) - 10, 100), (12_345, 40_000)]:
+            f.seek(offset)
+            assert f.read(n) == data[offset:offset + n]
+        f.seek(0)
+        assert f.read() == data
+
+
+def test_open_zipfile_shares_one_file(facebook_zip, block_cache):
+    with unzipddp.open_zipfile(facebook_zip) as zf:
+        names = zf.namelist()
+    f = unzipddp.cached_file(facebook_zip)
+    reads = f.counts.reads
+
+    # A second walk of the central directory is served from the blocks that are kept
+    with unzipddp.open_zipfile(facebook_zip) as zf:
+        assert zf.namelist() == names
+    assert f.counts.reads == reads
+    assert block_cache == [facebook_zip]
+
+    unzipddp.close_cached_file()
+    assert f.closed
+    assert blockcache.TOTALS.reads == reads
+
+
+def test_changed_zipfile_is_opened_again(tmp_path, block_cache):
+    path = str(tmp_path / "a.zip")
+    for content in ("first", "second version"):
+        with zipfile.ZipFile(path, "w") as zf:
+            zf.writestr("a.json", json.dumps({"content": content}))
+        assert unzipddp.read_json_from_zip(path, "a.json") == {"content": content}
+    assert len(block_cache) == 2
+
+
+def test_extraction_opens_the_zipfile_once(facebook_zip, block_cache):
+    validation = script.facebook.validate(facebook_zip)
+    tables = script.extract_facebook(facebook_zip, validation)
+
+    assert block_cache == [facebook_zip]
+    assert len(tables) == len(script.FACEBOOK_TABLES)
+    f = unzipddp.cached_file(facebook_zip)
+    assert f.counts.reads < f.counts.requests / 10
+
+
+def resident_bytes(f: BlockCachedFile) -> int:
+    """
+    Bytes kept alive by the blocks, counting the buffer a view is part of
+    """
+    buffers = {}
+    for block in f._blocks.values():
+        buffer = block.obj if isinstance(block, memoryview) else block
+        buffers[id(buffer)] = len(buffer)
+    return sum(buffers.values())
+
+
+@pytest.mark.parametrize("read_ahead", [1, 3, 4])
+def test_resident_bytes_stay_within_the_cache(tmp_path, read_ahead):
+    data = bytes(range(256)) * 1024
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    block_size, max_blocks = 4096, 5
+    with BlockCachedFile(CountingFile(str(path)), block_size=block_size, max_blocks=max_blocks, read_ahead=read_ahead) as f:
+        for offset in range(0, len(data), 1000):
+            f.seek(offset)
+            assert f.read(1000) == data[offset:offset + 1000]
+            assert resident_bytes(f) <= block_size * max_blocks
+        assert len(f._blocks) == max_blocks
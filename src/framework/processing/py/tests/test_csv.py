@@ -0,0 +1,147 @@
+from array import array
+import io
+import zipfile
+
+import pytest
+
+from port.helpers import ColumnBuilder
+import port.unzipddp as unzipddp
+
+HEADER = "name,count,duration\r\n"
+ROWS = [f"item {i},{i},{i / 2}\r\n" for i in range(10)]
+
+
+@pytest.fixture
+def csv_zip(tmp_path):
+    """
+    Writes a zipfile with the given members, returns its path
+    """
+    def write(members: dict[str, bytes]) -> str:
+        path = str(tmp_path / "csv.zip")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, content in members.items():
+                zf.writestr(name, content)
+        return path
+
+    return write
+
+
+def read(path: str, file: str = "data.csv", **kwargs) -> list:
+    return list(unzipddp.read_csv_from_zip(path, file, **kwargs))
+
+
+def all_rows(tables) -> list[tuple]:
+    return [row for table in tables for row in table.rows()]
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("\ufeffname\r\ncafé\r\n".encode("utf-8"), "utf-8-sig"),
+    ("name\r\ncafé\r\n".encode("utf-8"), "utf-8-sig"),
+    ("name\r\ncafé\r\n".encode("latin1"), "latin1"),
+])
+def test_detect_encoding(content, expected):
+    assert unzipddp._detect_encoding(content, unzipddp.CSV_ENCODINGS) == expected
+
+
+def test_multibyte_character_split_by_the_sample():
+    sample = "name\r\ncafé".encode("utf-8")[:-1]
+    assert unzipddp._detect_encoding(sample, unzipddp.CSV_ENCODINGS) == "utf-8-sig"
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "utf-8", "latin1"])
+def test_encodings_are_read(csv_zip, encoding):
+    path = csv_zip({"data.csv": "name,city\r\nJosé,Zürich\r\n".encode(encoding)})
+    (table,) = read(path)
+    assert table.columns == ["name", "city"]
+    assert all_rows([table]) == [("José", "Zürich")]
+
+
+def test_latin1_after_the_sample_is_replaced(csv_zip, monkeypatch):
+    monkeypatch.setattr(unzipddp, "CSV_SNIFF_BYTES", 8)
+    path = csv_zip({"data.csv": "name\r\nplain\r\ncafé\r\n".encode("latin1")})
+    assert all_rows(read(path))[1][0] == "caf\ufffd"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 10, 11, 100])
+def test_chunk_boundaries(csv_zip, chunk_size):
+    path = csv_zip({"data.csv": (HEADER + "".join(ROWS)).encode()})
+    tables = read(path, chunk_size=chunk_size)
+
+    assert [len(table) for table in tables[:-1]] == [chunk_size] * (len(tables) - 1)
+    assert 0 < len(tables[-1]) <= chunk_size
+    assert all_rows(tables) == [(f"item {i}", str(i), str(i / 2)) for i in range(10)]
+
+
+def test_quoted_newlines(csv_zip):
+    path = csv_zip({"data.csv": b'name,text\r\na,"two\r\nlines"\r\nb,"a ""quote"""\r\n'})
+    assert all_rows(read(path, chunk_size=1)) == [("a", "two\r\nlines"), ("b", 'a "quote"')]
+
+
+def test_type_conversion(csv_zip):
+    path = csv_zip({"data.csv": (HEADER + "".join(ROWS)).encode()})
+    (table,) = read(path, typecodes={"count": "q", "duration": "d"})
+
+    assert table["count"] == array("q", range(10))
+    assert table["duration"] == array("d", [i / 2 for i in range(10)])
+    assert table["name"] == [f"item {i}" for i in range(10)]
+
+
+def test_unconvertible_cells_are_none(csv_zip):
+    content = HEADER + "a,1,0.5\r\nb,many,1.5\r\nc,3,\r\nd\r\ne,5,2.5\r\n"
+    path = csv_zip({"data.csv": content.encode()})
+    first, second = read(path, typecodes={"count": "q", "duration": "d"}, chunk_size=3)
+
+    # Rows are kept, the values that do not convert are None
+    assert list(first["name"]) + list(second["name"]) == ["a", "b", "c", "d", "e"]
+    assert list(first["count"]) == [1, None, 3]
+    assert list(first["duration"]) == [0.5, 1.5, None]
+    assert isinstance(first["count"], list) and isinstance(first["duration"], list)
+
+    # Cells missing from a short row are None
+    assert all_rows([second]) == [("d", None, None), ("e", 5, 2.5)]
+
+
+def test_chunks_without_none_are_arrays(csv_zip):
+    content = HEADER + "a,x,0.5\r\nb,2,1.5\r\n"
+    path = csv_zip({"data.csv": content.encode()})
+    first, second = read(path, typecodes={"count": "q", "duration": "d"}, chunk_size=1)
+
+    assert list(first["count"]) == [None] and isinstance(first["count"], list)
+    assert second["count"] == array("q", [2])
+    assert first["duration"] == array("d", [0.5])
+
+
+def test_column_projection(csv_zip):
+    path = csv_zip({"data.csv": (HEADER + "".join(ROWS[:2])).encode()})
+    (table,) = read(path, columns=["duration", "name"], typecodes={"duration": "d"})
+    assert table.columns == ["duration", "name"]
+    assert all_rows([table]) == [(0.0, "item 0"), (0.5, "item 1")]
+
+
+def test_missing_columns_and_files_yield_nothing(csv_zip):
+    path = csv_zip({"data.csv": HEADER.encode(), "empty.csv": b""})
+    assert read(path, columns=["name", "missing"]) == []
+    assert read(path, "missing.csv") == []
+    assert read(path, "empty.csv") == []
+    assert read(path) == []
+
+
+def test_read_csv_from_bytes():
+    content = "\ufeffname,count\r\nJosé,1\r\nshort\r\n".encode("utf-8")
+    assert unzipddp.read_csv_from_bytes(io.BytesIO(content)) == [
+        {"name": "José", "count": "1"},
+        {"name": "short", "count": None},
+    ]
+    assert unzipddp.read_csv_from_bytes(io.BytesIO("name\r\ncafé\r\n".encode("latin1"))) == [{"name": "café"}]
+
+
+def test_allow_none():
+    typecodes = {1: "q"}
+    builder = ColumnBuilder(typecodes)
+    builder.append(("a", 1))
+    builder.allow_none(1)
+    builder.append(("b", None))
+    assert builder.to_table(["name", "count"])["count"] == [1, None]
+
+    # The typecodes are shared by the builders of the next chunks
+    assert typecodes == {1: "q"}
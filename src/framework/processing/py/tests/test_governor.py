@@ -0,0 +1,104 @@
+import pytest
+
+import port.governor as governor
+from port.governor import MemoryGovernor
+from port.scheduler import Scheduler
+from port.table import Table
+
+THRESHOLDS = (100, 200)
+ROW_CAP = 3
+
+
+class FakeProbe:
+    """
+    Memory in use as set by the test, in place of the size of the frames or tracemalloc
+    """
+
+    def __init__(self):
+        self.in_use = 0
+
+    def __call__(self) -> int:
+        return self.in_use
+
+
+@pytest.fixture
+def probe(monkeypatch) -> FakeProbe:
+    fake = FakeProbe()
+    monkeypatch.setattr(MemoryGovernor, "memory_in_use", lambda self: fake())
+    return fake
+
+
+def table(n: int) -> Table:
+    return Table({"a": list(range(n))})
+
+
+def test_levels_follow_the_thresholds(probe):
+    g = MemoryGovernor(THRESHOLDS, ROW_CAP)
+    levels = []
+    for in_use in [0, 99, 100, 150, 50, 199, 200, 10]:
+        probe.in_use = in_use
+        g.observe(table(1))
+        levels.append(g.level)
+
+    # The level only goes up
+    assert levels == [0, 0, 1, 1, 1, 1, 2, 2]
+
+
+def test_strategy_per_level(probe):
+    g = MemoryGovernor(THRESHOLDS, ROW_CAP)
+    assert (g.row_cap, g.skips(0), g.skips(1)) == (None, False, False)
+
+    probe.in_use = 100
+    g.observe(table(1))
+    assert (g.row_cap, g.skips(0), g.skips(1)) == (ROW_CAP, False, False)
+
+    probe.in_use = 200
+    g.observe(table(1))
+    assert (g.row_cap, g.skips(0), g.skips(1)) == (ROW_CAP, True, False)
+    assert governor.SKIP_BELOW_PRIORITY == 1
+
+
+def test_frames_are_summed():
+    g = MemoryGovernor(THRESHOLDS, ROW_CAP)
+    g.observe(Table({"a": [1, 2]}))
+    assert g.frames_bytes == Table({"a": [1, 2]}).memory_usage()
+    assert g.memory_in_use() == g.frames_bytes
+
+
+def test_out_of_memory_goes_to_the_last_level(probe):
+    g = MemoryGovernor(THRESHOLDS, ROW_CAP)
+    g.out_of_memory()
+    assert g.level == len(governor.LEVELS) - 1
+
+
+def test_scheduler_degrades_extraction(probe):
+    g = MemoryGovernor(THRESHOLDS, ROW_CAP)
+    scheduler = Scheduler(60, 60, g)
+
+    def extractor(n: int, budget) -> Table:
+        return table(sum(1 for _ in budget.records(range(n))))
+
+    def out_of_memory(budget) -> Table:
+        raise MemoryError
+
+    df, budget = scheduler.run("first", extractor, 10)
+    assert len(df) == 10 and not budget.truncated
+
+    # Crossing the first threshold caps the tables that follow
+    probe.in_use = 150
+    scheduler.run("second", extractor, 10)
+    df, budget = scheduler.run("third", extractor, 10)
+    assert len(df) == ROW_CAP
+    assert budget.reason == "rows"
+
+    # A MemoryError skips the low priority tables that follow
+    df, budget = scheduler.run("fourth", out_of_memory)
+    assert df.empty and budget.reason == "memory"
+    df, budget = scheduler.run("fifth", extractor, 10, priority=0)
+    assert df.empty and budget.reason == "memory"
+    df, budget = scheduler.run("sixth", extractor, 10, priority=1)
+    assert len(df) == ROW_CAP
+
+    assert [(t["table"], t["status"]) for t in scheduler.timeouts] == [
+        ("third", "truncated"), ("fourth", "truncated"), ("fifth", "skipped"), ("sixth", "truncated"),
+    ]
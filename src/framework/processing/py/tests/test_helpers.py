@@ -0,0 +1,71 @@
+import random
+
+from benchmark_helpers import group_post, recursive_dict_denester
+from conftest import facebook_files
+import port.helpers as helpers
+
+# Keys that find_nested is used with in port.facebook
+KEYS = ["title", "post", "timestamp", "url", "comment-comment", "reaction-reaction", "name", "group", "text"]
+
+
+def random_record(rng: random.Random, depth: int = 0):
+    """
+    A nested record with the keys of a DDP, without "-" in the keys
+    """
+    if depth > 4 or rng.random() < 0.3:
+        return rng.choice([rng.randint(0, 10**12), f"value {rng.random()}", None, True, 1.5])
+    if rng.random() < 0.4:
+        return [random_record(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    keys = ["title", "data", "post", "comment", "reaction", "name", "group", "timestamp", "url", "attachments", "media", "text"]
+    return {key: random_record(rng, depth + 1) for key in rng.sample(keys, rng.randint(0, 4))}
+
+
+def records() -> list:
+    rng = random.Random(7)
+    files = facebook_files(10)
+    return [
+        *files["group_posts_and_comments.json"]["group_posts_v2"],
+        *(group_post(i) for i in range(10)),
+        *files["your_comments_in_groups.json"]["group_comments_v2"],
+        *files["likes_and_reactions_1.json"],
+        files["recently_visited.json"],
+        *(random_record(rng) for _ in range(500)),
+    ]
+
+
+def test_denesting_equals_recursive_version():
+    for record in records():
+        expected = list(recursive_dict_denester(record).items())
+        assert list(helpers.dict_denester(record).items()) == expected
+        assert [(helpers.join_path(path), value) for path, value in helpers.flatten(record)] == expected
+
+
+def test_find_nested_equals_find_item():
+    for record in records():
+        denested = recursive_dict_denester(record)
+        for key in KEYS:
+            assert helpers.find_nested(record, key) == helpers.find_item(denested, key), (record, key)
+
+
+def test_dict_denester_keeps_recursive_signature():
+    record = {"b": [2, {"c": 3}]}
+    expected = recursive_dict_denester(record, {"a": 1}, "-x", run_first=False)
+    assert helpers.dict_denester(record, {"a": 1}, "-x", run_first=False) == expected == {"a": 1, "x-b-0": 2, "x-b-1-c": 3}
+    assert helpers.dict_denester(record, {"a": 1}) == recursive_dict_denester(record, {"a": 1})
+
+
+class Untouchable(dict):
+    """
+    A dict that fails when its items are visited
+    """
+
+    def _fail(self, *args):
+        raise AssertionError("visited")
+
+    __iter__ = __reversed__ = items = keys = values = _fail
+
+
+def test_lookups_stop_early():
+    record = {"title": "first", "data": Untouchable(title="deeper")}
+    assert helpers.find_nested(record, "title") == "first"
+    assert next(helpers.flatten(record)) == (("title",), "first")
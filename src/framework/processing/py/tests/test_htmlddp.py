@@ -0,0 +1,182 @@
+from datetime import datetime
+import zipfile
+
+import pytest
+
+import port.facebook as facebook
+import port.htmlddp as htmlddp
+import port.script as script
+from port.validate import DDPFiletype
+
+NAME = "Test User"
+EMAIL = "test.user@example.com"
+PHONE = "+31 6 12345678"
+
+
+def record(title: str, texts=(), link: str | None = None, date: str = "Feb 19, 2024 9:46:52 am", img: str | None = None) -> str:
+    """
+    A block as in a current export, with a title, content and a date
+    """
+    content = "".join(f"<div>{text}</div>" for text in texts)
+    if link:
+        content += f'<a href="{link}">{link}</a>'
+    if img:
+        content += f'<img src="icon.png" alt="{img}"/>'
+    return (
+        f'<div class="pam _3-95 _2ph- _a6-g uiBoxWhite noborder"><div class="_3-95 _2pim _a6-h _a6-i">{title}</div>'
+        f'<div class="_3-95 _a6-p"><div><div>{content}</div></div></div>'
+        f'<div class="_3-95 _a6-o"><a href="https://www.facebook.com/x"><div class="_a72d">{date}</div></a></div></div>'
+    )
+
+
+def page(records: list[str]) -> str:
+    return (
+        '<html><head><meta charset="utf-8"/><title>Your activity</title></head>'
+        f'<body><div class="_a706" role="main">{"".join(records)}</div></body></html>'
+    )
+
+
+PROFILE = page([
+    record("Profile information", [
+        "Name", NAME,
+        "Emails", EMAIL,
+        "Phone numbers", PHONE, "Verified",
+        "Birthday", "Jan 1, 1990",
+    ]),
+])
+
+FILES = {
+    "profile_information.html": PROFILE,
+    "comments.html": page([
+        record(f"{NAME} commented on Friend {i}'s post.", [f"nice &amp; {i} café, mail {EMAIL}"], date=f"Mar {i + 1:02d}, 2023 1:0{i}:00 pm")
+        for i in range(5)
+    ]),
+    "group_posts_and_comments.html": page([
+        record(f"{NAME} posted in Group {i}.", [f"call me at {PHONE}"], link=f"https://example.com/{i}")
+        for i in range(3)
+    ]),
+    "your_comments_in_groups.html": page([
+        record(f"{NAME} commented on a post in Group {i}.", [f"signed, {NAME}"])
+        for i in range(3)
+    ]),
+    "your_group_membership_activity.html": page([record(f"{NAME} became a member of Group {i}.") for i in range(3)]),
+    "likes_and_reactions_1.html": page([record(f"{NAME} likes Friend {i}'s post.", img="Like") for i in range(4)]),
+    "likes_and_reactions_2.html": page([record(f"{NAME} reacted to Friend 9's video.", img="Love")]),
+}
+
+
+@pytest.fixture
+def html_zip(tmp_path) -> str:
+    path = str(tmp_path / "facebook_html.zip")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in FILES.items():
+            folder = "personal_information/profile_information" if name.startswith("profile") else "your_facebook_activity/activity"
+            zf.writestr(f"{folder}/{name}", content)
+        for extra in ["ads_interests.html", "recently_viewed.html", "notifications.html"]:
+            zf.writestr(f"other/{extra}", page([]))
+    return path
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Feb 19, 2024 9:46:52 am", datetime(2024, 2, 19, 9, 46, 52)),
+    ("Feb 19, 2024, 9:46 PM", datetime(2024, 2, 19, 21, 46)),
+    ("Feb 19, 2024   9:46 pm", datetime(2024, 2, 19, 21, 46)),
+    ("19 Feb 2024, 21:46", datetime(2024, 2, 19, 21, 46)),
+    ("yesterday", None),
+    ("", None),
+])
+def test_parse_time(text, expected):
+    assert htmlddp.parse_time(text) == expected
+
+
+def test_record_parser():
+    parser = htmlddp.RecordParser()
+    parser.feed(page([
+        record("First &amp; foremost", ["one", "two"], link="https://example.com", img="Like"),
+        record("Undated", date="some day"),
+    ]))
+    parser.close()
+
+    first, undated = parser.pop_records()
+    assert first == {
+        "title": "First & foremost",
+        "texts": ["one", "two", "https://example.com", "Like"],
+        "links": ["https://example.com"],
+        "time": "2024-02-19T09:46:52",
+        "timestamp": 1708336012,
+    }
+    assert undated["title"] == "Undated"
+    assert (undated["time"], undated["timestamp"]) == ("", None)
+    assert parser.pop_records() == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, htmlddp.CHUNK_SIZE])
+def test_chunked_reads_equal_whole_document(html_zip, monkeypatch, chunk_size):
+    parser = htmlddp.RecordParser()
+    parser.feed(FILES["comments.html"])
+    parser.close()
+    expected = parser.pop_records()
+
+    monkeypatch.setattr(htmlddp, "CHUNK_SIZE", chunk_size)
+    records = list(htmlddp.read_html_records_from_zip(html_zip, "comments.html"))
+    assert records == expected
+    assert records[0]["texts"] == [f"nice & 0 café, mail {EMAIL}"]
+
+
+def test_missing_file_yields_nothing(html_zip):
+    assert list(htmlddp.read_html_records_from_zip(html_zip, "missing.html")) == []
+
+
+def test_read_profile(html_zip):
+    assert htmlddp.read_profile_from_zip(html_zip) == {"name": [NAME], "emails": [EMAIL], "phone_numbers": [PHONE]}
+    assert htmlddp.read_profile_from_zip(html_zip, "missing.html") == {"name": [], "emails": [], "phone_numbers": []}
+
+
+def test_actor_is_redacted_without_profile(html_zip):
+    df = facebook.comments_html_to_df(html_zip, [])
+    assert df["Title"][0] == "<Redacted> commented on <Redacted>'s post."
+    assert NAME not in df["Title"][0]
+
+
+@pytest.mark.parametrize("extractor, columns", [
+    (facebook.comments_html_to_df, ["Title", "Comment"]),
+    (facebook.group_posts_and_comments_html_to_df, ["Title", "Post"]),
+    (facebook.your_comments_in_groups_html_to_df, ["Title", "Comment"]),
+    (facebook.likes_and_reactions_html_to_df, ["Title"]),
+])
+def test_html_extractors_redact_the_participant(html_zip, extractor, columns):
+    df = extractor(html_zip, facebook.get_profile_html(html_zip))
+    assert len(df) > 0
+    for column in columns:
+        for value in df[column]:
+            assert NAME not in value and EMAIL not in value and PHONE not in value
+            assert "<Redacted>" in value
+
+
+def test_html_extractors(html_zip):
+    likes = facebook.likes_and_reactions_html_to_df(html_zip, [])
+    assert len(likes) == 5
+    assert sorted(set(likes["Reaction"])) == ["Like", "Love"]
+
+    groups = facebook.your_group_membership_activity_html_to_df(html_zip, [])
+    assert list(groups["Group name"]) == ["Group 0", "Group 1", "Group 2"]
+    assert groups["Title"][0] == "<Redacted> became a member of Group 0."
+    assert facebook.groups_to_list(html_zip, html=True) == ["Group 0", "Group 1", "Group 2"]
+
+    comments = facebook.your_comments_in_groups_html_to_df(html_zip, [])
+    assert list(comments["Group"]) == ["Group 0", "Group 1", "Group 2"]
+
+    posts = facebook.group_posts_and_comments_html_to_df(html_zip, [])
+    assert list(posts["Url"]) == [f"https://example.com/{i}" for i in range(3)]
+
+
+def test_html_tables_are_redacted(html_zip):
+    validation = facebook.validate(html_zip)
+    assert validation.ddp_category.ddp_filetype == DDPFiletype.HTML
+
+    tables = script.extract_facebook(html_zip, validation)
+    assert tables
+    for table in tables:
+        for column in table.data_frame.columns:
+            for value in table.data_frame[column]:
+                assert not isinstance(value, str) or (NAME not in value and EMAIL not in value and PHONE not in value)
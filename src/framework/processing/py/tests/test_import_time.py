@@ -0,0 +1,51 @@
+"""
+Importing port happens before the first page is shown, it should not import the extraction modules
+Every check runs in a fresh interpreter, this process has imported them already
+"""
+from pathlib import Path
+import json
+import subprocess
+import sys
+
+# Budget in microseconds for the cumulative import time of port, as reported by python -X importtime
+IMPORT_TIME_BUDGET_US = 25_000
+
+# Modules that are only needed once a session starts
+DEFERRED_MODULES = ("port.script", "port.facebook", "pandas")
+
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=PACKAGE_ROOT, capture_output=True, text=True, check=True,
+    )
+
+
+def top_level_imports(importtime: str) -> dict[str, int]:
+    """
+    Cumulative microseconds per top-level import in the output of -X importtime
+    Nested imports are indented and included in the cumulative time of their parent
+    """
+    out = {}
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            out[name.strip()] = int(cumulative)
+    return out
+
+
+def test_import_time_within_budget():
+    startup = top_level_imports(run_python("-X", "importtime", "-c", "pass").stderr)
+    imports = top_level_imports(run_python("-X", "importtime", "-c", "import port").stderr)
+
+    added = {name: us for name, us in imports.items() if name not in startup}
+    assert "port" in added
+    assert sum(added.values()) < IMPORT_TIME_BUDGET_US, added
+
+
+def test_import_defers_extraction_modules():
+    code = f"import json, sys, port; print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    assert json.loads(run_python("-c", code).stdout) == []
@@ -0,0 +1,111 @@
+import json
+import sys
+import types
+
+import pytest
+
+import port.helpers as helpers
+import port.jsonbackend as jsonbackend
+
+PAYLOADS = [
+    b'{"a": 1, "b": [true, false, null], "c": {"d": "e"}}',
+    # Integers that do not fit in 64 bits, and 19 digits that do
+    b"[18446744073709551616, -9223372036854775809, 123456789012345678901234567890]",
+    b"[9223372036854775807, -9223372036854775808, 1.5e300, 0.1]",
+    b'{"timestamp": 1234567890123456789012, "id": "12345678901234567890"}',
+    b"[NaN, Infinity, -Infinity]",
+    # Lone surrogates, a surrogate pair and other escapes
+    b'["\\ud800", "\\udc00x", "\\ud83d\\ude00", "\\u00e9\\u0000\\n\\"\\\\"]',
+    # Encoded surrogate
+    b'"\xed\xa0\x80"',
+    b'\xef\xbb\xbf{"bom": "\xc3\xa9"}',
+    # The latin-1 mojibake of a DDP: utf-8 bytes escaped as code points
+    b'{"name": "Pers\\u00c3\\u00a9", "raw": "Pers\xc3\x83\xc2\xa9"}',
+    b'{"a": 1, "a": 2}',
+    b"  [ ]  ",
+    b'"\xf0\x9f\x98\x80 caf\xc3\xa9"',
+]
+
+INVALID = [
+    b'{"a": }',
+    b"",
+    b'"caf\xe9"',
+    b"[1, 2",
+]
+
+
+def same(a, b) -> bool:
+    # repr compares NaN, and tells 1 and 1.0 apart
+    return repr(a) == repr(b)
+
+
+@pytest.fixture(params=sorted(jsonbackend.BACKENDS))
+def backend(request) -> jsonbackend.JsonBackend:
+    try:
+        return jsonbackend.BACKENDS[request.param]()
+    except ImportError as e:
+        pytest.skip(f"{request.param} is not available: {e}")
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize("buffer", [bytes, bytearray, memoryview])
+def test_backend_equals_json_loads(backend, payload, buffer):
+    assert same(backend.loads(buffer(payload)), json.loads(payload))
+
+
+@pytest.mark.parametrize("payload", INVALID)
+def test_backend_rejects_as_json_loads(backend, payload):
+    with pytest.raises(Exception) as expected:
+        json.loads(payload)
+    with pytest.raises(expected.type):
+        backend.loads(payload)
+
+
+def test_mojibake_is_fixed(backend):
+    decoded = backend.loads(PAYLOADS[8])
+    assert decoded == {"name": "PersÃ©", "raw": "PersÃ©"}
+    assert helpers.fix_latin1_string(decoded["name"]) == "Persé"
+
+
+@pytest.fixture
+def rejecting_orjson(monkeypatch):
+    """
+    An orjson that rejects NaN, as the real one does, and records what it is asked to decode
+    """
+    orjson = types.ModuleType("orjson")
+    orjson.JSONDecodeError = type("JSONDecodeError", (json.JSONDecodeError,), {})
+    orjson.calls = []
+
+    def loads(data):
+        orjson.calls.append(bytes(data))
+        if b"NaN" in bytes(data):
+            raise orjson.JSONDecodeError("NaN is not json", "", 0)
+        return json.loads(bytes(data))
+
+    orjson.loads = loads
+    monkeypatch.setitem(sys.modules, "orjson", orjson)
+    monkeypatch.setattr(jsonbackend, "STATS", jsonbackend.DecodeStats())
+    return orjson
+
+
+def test_rejected_documents_fall_back_to_json(rejecting_orjson):
+    backend = jsonbackend.BACKENDS["orjson"]()
+
+    assert backend.loads(b"[1, 2]") == [1, 2]
+    assert jsonbackend.STATS.fallbacks == 0
+
+    assert same(backend.loads(b"[NaN]"), json.loads(b"[NaN]"))
+    assert jsonbackend.STATS.fallbacks == 1
+
+    # Long integers are not handed to orjson, it would turn them into floats
+    assert backend.loads(b"[18446744073709551616]") == [18446744073709551616]
+    assert jsonbackend.STATS.fallbacks == 2
+    assert rejecting_orjson.calls == [b"[1, 2]", b"[NaN]"]
+
+
+def test_loads_records_stats(monkeypatch):
+    monkeypatch.setattr(jsonbackend, "STATS", jsonbackend.DecodeStats())
+    assert jsonbackend.loads(b'{"a": 1}') == {"a": 1}
+    assert jsonbackend.STATS.calls == 1
+    assert jsonbackend.STATS.bytes == 8
+    assert jsonbackend.STATS.backend == jsonbackend.backend().name
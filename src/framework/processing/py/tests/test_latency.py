@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+import port.api.props as props
+from port.api.commands import CommandSystemDonate, CommandSystemExit, CommandUIRender
+import port.latency as latency
+from port.latency import Histogram, LatencyRecorder
+from port.main import ScriptWrapper
+
+BOUNDS = (1, 10, 100)
+
+
+def histogram(values) -> Histogram:
+    h = Histogram(BOUNDS)
+    for value in values:
+        h.add(value)
+    return h
+
+
+def test_buckets_include_their_bound():
+    h = histogram([0.5, 1, 1.01, 10, 99, 100, 100.5, 5000])
+    assert h.counts == [2, 2, 2, 2]
+    assert (h.n, h.total, h.max) == (8, pytest.approx(5312.01), 5000)
+
+
+@pytest.mark.parametrize("q, expected", [(0, 1), (25, 1), (26, 10), (50, 10), (75, 100), (76, 250), (95, 250), (100, 250)])
+def test_percentiles(q, expected):
+    # 25 values per bucket, above the last bound the percentile is the maximum
+    h = histogram([0.5] * 25 + [5] * 25 + [50] * 25 + [150] * 24 + [250])
+    assert h.percentile(q) == expected
+
+
+def test_percentile_is_at_most_the_maximum():
+    h = histogram([3, 4])
+    assert h.percentile(50) == 4
+    assert h.percentile(100) == 4
+
+
+def test_percentile_without_values():
+    assert Histogram(BOUNDS).percentile(50) == 0.0
+
+
+def test_to_dict():
+    assert histogram([0.5, 7, 7, 12.345, 500]).to_dict() == {
+        "n": 5,
+        "total": 526.8,
+        "max": 500,
+        "p50": 10,
+        "p95": 500,
+        "buckets": {"<=1": 1, "<=10": 2, "<=100": 1, ">100": 1},
+    }
+
+
+@pytest.mark.parametrize("value", [
+    "",
+    "a string",
+    {},
+    {"key": "value", "n": 12, "ok": True, "none": None},
+    {"nested": {"list": [1, "two", {"three": 3.5}]}, "empty": []},
+    [1, 2, 3],
+])
+def test_serialized_size_estimates_json(value):
+    if isinstance(value, str):
+        assert latency.serialized_size(value) == len(value)
+    else:
+        # Close to compact JSON, without encoding it
+        size = latency.serialized_size(value)
+        encoded = len(json.dumps(value, separators=(",", ":")))
+        assert abs(size - encoded) <= 4 + encoded // 10
+
+
+def test_serialized_size_of_a_render():
+    command = CommandUIRender(props.PropsUIPageEnd())
+    assert latency.serialized_size(command.toDict()) == pytest.approx(len(json.dumps(command.toDict())), rel=0.3)
+
+
+def test_command_key():
+    assert latency.command_key(CommandUIRender(props.PropsUIPageEnd())) == "CommandUIRender/PropsUIPageEnd"
+    assert latency.command_key(CommandSystemDonate("key", "{}")) == "CommandSystemDonate"
+    assert latency.command_key(CommandSystemExit(0, "done")) == "CommandSystemExit"
+
+
+def test_recorder(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(latency.time, "perf_counter", lambda: now[0])
+    recorder = LatencyRecorder()
+
+    # Nothing was handed out yet
+    recorder.received()
+    recorder.record(CommandSystemDonate("key", "{}"), 0.004, 2048)
+    now[0] = 1.5
+    recorder.received()
+    recorder.record(CommandSystemExit(0, "done"), 0.0001, 10)
+
+    summary = recorder.summary()
+    assert summary["CommandSystemDonate"]["python_ms"]["buckets"] == {"<=5": 1}
+    assert summary["CommandSystemDonate"]["bytes"]["buckets"] == {"<=10240": 1}
+    assert summary["CommandSystemDonate"]["ui_ms"]["max"] == 1500
+    assert "ui_ms" not in summary["CommandSystemExit"]
+
+
+def test_script_wrapper_records_every_command():
+    def script():
+        yield CommandSystemDonate("key", "{}")
+        yield CommandUIRender(props.PropsUIPageEnd())
+
+    recorder = LatencyRecorder()
+    wrapper = ScriptWrapper(script(), "json", recorder)
+    for _ in range(3):
+        wrapper.send(None)
+
+    summary = recorder.summary()
+    assert sorted(summary) == ["CommandSystemDonate", "CommandSystemExit", "CommandUIRender/PropsUIPageEnd"]
+    assert all(entry["python_ms"]["n"] == 1 for entry in summary.values())
+    assert summary["CommandSystemDonate"]["ui_ms"]["n"] == 1
@@ -0,0 +1,126 @@
+import random
+import zipfile
+
+import pytest
+
+import port.unzipddp as unzipddp
+from port.unzipddp import MappedZip
+
+rng = random.Random(3)
+CONTENT = {
+    "stored.json": b'{"stored": true}' * 100,
+    "deflated.json": b'{"deflated": "' + bytes(rng.choice(b"abcdef") for _ in range(50_000)) + b'"}',
+    "empty.json": b"",
+    "bzip2.json": b'{"bzip2": true}' * 10,
+}
+COMPRESSION = {
+    "stored.json": zipfile.ZIP_STORED,
+    "deflated.json": zipfile.ZIP_DEFLATED,
+    "empty.json": zipfile.ZIP_DEFLATED,
+    "bzip2.json": zipfile.ZIP_BZIP2,
+}
+
+
+@pytest.fixture
+def zip_path(tmp_path) -> str:
+    path = str(tmp_path / "members.zip")
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, content in CONTENT.items():
+            info = zipfile.ZipInfo(f"activity/{name}")
+            info.compress_type = COMPRESSION[name]
+            zf.writestr(info, content)
+    return path
+
+
+@pytest.mark.parametrize("name", list(CONTENT))
+def test_read(zip_path, name):
+    with MappedZip(zip_path) as mz:
+        data = mz.read(mz.find(name))
+        assert bytes(data) == CONTENT[name]
+        data.release()
+
+
+def test_stored_members_are_not_copied(zip_path):
+    with MappedZip(zip_path) as mz:
+        data = mz.read(mz.find("stored.json"))
+        assert data.obj is mz._map
+        data.release()
+
+        data = mz.read(mz.find("deflated.json"))
+        assert data.obj is not mz._map
+        data.release()
+
+
+@pytest.mark.parametrize("name", list(CONTENT))
+@pytest.mark.parametrize("inflate_chunk_size", [7, unzipddp.INFLATE_CHUNK_SIZE])
+@pytest.mark.parametrize("read_size", [1, 1000, -1])
+def test_open(zip_path, monkeypatch, name, inflate_chunk_size, read_size):
+    monkeypatch.setattr(unzipddp, "INFLATE_CHUNK_SIZE", inflate_chunk_size)
+    with MappedZip(zip_path) as mz:
+        with mz.open(mz.find(name)) as f:
+            if read_size < 0:
+                data = f.read()
+            else:
+                data = b"".join(iter(lambda: f.read(read_size), b""))
+        assert data == CONTENT[name]
+
+
+def test_find_in_any_directory(zip_path):
+    with MappedZip(zip_path) as mz:
+        assert mz.find("stored.json").filename == "activity/stored.json"
+        assert mz.find("missing.json") is None
+
+
+def corrupt(zip_path: str, content: bytes) -> None:
+    """
+    Flips a byte in the middle of content, which is stored without compression
+    """
+    with open(zip_path, "r+b") as f:
+        data = bytearray(f.read())
+        data[data.index(content) + len(content) // 2] ^= 0xFF
+        f.seek(0)
+        f.write(data)
+
+
+def test_crc_mismatch_of_a_stored_member(zip_path):
+    corrupt(zip_path, CONTENT["stored.json"])
+    with MappedZip(zip_path) as mz:
+        info = mz.find("stored.json")
+        with pytest.raises(zipfile.BadZipFile, match="Bad CRC-32 for file activity/stored.json"):
+            mz.read(info)
+        with pytest.raises(zipfile.BadZipFile, match="Bad CRC-32"):
+            with mz.open(info) as f:
+                f.read()
+
+
+@pytest.mark.parametrize("name", ["stored.json", "deflated.json"])
+def test_crc_mismatch(zip_path, name):
+    # The data is intact, the expected CRC is not
+    with MappedZip(zip_path) as mz:
+        info = mz.find(name)
+        info.CRC ^= 1
+        with pytest.raises(zipfile.BadZipFile, match="Bad CRC-32"):
+            mz.read(info)
+
+        # Streaming reads only find out at the end
+        with mz.open(info) as f:
+            assert f.read(10) == CONTENT[name][:10]
+            with pytest.raises(zipfile.BadZipFile, match="Bad CRC-32"):
+                f.read()
+
+
+def test_bad_local_header(zip_path):
+    with MappedZip(zip_path) as mz:
+        info = mz.find("deflated.json")
+        info.header_offset += 1
+        with pytest.raises(zipfile.BadZipFile, match="Bad magic number"):
+            mz.read(info)
+
+
+def test_close_with_a_view_that_is_not_released(zip_path, caplog):
+    mz = MappedZip(zip_path)
+    data = mz.read(mz.find("stored.json"))
+    mz.close()
+    assert "stays open until views are released" in caplog.text
+    assert bytes(data[:10]) == CONTENT["stored.json"][:10]
+    data.release()
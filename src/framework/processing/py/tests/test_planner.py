@@ -0,0 +1,120 @@
+import zipfile
+
+import pytest
+
+import port.planner as planner
+from port.planner import Plan, PlannedTable, Strategy
+from port.scheduler import Scheduler
+from port.table import Table
+
+KB = 1000
+MB = 1000 * KB
+COEFFICIENTS = planner.COEFFICIENTS[".json"]
+
+
+def peak(uncompressed: int) -> int:
+    return planner.FIXED_BYTES + int(COEFFICIENTS.peak * uncompressed)
+
+
+def frame(uncompressed: int) -> int:
+    return int(COEFFICIENTS.frame * uncompressed)
+
+
+@pytest.fixture
+def planned_zip(tmp_path) -> str:
+    """
+    Members of known sizes, the planner only reads the central directory
+    """
+    path = str(tmp_path / "planned.zip")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("activity/small.json", b"[]" + b" " * (10 * KB - 2))
+        zf.writestr("activity/large.json", b"[]" + b" " * (1 * MB - 2))
+        zf.writestr("activity/likes_1.json", b"[]" + b" " * (20 * KB - 2))
+        zf.writestr("activity/likes_2.json", b"[]" + b" " * (30 * KB - 2))
+        zf.writestr("activity/likes_1.html", b"<html>")
+    return path
+
+
+def test_sizes_come_from_the_central_directory(planned_zip):
+    plan = planner.plan(planned_zip, [PlannedTable("likes", ("likes_*",)), PlannedTable("none", ("missing",))], ".json", (10 * MB, 20 * MB), 100, 60)
+
+    likes = plan.estimates["likes"]
+    assert (likes.files, likes.uncompressed) == (2, 50 * KB)
+    assert 0 < likes.compressed < likes.uncompressed
+    assert likes.seconds == pytest.approx(planner.FIXED_SECONDS + COEFFICIENTS.seconds_per_mb * 0.05)
+    assert (likes.peak, likes.frame, likes.strategy) == (peak(50 * KB), frame(50 * KB), Strategy.IN_MEMORY)
+
+    none = plan.estimates["none"]
+    assert (none.files, none.uncompressed, none.strategy) == (0, 0, Strategy.IN_MEMORY)
+
+
+def test_strategies_follow_the_thresholds(planned_zip):
+    tables = [PlannedTable("small", ("small",)), PlannedTable("large", ("large",)), PlannedTable("low", ("large",), priority=0)]
+
+    plan = planner.plan(planned_zip, tables, ".json", (peak(MB) + 1, 100 * MB), 100, 60)
+    assert [plan.strategy(t.id) for t in tables] == [Strategy.IN_MEMORY, Strategy.CAPPED, Strategy.CAPPED]
+
+    # The tables planned before a table are held in memory while it is extracted
+    held = frame(10 * KB)
+    plan = planner.plan(planned_zip, tables, ".json", (held + peak(MB) + 1, held + peak(MB) + 1), 100, 60)
+    assert [plan.strategy(t.id) for t in tables] == [Strategy.IN_MEMORY, Strategy.IN_MEMORY, Strategy.SKIPPED]
+
+    # Only low priority tables are skipped
+    plan = planner.plan(planned_zip, tables, ".json", (1, 1), 100, 60)
+    assert [plan.strategy(t.id) for t in tables] == [Strategy.CAPPED, Strategy.CAPPED, Strategy.SKIPPED]
+    assert (plan.estimates["low"].peak, plan.estimates["low"].frame) == (0, 0)
+    assert plan.row_cap == 100
+
+
+def test_low_priority_tables_are_skipped_beyond_the_session_budget(planned_zip):
+    tables = [PlannedTable("large", ("large",)), PlannedTable("low", ("large",), priority=0), PlannedTable("small", ("small",), priority=0)]
+    budget = 1.5 * planner.plan(planned_zip, tables[:1], ".json", (100 * MB, 100 * MB), 100, 60).estimates["large"].seconds
+
+    plan = planner.plan(planned_zip, tables, ".json", (100 * MB, 100 * MB), 100, budget)
+    assert [plan.strategy(t.id) for t in tables] == [Strategy.IN_MEMORY, Strategy.SKIPPED, Strategy.IN_MEMORY]
+
+
+def test_unreadable_zipfile_plans_nothing(tmp_path):
+    path = tmp_path / "bad.zip"
+    path.write_bytes(b"not a zipfile")
+    plan = planner.plan(str(path), [PlannedTable("small", ("small",))], ".json", (1, 1), 100, 60)
+    assert plan.estimates["small"].files == 0
+
+
+def test_accuracy(planned_zip):
+    tables = [PlannedTable("small", ("small",)), PlannedTable("large", ("large",)), PlannedTable("none", ("missing",)), PlannedTable("later", ("small",))]
+    plan = planner.plan(planned_zip, tables, ".json", (100 * MB, 100 * MB), 100, 60)
+    small, large = plan.estimates["small"], plan.estimates["large"]
+
+    small.actual_seconds, small.actual_peak, small.actual_frame = 2 * small.seconds, small.peak // 2, small.frame
+    large.actual_seconds, large.actual_frame = large.seconds, 3 * large.frame
+    plan.estimates["none"].actual_seconds = 1.0
+
+    accuracy = plan.accuracy()
+    # Tables without files, and tables that were not extracted, are left out
+    assert accuracy["tables"] == [
+        {"table": "small", "strategy": "in-memory", "seconds": 2.0, "peak": 0.5, "frame": 1.0},
+        {"table": "large", "strategy": "in-memory", "seconds": 1.0, "frame": 3.0},
+    ]
+    assert accuracy["overall"] == {
+        "seconds": round((2 * small.seconds + large.seconds) / (small.seconds + large.seconds), 2),
+        "peak": 0.5,
+        "frame": round((small.frame + 3 * large.frame) / (small.frame + large.frame), 2),
+    }
+    assert Plan().accuracy() == {"overall": {}, "tables": []}
+
+
+def test_scheduler_follows_the_plan(planned_zip):
+    tables = [PlannedTable("large", ("large",)), PlannedTable("low", ("large",), priority=0)]
+    plan = planner.plan(planned_zip, tables, ".json", (1, 1), 2, 60)
+    scheduler = Scheduler(60, 60, plan=plan)
+
+    def extractor(budget) -> Table:
+        return Table({"a": list(budget.records(range(10)))})
+
+    df, budget = scheduler.run("large", extractor)
+    assert (len(df), budget.reason) == (2, "rows")
+    assert plan.estimates["large"].actual_frame == df.memory_usage()
+
+    df, budget = scheduler.run("low", extractor, priority=0)
+    assert (len(df), budget.reason) == (0, "plan")
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+import cProfile
+import json
+
+import pytest
+
+import port.profiling as profiling
+from test_script import run_flow
+
+
+class FakeProfiler:
+    """
+    Records whether it is enabled
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.calls = []
+
+    def enable(self):
+        self.calls.append("enable")
+        self.enabled = True
+
+    def disable(self):
+        self.calls.append("disable")
+        self.enabled = False
+
+
+def test_profiled_only_while_the_generator_runs():
+    profiler = FakeProfiler()
+    seen = []
+
+    def stream():
+        for i in range(3):
+            seen.append(profiler.enabled)
+            yield i
+
+    out = []
+    for item in profiling.profiled(stream(), profiler):
+        out.append((item, profiler.enabled))
+
+    assert out == [(0, False), (1, False), (2, False)]
+    assert seen == [True, True, True]
+    assert profiler.calls == ["enable", "disable"] * 4
+
+
+def test_profiled_disables_on_errors():
+    profiler = FakeProfiler()
+
+    def stream():
+        yield 1
+        raise ValueError("broken")
+
+    profiled = profiling.profiled(stream(), profiler)
+    assert next(profiled) == 1
+    with pytest.raises(ValueError, match="broken"):
+        next(profiled)
+    assert not profiler.enabled
+
+
+def work(n: int) -> int:
+    return sum(sorted(range(n)))
+
+
+def profile() -> cProfile.Profile:
+    profiler = profiling.new_profiler()
+    assert profiler is not None
+    list(profiling.profiled((work(10_000) for _ in range(5)), profiler))
+    return profiler
+
+
+def test_summarize():
+    rows = json.loads(profiling.summarize(profile(), top=3))
+
+    assert 0 < len(rows) <= 3
+    assert set(rows[0]) == {"function", "calls", "tottime", "cumtime"}
+    cumtimes = [row["cumtime"] for row in rows]
+    assert cumtimes == sorted(cumtimes, reverse=True)
+    assert any(row["function"].endswith("(work)") and row["calls"] == 5 for row in json.loads(profiling.summarize(profile())))
+
+
+@pytest.mark.parametrize("max_bytes", [2, 100, 300, 8 * 1024])
+def test_summarize_is_capped(max_bytes):
+    profiler = profile()
+    out = profiling.summarize(profiler, top=50, max_bytes=max_bytes)
+    assert len(out) <= max_bytes
+
+    # Rows are dropped from the end
+    everything = json.loads(profiling.summarize(profiler, top=50, max_bytes=1 << 20))
+    rows = json.loads(out)
+    assert rows == everything[:len(rows)]
+    if max_bytes > 300:
+        assert rows
+
+
+def test_function_name():
+    assert profiling.function_name(("/lib/python3.11/site-packages/port/facebook.py", 12, "comments_to_df")) == "port/facebook.py:12(comments_to_df)"
+    assert profiling.function_name(("C:\\py\\port\\helpers.py", 3, "flatten")) == "port/helpers.py:3(flatten)"
+    assert profiling.function_name(("~", 0, "<built-in method builtins.sorted>")) == "<built-in method builtins.sorted>"
+
+
+def test_process_logs_the_profile(fresh_script, facebook_zip, monkeypatch):
+    summaries = []
+    summarize = profiling.summarize
+
+    def recording_summarize(*args, **kwargs):
+        summaries.append(summarize(*args, **kwargs))
+        return summaries[-1]
+
+    monkeypatch.setattr(profiling, "summarize", recording_summarize)
+    run_flow(SimpleNamespace(process=lambda session_id: fresh_script.process(session_id, profile=True)), facebook_zip)
+
+    assert len(summaries) == 1
+    assert any("extract_table" in row["function"] for row in json.loads(summaries[0]))
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+
+import pytest
+
+import port.api.props as props
+import port.script as script
+from port.table import Table
+
+
+def test_tables_are_not_kept_serialized():
+    table = props.PropsUIPromptConsentFormTable("t", props.Translatable({"en": "T", "nl": "T"}), Table({"a": [1, 2]}))
+    page = script.render_page("Facebook", script.create_consent_form([table])).page
+
+    for value in (table, page.body, page):
+        assert value.toJSON() == value.toJSON()
+        assert value.toDict() == value.toDict()
+        assert not hasattr(value, "_json")
+        assert not hasattr(value, "_dict")
+
+
+def test_props_without_tables_are_kept_serialized():
+    prompt = script.retry_confirmation("Facebook")
+    assert prompt.toJSON() is prompt.toJSON()
+    assert prompt.toDict() is prompt.toDict()
+
+
+def test_props_must_define_fields():
+    with pytest.raises(TypeError, match="PropsUIMissing does not define fields"):
+        @dataclass(frozen=True, slots=True)
+        class PropsUIMissing(props.Props):
+            title: str
+
+    @dataclass(frozen=True, slots=True)
+    class PropsUIDefined(props.Props):
+        title: str
+
+        def fields(self):
+            yield "title", self.title
+
+    # Subclasses of a subclass inherit its fields
+    class PropsUISub(PropsUIDefined):
+        __slots__ = ()
+
+    assert PropsUISub("x").toDict() == {"title": "x"}
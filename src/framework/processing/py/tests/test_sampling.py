@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from port.sampling import FULL, RowPolicy, RowSample, Sampling
+
+COLUMNS = ["Id", "Timestamp"]
+
+
+def rows(n: int, seed: int = 0) -> list[tuple[int, str]]:
+    """
+    Rows with distinct ISO timestamps, in random order
+    """
+    out = [(i, f"2024-01-01T{i // 60:02d}:{i % 60:02d}:00+00:00") for i in range(n)]
+    random.Random(seed).shuffle(out)
+    return out
+
+
+def offer(sample: RowSample, offered) -> RowSample:
+    for row in offered:
+        sample.append(row)
+    return sample
+
+
+def test_full_keeps_everything():
+    sample = offer(RowSample(FULL, 1), rows(50))
+    assert (sample.total, sample.kept, sample.sampled) == (50, 50, False)
+    assert list(sample) == rows(50)
+
+
+@pytest.mark.parametrize("n", [0, 1, 10, 100])
+def test_head_keeps_the_most_recent(n):
+    offered = rows(100)
+    sample = offer(RowSample(RowPolicy(Sampling.HEAD, n), timestamp_index=1), offered)
+
+    assert (sample.total, sample.kept) == (100, n)
+    assert sample.sampled == (n < 100)
+
+    table = sample.to_table(COLUMNS, sort_by=1)
+    assert list(table["Id"]) == list(range(99, 99 - n, -1))
+    assert list(table["Timestamp"]) == sorted(table["Timestamp"], reverse=True)
+
+
+def test_head_keeps_the_earliest_of_equal_timestamps():
+    offered = [(i, "2024-01-01T00:00:00+00:00") for i in range(5)]
+    sample = offer(RowSample(RowPolicy(Sampling.HEAD, 2), timestamp_index=1), offered)
+    assert sorted(row[0] for row in sample) == [0, 1]
+
+
+def test_head_without_timestamp_keeps_the_first():
+    offered = rows(20)
+    sample = offer(RowSample(RowPolicy(Sampling.HEAD, 5)), offered)
+    assert list(sample) == offered[:5]
+
+
+@pytest.mark.parametrize("n, total", [(10, 5), (10, 10), (10, 1000), (1, 50)])
+def test_reservoir_size(n, total):
+    sample = offer(RowSample(RowPolicy(Sampling.RESERVOIR, n), 1, seed="table"), rows(total))
+
+    assert (sample.total, sample.kept, len(sample)) == (total, min(n, total), min(n, total))
+    assert sample.sampled == (total > n)
+    ids = [row[0] for row in sample]
+    assert len(set(ids)) == len(ids)
+
+
+def test_reservoir_is_seeded():
+    def ids(seed) -> list[int]:
+        return [row[0] for row in offer(RowSample(RowPolicy(Sampling.RESERVOIR, 10), 1, seed=seed), rows(200))]
+
+    assert ids("likes") == ids("likes")
+    assert ids("likes") != ids("comments")
+
+
+def test_reservoir_is_uniform():
+    total, n, trials = 20, 5, 4000
+    counts = [0] * total
+    for seed in range(trials):
+        for i, _ in offer(RowSample(RowPolicy(Sampling.RESERVOIR, n), seed=seed), rows(total)):
+            counts[i] += 1
+
+    # Every row is kept with probability n / total, the standard deviation of a count is about 27
+    expected = trials * n / total
+    assert all(abs(count - expected) < 150 for count in counts), counts
+
+
+def test_release_keeps_the_counts():
+    sample = offer(RowSample(RowPolicy(Sampling.RESERVOIR, 10), 1), rows(30))
+    sample.release()
+    assert (sample.total, sample.kept, sample.sampled, len(sample)) == (30, 10, True, 0)
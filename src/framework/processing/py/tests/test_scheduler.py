@@ -0,0 +1,154 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import port.scheduler as scheduler
+import port.script as script
+from port.scheduler import UNLIMITED, TableBudget
+
+
+class FakeClock:
+    """
+    time.monotonic as set by the test
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler.time, "monotonic", fake)
+    return fake
+
+
+def test_expired_after_the_deadline(clock):
+    budget = TableBudget("table", deadline=10.0)
+    assert not budget.expired()
+
+    clock.now = 9.99
+    assert not budget.expired() and budget.reason is None
+
+    clock.now = 10.0
+    assert budget.expired()
+    assert (budget.truncated, budget.reason) == (True, "time")
+
+    # Once truncated the budget stays expired
+    clock.now = 0.0
+    assert budget.expired()
+
+
+def test_truncate_keeps_the_first_reason(caplog):
+    budget = TableBudget("table", deadline=10.0)
+    assert not budget.truncated
+
+    budget.truncate("rows")
+    budget.truncate("time")
+    assert (budget.truncated, budget.reason) == (True, "rows")
+    assert len([r for r in caplog.records if "Budget exhausted" in r.getMessage()]) == 1
+
+
+def test_truncation_ends_the_records(clock):
+    budget = TableBudget("table", deadline=10.0)
+    records = budget.records(range(1000))
+    assert [next(records) for _ in range(5)] == [0, 1, 2, 3, 4]
+
+    budget.truncate("memory")
+    assert list(records) == []
+    assert budget.n_records == 5
+
+
+def test_clock_is_checked_every_interval(clock, monkeypatch):
+    monkeypatch.setattr(scheduler, "CHECK_INTERVAL", 4)
+    budget = TableBudget("table", deadline=10.0)
+
+    seen = []
+    for i in budget.records(range(100)):
+        seen.append(i)
+        if i == 5:
+            clock.now = 10.0
+
+    # The deadline passed at record 5, it is noticed at the next check
+    assert seen == list(range(8))
+    assert budget.reason == "time"
+
+
+def test_expired_before_the_first_record(clock):
+    clock.now = 20.0
+    budget = TableBudget("table", deadline=10.0)
+    assert list(budget.records(range(10))) == []
+    assert budget.reason == "time"
+
+
+def test_row_cap():
+    budget = TableBudget("table", deadline=float("inf"), row_cap=3)
+    assert list(budget.records(range(3))) == [0, 1, 2]
+    assert not budget.truncated
+
+    # Nested loops share the count
+    assert list(budget.records(range(10))) == []
+    assert budget.reason == "rows"
+
+
+def test_unlimited_keeps_no_state(clock):
+    clock.now = 1e12
+    assert list(UNLIMITED.records(range(5))) == [0, 1, 2, 3, 4]
+    assert not UNLIMITED.expired()
+    assert (UNLIMITED.n_records, UNLIMITED.reason) == (0, None)
+
+
+START, END = 1_700_000_000, 1_700_086_400
+
+
+@pytest.mark.parametrize("timestamp, expected", [
+    (START - 1, False),
+    (START, True),
+    (START + 1, True),
+    (END - 1, True),
+    (END, False),
+    (END + 1, False),
+    (float(START), True),
+    (START - 0.5, False),
+    (END - 0.5, True),
+    (str(START), True),
+    (str(END), False),
+    (None, True),
+    ("", True),
+    ("not a time", True),
+])
+def test_window_includes_the_start_and_excludes_the_end(timestamp, expected):
+    budget = TableBudget("table", deadline=float("inf"), window=(START, END))
+    assert budget.in_window(timestamp) == expected
+
+
+@pytest.mark.parametrize("window, inside", [
+    (None, [START - 1, START, END - 1, END]),
+    ((None, END), [START - 1, START, END - 1]),
+    ((START, None), [START, END - 1, END]),
+    ((START, START), []),
+])
+def test_open_and_empty_windows(window, inside):
+    budget = TableBudget("table", deadline=float("inf"), window=window)
+    assert [t for t in [START - 1, START, END - 1, END] if budget.in_window(t)] == inside
+
+
+def test_records_outside_the_window_are_skipped_and_counted():
+    budget = TableBudget("table", deadline=float("inf"), row_cap=2, window=(START, END))
+    items = [{"timestamp": t} for t in [START - 1, START, END, START + 5, END - 1]]
+
+    assert [item["timestamp"] for item in budget.records(items, "timestamp")] == [START, START + 5]
+    assert (budget.n_outside_window, budget.n_records) == (2, 2)
+
+    # Records outside the window do not count towards the row cap
+    assert budget.reason == "rows"
+
+
+def test_study_period_to_epoch():
+    start = datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc)
+    assert script.study_period_to_epoch(None) is None
+    assert script.study_period_to_epoch((start, None)) == (START, None)
+    assert script.study_period_to_epoch((None, start)) == (None, START)
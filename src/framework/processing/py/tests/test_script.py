@@ -0,0 +1,168 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import logging
+import weakref
+
+import pytest
+
+from port.api.commands import CommandSystemDonate, CommandSystemExit, CommandUIRender
+
+
+def payload(type_: str, value: object = None) -> SimpleNamespace:
+    return SimpleNamespace(__type__=type_, value=value)
+
+
+def run_flow(script, zip_path: str) -> list[dict]:
+    """
+    Drives process() as the worker does: submits zip_path, donates, skips the questionnaires
+    Returns the consent forms that were rendered, as dicts
+    """
+    flow = script.process("test")
+    forms = []
+    command = next(flow)
+    while not isinstance(command, CommandSystemExit):
+        response = None
+        if isinstance(command, CommandUIRender):
+            body = command.page.body.toDict()
+            if body["__type__"] == "PropsUIPromptFileInput":
+                response = payload("PayloadString", zip_path)
+            elif body["__type__"] == "PropsUIPromptConsentForm":
+                forms.append(body)
+                response = payload("PayloadVoid") if body["loading"] else payload("PayloadJSON", "[]")
+            else:
+                response = payload("PayloadFalse")
+        else:
+            assert isinstance(command, CommandSystemDonate)
+        command = flow.send(response)
+    return forms
+
+
+def table_ids(form: dict) -> list[str]:
+    return [table["id"] for table in form["tables"]]
+
+
+def test_process_renders_tables_progressively(fresh_script, facebook_zip):
+    script = fresh_script
+    forms = run_flow(script, facebook_zip)
+
+    *loading, final = forms
+    assert loading, "the consent form is rendered before all tables are extracted"
+    assert all(form["loading"] for form in loading)
+    assert not final["loading"]
+
+    # Every render adds the tables that were extracted since the previous one
+    counts = [len(form["tables"]) for form in forms]
+    assert counts == sorted(counts)
+    for previous, current in zip(forms, forms[1:]):
+        assert set(table_ids(previous)) <= set(table_ids(current))
+
+    # The final render equals the tables of an extraction at once
+    validation = script.facebook.validate(facebook_zip)
+    expected = [table.toDict() for table in script.extract_facebook(facebook_zip, validation)]
+    assert final["tables"] == expected
+    assert len(final["tables"]) == len(script.FACEBOOK_TABLES)
+
+
+def test_pending_tables_count_down_to_zero(facebook_zip):
+    import port.script as script
+
+    validation = script.facebook.validate(facebook_zip)
+    pending = [count for _, count in script.extract_facebook_progressively(facebook_zip, validation)]
+
+    heavy = sum(spec.heavy for spec in script.FACEBOOK_TABLES)
+    assert pending == list(range(heavy, -1, -1))
+
+
+def test_resubmission_reuses_validation(fresh_script, facebook_zip):
+    script = fresh_script
+    first = run_flow(script, facebook_zip)
+    hits = script.RESULT_CACHE.hits
+
+    # The tables are extracted again, they are not kept
+    second = run_flow(script, facebook_zip)
+    assert script.RESULT_CACHE.hits == hits + 1
+    assert script.RESULT_CACHE.get(script.zip_fingerprint(facebook_zip), "tables") is None
+    assert second[0]["loading"]
+    assert second[-1] == first[-1]
+
+
+@pytest.fixture
+def without_logging():
+    """
+    pytest keeps log records, the exceptions in them would keep the frames of the extraction alive
+    """
+    logging.disable()
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def test_tables_are_released_before_the_donation(fresh_script, facebook_zip, monkeypatch, without_logging):
+    script = fresh_script
+    tables = []
+    extract_table = script.extract_table
+
+    def tracked_extract_table(*args, **kwargs):
+        table = extract_table(*args, **kwargs)
+        if table is not None:
+            tables.append(weakref.ref(table.data_frame))
+        return table
+
+    monkeypatch.setattr(script, "extract_table", tracked_extract_table)
+
+    flow = script.process("test")
+    command = next(flow)
+    while not (isinstance(command, CommandSystemDonate) and command.key == "Facebook"):
+        response = None
+        if isinstance(command, CommandUIRender):
+            body = command.page.body.toDict()
+            if body["__type__"] == "PropsUIPromptFileInput":
+                response = payload("PayloadString", facebook_zip)
+            elif body["__type__"] == "PropsUIPromptConsentForm":
+                response = payload("PayloadVoid") if body["loading"] else payload("PayloadJSON", "[]")
+            del body
+        command = flow.send(response)
+
+    assert len(tables) == len(script.FACEBOOK_TABLES)
+    assert [table() for table in tables] == [None] * len(tables)
+    flow.close()
+
+
+def group_list(script, facebook_zip: str) -> list[str]:
+    tables = script.extract_facebook(facebook_zip, script.facebook.validate(facebook_zip))
+    return script.derive_views(tables, facebook_zip)["group_list"]
+
+
+def test_group_list_from_the_complete_table(fresh_script, facebook_zip, monkeypatch):
+    script = fresh_script
+    tables = script.extract_facebook(facebook_zip, script.facebook.validate(facebook_zip))
+    (groups,) = [table for table in tables if table.id == "your_group_membership_activity_to_df"]
+    assert not groups.partial
+
+    # The archive is not read again
+    monkeypatch.setattr(script.facebook, "groups_to_list", lambda *args: pytest.fail("read the zipfile"))
+    assert script.derive_views(tables, facebook_zip)["group_list"] == script.facebook.group_names(groups.data_frame)
+    assert sorted(script.derive_views(tables, facebook_zip)["group_list"]) == [f"Group {i}" for i in range(7)]
+
+
+def test_group_list_ignores_the_study_period(fresh_script, facebook_zip, monkeypatch):
+    script = fresh_script
+    everything = group_list(script, facebook_zip)
+
+    # All memberships are after 2020, the table is left out and the list still has every group
+    monkeypatch.setattr(script, "STUDY_PERIOD", (None, datetime(2020, 1, 1, tzinfo=timezone.utc)))
+    assert group_list(script, facebook_zip) == everything
+    assert len(everything) == 7
+
+
+def test_group_list_ignores_truncation(fresh_script, facebook_zip, monkeypatch):
+    script = fresh_script
+    everything = group_list(script, facebook_zip)
+
+    monkeypatch.setattr(script, "MEMORY_THRESHOLDS", (0, 1 << 60))
+    monkeypatch.setattr(script, "MEMORY_ROW_CAP", 2)
+    monkeypatch.setattr(script, "PLAN_EXTRACTION", False)
+    tables = script.extract_facebook(facebook_zip, script.facebook.validate(facebook_zip))
+    (groups,) = [table for table in tables if table.id == "your_group_membership_activity_to_df"]
+    assert groups.partial and len(groups.data_frame) == 2
+
+    assert script.derive_views(tables, facebook_zip)["group_list"] == everything
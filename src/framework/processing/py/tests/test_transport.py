@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from port.api.commands import CommandSystemDonate, CommandSystemExit
+import port.api.props as props
+import port.api.transport as transport
+from port.main import ScriptWrapper
+import port.script as script
+from port.table import Table
+
+
+def decoded_tables(value):
+    """
+    command.toDict() with the data_frame strings of consent form tables parsed,
+    the JSON transport writes them as objects
+    """
+    if isinstance(value, list):
+        return [decoded_tables(item) for item in value]
+    if isinstance(value, dict):
+        out = {key: decoded_tables(item) for key, item in value.items()}
+        if value.get("__type__") == "PropsUIPromptConsentFormTable":
+            out["data_frame"] = json.loads(value["data_frame"])
+        return out
+    return value
+
+
+def consent_form_tables() -> list[props.PropsUIPromptConsentFormTable]:
+    table = Table({
+        "Reaction": ["LIKE", "LOVE", None, "LIKE"],
+        "Name": ["Jan", "Zoë", "\"quoted\"", "☃ 😀"],
+        "Count": [1, 2**70, 3.5, None],
+    })
+    table.categorize("Reaction")
+    description = props.Translatable({"en": "Reactions", "nl": "Reacties"})
+    visualizations = [{"title": {"en": "Per reaction", "nl": "Per reactie"}, "labels": ["LIKE", "LOVE"], "values": [2, 1]}]
+    tables = [
+        props.PropsUIPromptConsentFormTable("reactions", description, table, description, visualizations),
+        props.PropsUIPromptConsentFormTable("empty", description, Table()),
+    ]
+
+    pd = pytest.importorskip("pandas")
+    frame = pd.DataFrame({"Group": pd.Categorical(["a", "b", None, "a"]), "Value": [1, 2, 3, 4]})
+    tables.append(props.PropsUIPromptConsentFormTable("pandas", description, frame))
+    return tables
+
+
+@pytest.mark.parametrize("loading", [False, True])
+def test_render_consent_form(loading):
+    command = script.render_page("Facebook", script.create_consent_form(consent_form_tables(), loading=loading))
+    assert json.loads(transport.encode(command)) == decoded_tables(command.toDict())
+
+    data_frame = json.loads(transport.encode(command))["page"]["body"]["tables"][0]["data_frame"]
+    assert data_frame["Reaction"] == {"__type__": "DictionaryColumn", "categories": ["LIKE", "LOVE"], "codes": [0, 1, -1, 0]}
+
+
+def test_donate():
+    command = CommandSystemDonate("123-tracking", json.dumps(["café", "😀", {"a": None}]))
+    assert json.loads(transport.encode(command)) == command.toDict()
+
+
+def test_script_wrapper_json_transport():
+    commands = [
+        script.render_page("Facebook", script.create_consent_form(consent_form_tables())),
+        CommandSystemDonate("key", "[1, 2]"),
+        CommandSystemExit(0, "Success"),
+    ]
+    wrapper = ScriptWrapper((command for command in commands), transport="json")
+    for command in commands:
+        assert json.loads(wrapper.send(None)) == decoded_tables(command.toDict())
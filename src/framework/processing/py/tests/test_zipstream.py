@@ -0,0 +1,151 @@
+import io
+import random
+import zipfile
+
+import pytest
+
+import port.unzipddp as unzipddp
+
+
+class NonSeekable(io.BytesIO):
+    """
+    A stream that cannot seek, such as an upload that is still arriving
+    Reads return at most max_read bytes, a random number of them if random_reads
+    """
+
+    def __init__(self, data: bytes, max_read: int = 1 << 30, random_reads: bool = False):
+        super().__init__(data)
+        self.max_read = max_read
+        self.rng = random.Random(len(data)) if random_reads else None
+
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("seek")
+
+    def read(self, n: int | None = -1) -> bytes:
+        if n is None or n < 0:
+            n = self.max_read
+        n = min(n, self.max_read)
+        if self.rng is not None and n > 0:
+            n = self.rng.randint(1, n)
+        return super().read(n)
+
+
+class Sink(io.RawIOBase):
+    """
+    Output that cannot seek, zipfile writes a data descriptor after every member
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.data += b
+        return len(b)
+
+
+def members() -> dict[str, bytes]:
+    rng = random.Random(3)
+    return {
+        "your_facebook_activity/comments.json": b'{"comments_v2": [' + b",".join(b'{"comment": "nice %d"}' % i for i in range(3000)) + b"]}",
+        "your_facebook_activity/comments.html": b"<html><body>" + b"<p>hello</p>" * 2000 + b"</body></html>",
+        "your_facebook_activity/empty.json": b"",
+        "your_facebook_activity/stats.csv": b"a,b\n1,2\n",
+        "media/photos/a.jpg": rng.randbytes(300_000),
+        "media/videos/b.mp4": rng.randbytes(200_000),
+        # The signature of a data descriptor inside stored data
+        "tricky/stored.json": b'["PK\x07\x08' + rng.randbytes(20).hex().encode() + b'"]',
+    }
+
+
+def build(compression: int, seekable: bool = True, zip64: bool = False) -> bytes:
+    out = io.BytesIO() if seekable else Sink()
+    with zipfile.ZipFile(out, "w") as zf:
+        zf.writestr(zipfile.ZipInfo("media/"), b"")
+        for name, data in members().items():
+            info = zipfile.ZipInfo(name, (2024, 1, 2, 3, 4, 6))
+            info.compress_type = zipfile.ZIP_STORED if name.startswith(("media", "tricky")) else compression
+            with zf.open(info, "w", force_zip64=zip64) as f:
+                f.write(data)
+    return out.getvalue() if seekable else bytes(out.data)
+
+
+def expected(data: bytes, wanted=unzipddp._has_stream_suffix) -> dict[str, bytes]:
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return {info.filename: zf.read(info) for info in zf.infolist() if not info.is_dir() and wanted(info.filename)}
+
+
+def streamed(stream, **kwargs) -> dict[str, bytes]:
+    return {info.filename: f.read() for info, f in unzipddp.iter_zip_stream(stream, **kwargs)}
+
+
+ARCHIVES = {
+    "deflated": dict(compression=zipfile.ZIP_DEFLATED),
+    "deflated, data descriptors": dict(compression=zipfile.ZIP_DEFLATED, seekable=False),
+    "stored, data descriptors": dict(compression=zipfile.ZIP_STORED, seekable=False),
+    "zip64": dict(compression=zipfile.ZIP_DEFLATED, zip64=True),
+    "zip64, data descriptors": dict(compression=zipfile.ZIP_DEFLATED, seekable=False, zip64=True),
+}
+
+
+@pytest.mark.parametrize("archive", ARCHIVES)
+@pytest.mark.parametrize("random_reads", [False, True])
+def test_members_equal_zipfile(archive, random_reads):
+    data = build(**ARCHIVES[archive])
+    stream = NonSeekable(data, max_read=70_000, random_reads=random_reads)
+
+    out = streamed(stream)
+    assert out == expected(data)
+    assert not any(name.startswith("media") for name in out)
+
+
+@pytest.mark.parametrize("archive", ARCHIVES)
+def test_all_members(archive):
+    data = build(**ARCHIVES[archive])
+    assert streamed(NonSeekable(data), wanted=lambda name: True) == expected(data, lambda name: True)
+
+
+def test_unwanted_members_are_skipped():
+    data = build(zipfile.ZIP_DEFLATED)
+    stream = NonSeekable(data)
+    asked = []
+
+    def wanted(name: str) -> bool:
+        asked.append(name)
+        return name.endswith(".json")
+
+    # Members that are only partially read are skipped too
+    out = {info.filename: f.read(5) for info, f in unzipddp.iter_zip_stream(stream, wanted=wanted)}
+    assert out == {name: content[:5] for name, content in expected(data, wanted).items()}
+    assert "media/photos/a.jpg" in asked
+    assert "media/" not in asked
+
+
+@pytest.mark.parametrize("archive", ["deflated", "deflated, data descriptors", "stored, data descriptors"])
+def test_truncated_stream_raises(archive):
+    data = build(**ARCHIVES[archive])
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        central_directory = zf.start_dir
+    complete = expected(data)
+
+    for end in [*range(0, central_directory, central_directory // 97), central_directory - 1]:
+        out = {}
+        with pytest.raises(zipfile.BadZipFile, match="Unexpected end of zip stream"):
+            for info, f in unzipddp.iter_zip_stream(NonSeekable(data[:end])):
+                out[info.filename] = f.read()
+        # Members that were read before the end are complete
+        assert out == {name: complete[name] for name in out}
+
+    assert streamed(NonSeekable(data[:central_directory + 10])) == complete
+
+
+def test_corrupt_member_raises():
+    data = bytearray(build(zipfile.ZIP_DEFLATED))
+    data[data.index(b'["PK\x07\x08') + 10] ^= 1
+    with pytest.raises(zipfile.BadZipFile, match="Bad CRC-32"):
+        streamed(NonSeekable(bytes(data)))
@@ -1,5 +1,9 @@
 let pyScript
 
+// How commands are handed over from Python: 'dict' converts command.toDict() to a JS object,
+// 'json' receives a single JSON string that is parsed here (see port/api/transport.py)
+const TRANSPORT = 'dict'
+
 onmessage = (event) => {
   const { eventType } = event.data
   switch (eventType) {
@@ -10,7 +14,10 @@ onmessage = (event) => {
       break
 
     case 'firstRunCycle':
-      pyScript = self.pyodide.runPython(`port.start(${event.data.sessionId})`)
+      // profile: true runs the extraction of this session under cProfile (see port/profiling.py),
+      // the engine sets it from ?profile=true in the url (see assembly.ts)
+      const profile = event.data.profile === true ? 'True' : 'False'
+      pyScript = self.pyodide.runPython(`port.start(${event.data.sessionId}, "${TRANSPORT}", ${profile})`)
       runCycle(null)
       break
 
@@ -32,10 +39,12 @@ function runCycle(payload) {
     scriptEvent = pyScript.send(payload)
     self.postMessage({
       eventType: 'runCycleDone',
-      scriptEvent: scriptEvent.toJs({
-        create_proxies: false,
-        dict_converter: Object.fromEntries
-      })
+      scriptEvent: typeof scriptEvent === 'string'
+        ? JSON.parse(scriptEvent)
+        : scriptEvent.toJs({
+          create_proxies: false,
+          dict_converter: Object.fromEntries
+        })
     })
   } catch (error) {
     self.postMessage({
@@ -100,7 +109,8 @@ function startPyodide() {
 
 function loadPackages() {
   console.log('[ProcessingWorker] loading packages')
-  return self.pyodide.loadPackage(['micropip', 'numpy', 'pandas'])
+  // The port package does not need numpy or pandas, add them here if a script uses Table.to_pandas()
+  return self.pyodide.loadPackage(['micropip'])
 }
 
 function installPortPackage() {
@@ -5,13 +5,15 @@ export default class WorkerProcessingEngine implements ProcessingEngine {
   sessionId: String
   worker: Worker
   commandHandler: CommandHandler
+  profile: boolean
 
   resolveInitialized!: () => void
   resolveContinue!: () => void
 
-  constructor (sessionId: string, worker: Worker, commandHandler: CommandHandler) {
+  constructor (sessionId: string, worker: Worker, commandHandler: CommandHandler, profile = false) {
     this.sessionId = sessionId
     this.commandHandler = commandHandler
+    this.profile = profile
     this.worker = worker
     this.worker.onerror = console.log
     this.worker.onmessage = (event) => {
@@ -74,7 +76,7 @@ export default class WorkerProcessingEngine implements ProcessingEngine {
   }
 
   firstRunCycle (): void {
-    this.worker.postMessage({ eventType: 'firstRunCycle', sessionId: this.sessionId })
+    this.worker.postMessage({ eventType: 'firstRunCycle', sessionId: this.sessionId, profile: this.profile })
   }
 
   nextRunCycle (response: Response): void {
@@ -55,6 +55,7 @@ export interface PropsUIPromptConsentForm {
   donateButton?: Text
   tables: PropsUIPromptConsentFormTable[]
   metaTables: PropsUIPromptConsentFormTable[]
+  loading?: boolean
 }
 export function isPropsUIPromptConsentForm(arg: any): arg is PropsUIPromptConsentForm {
   return isInstanceOf<PropsUIPromptConsentForm>(arg, "PropsUIPromptConsentForm", ["tables", "metaTables"])
@@ -19,6 +19,7 @@ import _ from "lodash"
 import useUnloadWarning from "../hooks/useUnloadWarning"
 
 import { TableContainer } from "../elements/table_container"
+import { Spinner } from "../elements/spinner"
 
 type Props = Weak<PropsUIPromptConsentForm> & ReactFactoryContext
 
@@ -26,15 +27,23 @@ export const ConsentForm = (props: Props): JSX.Element => {
   useUnloadWarning()
   const [tables, setTables] = useState<TableWithContext[]>(() => parseTables(props.tables))
   const [metaTables, setMetaTables] = useState<TableWithContext[]>(() => parseTables(props.metaTables))
-  const { locale, resolve } = props
-  const { description, donateQuestion, donateButton, cancelButton } = prepareCopy(props)
+  const { locale, resolve, loading = false } = props
+  const { description, donateQuestion, donateButton, cancelButton, loadingText } = prepareCopy(props)
   const [isDonating, setIsDonating] = useState(false)
 
   useEffect(() => {
-    setTables(parseTables(props.tables))
+    // Keep tables the participant already edited, later renders only add tables
+    setTables((tables) => parseTables(props.tables).map((table) => tables.find(({ id }) => id === table.id) ?? table))
     setMetaTables(parseTables(props.metaTables))
   }, [props.tables])
 
+  useEffect(() => {
+    // A loading form is a progress update, the script continues extracting and renders the form again
+    if (loading) {
+      resolve?.({ __type__: "PayloadVoid", value: undefined })
+    }
+  }, [resolve, loading])
+
   const updateTable = useCallback((tableId: string, table: TableWithContext) => {
     setTables((tables) => {
       const index = tables.findIndex((table) => table.id === tableId)
@@ -46,6 +55,16 @@ export const ConsentForm = (props: Props): JSX.Element => {
     })
   }, [])
 
+  function decodeColumns(dataFrame: any): any {
+    // Categorical columns are dictionary encoded, see data_frame_to_json in port/api/props.py
+    return _.mapValues(dataFrame, (column: any) => {
+      if (column?.__type__ !== "DictionaryColumn") return column
+      return Object.fromEntries(
+        column.codes.map((code: number, row: number) => [`${row}`, code === -1 ? null : column.categories[code]])
+      )
+    })
+  }
+
   function rowCell(dataFrame: any, column: string, row: number): string {
     const text = String(dataFrame[column][`${row}`])
     return text
@@ -89,7 +108,9 @@ export const ConsentForm = (props: Props): JSX.Element => {
     const description =
       tableData.description !== undefined ? Translator.translate(tableData.description, props.locale) : ""
     const deletedRowCount = 0
-    const dataFrame = JSON.parse(tableData.data_frame)
+    // A JSON string, or already an object when the worker receives commands as JSON (see port/api/transport.py)
+    const data = typeof tableData.data_frame === "string" ? JSON.parse(tableData.data_frame) : tableData.data_frame
+    const dataFrame = decodeColumns(data)
     const headCells = columnNames(dataFrame).map((column: string) => column)
     const head: PropsUITableHead = {
       __type__: "PropsUITableHead",
@@ -116,12 +137,14 @@ export const ConsentForm = (props: Props): JSX.Element => {
   }
 
   function handleDonate(): void {
+    if (loading) return
     setIsDonating(true)
     const value = serializeConsentData()
     resolve?.({ __type__: "PayloadJSON", value })
   }
 
   function handleCancel(): void {
+    if (loading) return
     resolve?.({ __type__: "PayloadFalse", value: false })
   }
 
@@ -181,6 +204,12 @@ export const ConsentForm = (props: Props): JSX.Element => {
             )
           })}
         </div>
+        {loading && (
+          <div className="flex flex-row items-center gap-4">
+            <Spinner color="dark" />
+            <BodyLarge margin="" text={loadingText} />
+          </div>
+        )}
         <div>
           <BodyLarge margin="" text={donateQuestion} />
 
@@ -188,7 +217,8 @@ export const ConsentForm = (props: Props): JSX.Element => {
             <PrimaryButton
               label={donateButton}
               onClick={handleDonate}
-              color="bg-success text-white"
+              color={loading ? "bg-grey3 text-white" : "bg-success text-white"}
+              enabled={!loading}
               spinning={isDonating}
             />
             <LabelButton label={cancelButton} onClick={handleCancel} color="text-grey1" />
@@ -204,6 +234,7 @@ interface Copy {
   donateQuestion: string
   donateButton: string
   cancelButton: string
+  loadingText: string
 }
 
 function prepareCopy({ donateQuestion, donateButton, description, locale }: Props): Copy {
@@ -212,6 +243,7 @@ function prepareCopy({ donateQuestion, donateButton, description, locale }: Prop
     donateQuestion: Translator.translate(donateQuestion ?? defaultDonateQuestionLabel, locale),
     donateButton: Translator.translate(donateButton ?? defaultDonateButtonLabel, locale),
     cancelButton: Translator.translate(cancelButtonLabel, locale),
+    loadingText: Translator.translate(loadingLabel, locale),
   }
 }
 
@@ -232,3 +264,7 @@ const defaultDescription = new TextBundle()
   )
 
 const cancelButtonLabel = new TextBundle().add("en", "No").add("nl", "Nee")
+
+const loadingLabel = new TextBundle()
+  .add("en", "More of your data is being loaded, please wait a moment...")
+  .add("nl", "Meer van uw gegevens worden geladen, een moment geduld...")
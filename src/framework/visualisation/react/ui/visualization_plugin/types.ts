@@ -39,6 +39,7 @@ export const zDateFormat = z.enum([
   "year",
   "quarter",
   "month",
+  "week",
   "day",
   "hour",
   "month_cycle",
@@ -82,11 +83,22 @@ export const zAggregationValue = z.object({
 })
 export type AggregationValue = z.infer<typeof zAggregationValue>
 
+// Aggregated data computed during extraction (see port/aggregate.py). It replaces the rows
+// of the table as long as the table has the number of rows it was computed from
+export const zAggregated = z.object({
+  rows: z.number(),
+  head: z.array(z.string()),
+  data: z.array(z.array(z.union([z.string(), z.number()]))),
+  values: z.array(zAggregationValue),
+})
+export type Aggregated = z.infer<typeof zAggregated>
+
 export const zChartVisualization = zVisualizationProps.merge(
   z.object({
     type: zChartVisualizationType,
     group: zAggregationGroup,
     values: z.array(zAggregationValue),
+    aggregated: zAggregated.optional(),
   })
 )
 export type ChartVisualization = z.infer<typeof zChartVisualization>
@@ -1,5 +1,5 @@
 import { VisualizationType, VisualizationData, Table } from '../types'
-import { useEffect, useState } from 'react'
+import { useEffect, useMemo, useState } from 'react'
 
 type Status = 'loading' | 'success' | 'error'
 
@@ -10,6 +10,7 @@ export default function useVisualizationData (
   const [visualizationData, setVisualizationData] = useState<VisualizationData>()
   const [status, setStatus] = useState<Status>('loading')
   const [worker, setWorker] = useState<Worker>()
+  const input = useMemo(() => selectInput(table, visualization), [table, visualization])
 
   useEffect(() => {
     const worker = new Worker(new URL('./visualizationDataWorker.ts', import.meta.url))
@@ -31,9 +32,25 @@ export default function useVisualizationData (
           setStatus('error')
         }
       }
-      worker.postMessage({ table, visualization })
+      worker.postMessage(input)
     }
-  }, [table, visualization, worker])
+  }, [input, worker])
 
   return [visualizationData, status]
 }
+
+// Charts the aggregated data of the visualization instead of the rows of the table,
+// unless rows were deleted or filtered since it was aggregated
+function selectInput (table: Table, visualization: VisualizationType): { table: Table, visualization: VisualizationType } {
+  if (!('aggregated' in visualization)) return { table, visualization }
+
+  const { aggregated, ...chart } = visualization
+  if (aggregated === undefined) return { table, visualization }
+  if (table.body.rows.length !== aggregated.rows) return { table, visualization: chart }
+
+  const rows = aggregated.data.map((cells, i) => ({ id: String(i), cells: cells.map(String) }))
+  return {
+    table: { id: table.id, head: { cells: aggregated.head }, body: { rows } },
+    visualization: { ...chart, values: aggregated.values }
+  }
+}
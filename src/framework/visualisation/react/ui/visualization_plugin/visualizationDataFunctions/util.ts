@@ -30,6 +30,13 @@ export function formatDate(
     };
   }
 
+  if (format === "week") {
+    formatter = (date) => {
+      const [year, week] = isoWeek(date);
+      return `${year}-W${week.toString().padStart(2, "0")}`;
+    };
+  }
+
   if (format === "day") {
     formatter = (date) => {
       const year = date.getFullYear().toString();
@@ -110,6 +117,7 @@ function createSortable(
   if (interval === "year") intervalNumber = 1000 * 60 * 60 * 24 * 364;
   if (interval === "quarter") intervalNumber = 1000 * 60 * 60 * 24 * 28 * 3;
   if (["month", "month_cycle"].includes(interval)) intervalNumber = 1000 * 60 * 60 * 24 * 28;
+  if (interval === "week") intervalNumber = 1000 * 60 * 60 * 24 * 7;
   if (["day", "weekday_cycle"].includes(interval)) intervalNumber = 1000 * 60 * 60 * 24;
   if (["hour", "hour_cycle"].includes(interval)) intervalNumber = 1000 * 60 * 60;
 
@@ -125,6 +133,14 @@ function createSortable(
   return sortable;
 }
 
+function isoWeek(date: Date): [number, number] {
+  // the ISO week belongs to the year of its thursday
+  const thursday = new Date(date.getFullYear(), date.getMonth(), date.getDate() + 3 - ((date.getDay() + 6) % 7));
+  const firstThursday = new Date(thursday.getFullYear(), 0, 4);
+  const days = Math.round((thursday.getTime() - firstThursday.getTime()) / (1000 * 60 * 60 * 24));
+  return [thursday.getFullYear(), 1 + Math.floor((days + ((firstThursday.getDay() + 6) % 7)) / 7)];
+}
+
 function getDomain(numbers: number[]): [number, number] {
   let min = numbers[0];
   let max = numbers[0];